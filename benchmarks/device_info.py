@@ -0,0 +1,124 @@
+"""Benchmark event loop blocking while saving device information.
+
+Simulates a whole-house ALDB load where every device finishes loading its
+All-Link database in turn and asks for the device info file to be saved.
+A heartbeat task measures how late the event loop runs it, which is the
+time the loop was blocked by the saves.
+
+Usage:
+    python -m benchmarks.device_info [--devices N] [--records N]
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from insteonplm.devices import ALDBRecord, ALDBStatus, create
+import insteonplm.linkedDevices
+from insteonplm.linkedDevices import LinkedDevices
+from insteonplm.messagecallback import MessageCallback
+from insteonplm.storage import DEVICE_INFO_FILE
+
+HEARTBEAT_INTERVAL = 0.001
+
+
+class BenchmarkPLM:
+    """Minimal modem used to create devices for the benchmark."""
+
+    def __init__(self, loop, workdir):
+        """Init the BenchmarkPLM class."""
+        self.loop = loop
+        self.notifications = None
+        self.message_callbacks = MessageCallback()
+        self.devices = LinkedDevices(loop, workdir)
+
+    def send_msg(self, msg, wait_nak=True, wait_timeout=2):
+        """Discard messages sent by the devices."""
+
+    def clear_scene_cache(self):
+        """Ignore scene cache changes."""
+
+
+def _create_devices(plm, num_devices, num_records):
+    for dev_num in range(num_devices):
+        address = bytearray([0x10, dev_num >> 8, dev_num & 0xFF])
+        device = create(plm, address, 0x01, 0x20, 0x00)
+        mem_addr = 0x0FFF
+        for rec_num in range(num_records):
+            device.aldb[mem_addr] = ALDBRecord(
+                mem_addr, 0xE2, rec_num & 0xFF, "1a2b3c", 0x01, 0x20, 0x41
+            )
+            mem_addr -= 8
+        device.aldb.status = ALDBStatus.LOADED
+        plm.devices[device.id] = device
+
+
+def _legacy_save(linked_devices, workdir):
+    """Save all devices the way the device info file used to be saved."""
+    devices = []
+    for addr in linked_devices:
+        # pylint: disable=protected-access
+        devices.append(linked_devices._get_device_info(linked_devices[addr]))
+    with open("{}/{}".format(workdir, DEVICE_INFO_FILE), "w") as outfile:
+        json.dump(devices, outfile)
+
+
+async def _heartbeat(loop, lags, stop):
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(loop.time() - start - HEARTBEAT_INTERVAL)
+
+
+async def run_load(loop, num_devices, num_records, legacy):
+    """Run one simulated whole-house load and return the loop lag stats."""
+    with tempfile.TemporaryDirectory() as workdir:
+        plm = BenchmarkPLM(loop, workdir)
+        _create_devices(plm, num_devices, num_records)
+        lags = []
+        stop = asyncio.Event()
+        heartbeat = asyncio.ensure_future(_heartbeat(loop, lags, stop))
+        start = time.perf_counter()
+        for addr in plm.devices:
+            if legacy:
+                _legacy_save(plm.devices, workdir)
+            else:
+                plm.devices.save_device_info(plm.devices[addr])
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+        await plm.devices.async_save_device_info()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await heartbeat
+    return {
+        "elapsed": elapsed,
+        "max_lag": max(lags) if lags else 0,
+        "total_lag": sum(lag for lag in lags if lag > 0),
+    }
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=150)
+    parser.add_argument("--records", type=int, default=50)
+    args = parser.parse_args()
+
+    # Save as soon as possible so the debounce does not hide the write cost
+    insteonplm.linkedDevices.DEVICE_INFO_SAVE_DELAY = 0.05
+
+    loop = asyncio.get_event_loop()
+    for name, legacy in [("full rewrite", True), ("incremental", False)]:
+        result = loop.run_until_complete(
+            run_load(loop, args.devices, args.records, legacy)
+        )
+        print(
+            "{:<14s} elapsed {:7.3f}s  max loop lag {:7.4f}s  "
+            "total loop lag {:7.3f}s".format(
+                name, result["elapsed"], result["max_lag"], result["total_lag"]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Benchmark the CPU time to receive a message with INFO and DEBUG logging.
+
+Feeds All-Link broadcast messages from a set of devices to a PLM and
+measures the CPU time used per message with logging disabled and with
+the insteonplm logger at INFO and at DEBUG. Debug records are formatted
+and written to the null device so the cost of producing them is
+included. The INFO time should be close to the time with logging
+disabled.
+
+Usage:
+    python -m benchmarks.message_logging [--devices N] [--messages N]
+                                         [--repeat N]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+
+from insteonplm.devices import create
+from insteonplm.plm import PLM
+
+FLAGS_ALL_LINK_BROADCAST = 0xCB
+COMMANDS = [0x11, 0x13]
+
+
+def _device_address(dev_num):
+    return bytes([0x20, dev_num >> 8, dev_num & 0xFF])
+
+
+def _messages(num_devices, num_messages):
+    """Return the raw All-Link broadcast messages sent by the devices."""
+    messages = []
+    for msg_num in range(num_messages):
+        address = _device_address(msg_num % num_devices)
+        cmd1 = COMMANDS[(msg_num // num_devices) % len(COMMANDS)]
+        messages.append(
+            bytes([0x02, 0x50])
+            + address
+            + bytes([0x00, 0x00, 0x01, FLAGS_ALL_LINK_BROADCAST, cmd1, 0x00])
+        )
+    return messages
+
+
+async def run_messages(loop, workdir, num_devices, messages):
+    """Receive the messages and return the CPU time used."""
+    plm = PLM(loop=loop, workdir=workdir)
+    for dev_num in range(num_devices):
+        device = create(plm, _device_address(dev_num), 0x01, 0x20, None)
+        plm.devices[device.id] = device
+    await asyncio.sleep(0)
+
+    start = time.process_time()
+    for msg in messages:
+        plm.data_received(msg)
+        await asyncio.sleep(0)
+    # Let the scheduled callbacks run
+    await asyncio.sleep(0.1)
+    elapsed = time.process_time() - start
+    await plm.close()
+    return elapsed
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    insteonplm_logger = logging.getLogger("insteonplm")
+    insteonplm_logger.propagate = False
+    with open(os.devnull, "w") as devnull:
+        handler = logging.StreamHandler(devnull)
+        handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+        )
+        insteonplm_logger.addHandler(handler)
+
+        messages = _messages(args.devices, args.messages)
+        loop = asyncio.get_event_loop()
+        # Warm up so first use costs are not counted in the first level
+        insteonplm_logger.setLevel(logging.INFO)
+        with tempfile.TemporaryDirectory() as workdir:
+            loop.run_until_complete(
+                run_messages(loop, workdir, args.devices, messages)
+            )
+        levels = [
+            ("off", logging.CRITICAL),
+            ("INFO", logging.INFO),
+            ("DEBUG", logging.DEBUG),
+        ]
+        for name, level in levels:
+            logging.disable(logging.CRITICAL if name == "off" else logging.NOTSET)
+            insteonplm_logger.setLevel(level)
+            times = []
+            for _ in range(args.repeat):
+                with tempfile.TemporaryDirectory() as workdir:
+                    times.append(
+                        loop.run_until_complete(
+                            run_messages(loop, workdir, args.devices, messages)
+                        )
+                    )
+            elapsed = min(times)
+            print(
+                "{:<5s} {:8.3f}s CPU  {:8.1f}us per message".format(
+                    name, elapsed, elapsed / len(messages) * 1e6
+                )
+            )
+        insteonplm_logger.removeHandler(handler)
+
+
+if __name__ == "__main__":
+    main()
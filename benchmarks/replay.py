@@ -0,0 +1,102 @@
+"""Benchmark the receive pipeline by replaying captured modem traffic.
+
+Replays the frames received in a capture file to a new PLM as fast as
+possible and reports the frames and messages processed per second. The
+capture is either a file recorded with IM.start_capture or, by default,
+the startup of a simulated network followed by button presses on every
+device.
+
+Usage:
+    python -m benchmarks.replay [--capture FILE] [--devices N]
+                                [--presses N] [--repeat N] [--speed SPEED]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from insteonplm.capture import RECEIVED, read_capture, replay
+from insteonplm.plm import PLM
+from insteonplm.simulator import SimulatedModem
+
+from .startup import PacedPLM, StartupTimer, STARTUP_TIMEOUT
+
+
+async def record_capture(loop, workdir, path, num_devices, presses):
+    """Record the startup of a simulated network and button presses."""
+    plm = PacedPLM(loop=loop, workdir=workdir)
+    modem = SimulatedModem(loop, time_scale=0, duplicates=2)
+    devices = modem.add_devices(num_devices, "dimmer")
+    timer = StartupTimer(loop, plm, num_devices)
+    plm.start_capture(path)
+    modem.connect(plm)
+    await asyncio.wait_for(timer.done.wait(), STARTUP_TIMEOUT)
+    for press in range(presses):
+        for device in devices:
+            modem.press(device, cmd1=0x11 if press % 2 else 0x13)
+        await asyncio.sleep(0.1)
+    await plm.close()
+
+
+async def run_replay(loop, workdir, path, speed):
+    """Replay the capture to a new PLM and return the time used."""
+    plm = PLM(loop=loop, workdir=workdir)
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    frames = await replay(plm, path, loop, speed)
+    # Let the scheduled callbacks run
+    while plm.metrics["messages_received"].total < frames and (
+        time.perf_counter() - start < 60
+    ):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    messages = plm.metrics["messages_received"].total
+    await plm.close()
+    return frames, messages, elapsed, cpu
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--capture")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--presses", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--speed", type=float, default=0)
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.capture
+        if path is None:
+            path = os.path.join(workdir, "startup.cap")
+            loop.run_until_complete(
+                record_capture(loop, workdir, path, args.devices, args.presses)
+            )
+        received = sum(
+            len(record.data)
+            for record in read_capture(path)
+            if record.direction == RECEIVED
+        )
+        print("capture {}  {} bytes received".format(path, received))
+        print(
+            "{:>8s} {:>9s} {:>9s} {:>9s} {:>12s}".format(
+                "frames", "messages", "elapsed", "cpu", "messages/s"
+            )
+        )
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as replay_dir:
+                frames, messages, elapsed, cpu = loop.run_until_complete(
+                    run_replay(loop, replay_dir, path, args.speed)
+                )
+            print(
+                "{:8d} {:9d} {:8.3f}s {:8.3f}s {:12.0f}".format(
+                    frames, messages, elapsed, cpu, messages / elapsed
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Benchmark Insteon Modem startup time against a simulated modem.
+
+Measures the time to import the insteonplm package and, for networks of
+different sizes, the time from the connection to the first usable device,
+to the modem All-Link Database being loaded and to every device being
+polled for status. Each network is started cold, with no saved device
+info, and then warm from the device info saved by the cold start.
+
+The modem waits between sent messages to pace the traffic on the
+INSTEON network. The wait and the latency of the simulated network are
+scaled by `--pacing` so the default run measures the processing time of
+the module rather than the pacing.
+
+Usage:
+    python -m benchmarks.startup [--devices N [N ...]] [--pacing SCALE]
+                                 [--import-runs N] [--import-profile N]
+"""
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from insteonplm.plm import PLM, WAIT_TIMEOUT
+from insteonplm.simulator import SimulatedModem
+
+DEVICE_LEVEL = 0xFF
+STARTUP_TIMEOUT = 600
+
+IMPORT_SCRIPT = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import insteonplm\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+class PacedPLM(PLM):
+    """PLM with the wait between sent messages scaled."""
+
+    pacing = 0.0
+
+    def send_msg(self, msg, wait_nak=True, wait_timeout=WAIT_TIMEOUT):
+        """Place a message on the send queue with a scaled wait."""
+        super().send_msg(msg, wait_nak, wait_timeout * self.pacing)
+
+
+class StartupTimer:
+    """Record the time each startup milestone is reached."""
+
+    def __init__(self, loop, plm, num_devices):
+        """Init the StartupTimer class."""
+        self._loop = loop
+        self._num_devices = num_devices
+        self._polled = set()
+        self.start = loop.time()
+        self.first_device = None
+        self.aldb_loaded = None
+        self.all_polled = None
+        self.done = asyncio.Event()
+        plm.devices.add_device_callback(self._device_added)
+        plm.add_all_link_done_callback(self._aldb_loaded)
+
+    def _elapsed(self):
+        return self._loop.time() - self.start
+
+    def _device_added(self, device):
+        if self.first_device is None:
+            self.first_device = self._elapsed()
+        for group in device.states:
+            device.states[group].register_updates(self._state_updated)
+
+    def _aldb_loaded(self):
+        self.aldb_loaded = self._elapsed()
+
+    def _state_updated(self, address, group, val):
+        self._polled.add(address.id)
+        if len(self._polled) == self._num_devices and self.all_polled is None:
+            self.all_polled = self._elapsed()
+            self.done.set()
+
+
+async def run_startup(loop, workdir, num_devices, pacing):
+    """Start the modem once and return the startup timer."""
+    PacedPLM.pacing = pacing
+    plm = PacedPLM(loop=loop, workdir=workdir)
+    modem = SimulatedModem(loop, time_scale=pacing)
+    for device in modem.add_devices(num_devices, "dimmer"):
+        device.level = DEVICE_LEVEL
+    timer = StartupTimer(loop, plm, num_devices)
+    modem.connect(plm)
+    try:
+        await asyncio.wait_for(timer.done.wait(), STARTUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+    await plm.close()
+    return timer
+
+
+def measure_import(runs):
+    """Return the time to import insteonplm in a new interpreter."""
+    times = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT])
+        times.append(float(output))
+    return times
+
+
+def profile_import(count):
+    """Return the modules with the largest cumulative import time."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import insteonplm"],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        self_us = int(fields[0].split(":")[1])
+        modules.append((int(fields[1]), self_us, fields[2].rstrip()))
+    modules.sort(reverse=True)
+    return modules[:count]
+
+
+def _format_time(value):
+    if value is None:
+        return "{:>9s}".format("-")
+    return "{:8.3f}s".format(value)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--pacing", type=float, default=0.0)
+    parser.add_argument("--import-runs", type=int, default=5)
+    parser.add_argument("--import-profile", type=int, default=15)
+    args = parser.parse_args()
+
+    if args.import_runs:
+        times = measure_import(args.import_runs)
+        print(
+            "import insteonplm  min {:.3f}s  median {:.3f}s".format(
+                min(times), statistics.median(times)
+            )
+        )
+    if args.import_profile:
+        print("\n{:>10s} {:>10s}  module".format("cumul(us)", "self(us)"))
+        for cumulative, self_us, name in profile_import(args.import_profile):
+            print("{:10d} {:10d} {}".format(cumulative, self_us, name))
+
+    print(
+        "\n{:>7s} {:<5s} {:>9s} {:>9s} {:>9s}".format(
+            "devices", "start", "first", "aldb", "polled"
+        )
+    )
+    loop = asyncio.get_event_loop()
+    for num_devices in args.devices:
+        with tempfile.TemporaryDirectory() as workdir:
+            for start in ["cold", "warm"]:
+                timer = loop.run_until_complete(
+                    run_startup(loop, workdir, num_devices, args.pacing)
+                )
+                print(
+                    "{:7d} {:<5s} {} {} {}".format(
+                        num_devices,
+                        start,
+                        _format_time(timer.first_device),
+                        _format_time(timer.aldb_loaded),
+                        _format_time(timer.all_polled),
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark memory used by device message callback templates.
+
+Creates a mix of device types and measures the memory they hold with
+tracemalloc, once with the message templates shared between devices and
+once with a template per device as before.
+
+Usage:
+    python -m benchmarks.templates [--devices N [N ...]]
+"""
+import argparse
+import asyncio
+import gc
+import tracemalloc
+
+from insteonplm.devices import create
+from insteonplm.messagecallback import MessageCallback
+
+# SwitchLinc Dimmer, KeypadLinc Dimmer 8, SwitchLinc Relay, Motion Sensor
+DEVICE_TYPES = [(0x01, 0x20), (0x01, 0x1C), (0x02, 0x2A), (0x10, 0x01)]
+
+
+class BenchmarkPLM:
+    """Minimal modem used to create devices for the benchmark."""
+
+    def __init__(self, loop):
+        """Init the BenchmarkPLM class."""
+        self.loop = loop
+        self.notifications = None
+
+    def send_msg(self, msg, wait_nak=True, wait_timeout=2):
+        """Discard messages sent by the devices."""
+
+
+def _per_device_template(self, msg):
+    """Keep the template of each device as registered."""
+    return msg
+
+
+def measure(loop, num_devices, shared):
+    """Return the bytes held by the devices and the number of templates."""
+    shared_template = MessageCallback._shared_template
+    if not shared:
+        MessageCallback._shared_template = _per_device_template
+    plm = BenchmarkPLM(loop)
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    devices = []
+    for dev_num in range(num_devices):
+        cat, subcat = DEVICE_TYPES[dev_num % len(DEVICE_TYPES)]
+        address = bytearray([0x20, dev_num >> 8, dev_num & 0xFF])
+        devices.append(create(plm, address, cat, subcat, None))
+    gc.collect()
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    MessageCallback._shared_template = shared_template
+
+    size = sum(stat.size_diff for stat in end.compare_to(start, "filename"))
+    templates = set()
+    for device in devices:
+        # pylint: disable=protected-access
+        templates.update(id(template) for template in device._message_callbacks)
+    return size, len(templates)
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 500])
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    print(
+        "{:>7s} {:<10s} {:>12s} {:>10s} {:>10s}".format(
+            "devices", "templates", "bytes", "per device", "objects"
+        )
+    )
+    for num_devices in args.devices:
+        for name, shared in [("per device", False), ("shared", True)]:
+            size, templates = measure(loop, num_devices, shared)
+            print(
+                "{:7d} {:<10s} {:12d} {:10d} {:10d}".format(
+                    num_devices, name, size, size // num_devices, templates
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
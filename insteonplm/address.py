@@ -107,8 +107,9 @@ class Address:
                 unitcode = insteonplm.utils.byte_to_unitcode(unitcode_byte)
                 addrstr = "X10.{}.{:02d}".format(housecode.upper(), unitcode)
             else:
+                addrhex = self.hex
                 addrstr = "{}.{}.{}".format(
-                    self.hex[0:2], self.hex[2:4], self.hex[4:6]
+                    addrhex[0:2], addrhex[2:4], addrhex[4:6]
                 ).upper()
         return addrstr
 
@@ -0,0 +1,111 @@
+"""Record and replay the traffic between an IM and the Insteon Modem.
+
+A capture file starts with the CAPTURE_MAGIC header followed by one
+record for each frame read from or written to the modem. Each record is
+the direction, the monotonic time in seconds since the capture started
+and the length of the frame, followed by the frame bytes.
+
+Captures are made with IM.start_capture and IM.stop_capture. The replay
+function feeds the frames read from the modem back to a protocol at the
+recorded speed, or as fast as possible, so a captured incident can be
+run again without the modem.
+"""
+import asyncio
+from collections import namedtuple
+import struct
+
+__all__ = (
+    "CaptureRecord",
+    "CaptureWriter",
+    "read_capture",
+    "replay",
+    "RECEIVED",
+    "SENT",
+)
+
+CAPTURE_MAGIC = b"IPLMCAP\x01"
+RECEIVED = 0
+SENT = 1
+
+_RECORD_HEADER = struct.Struct(">BdH")
+
+CaptureRecord = namedtuple("CaptureRecord", "direction timestamp data")
+
+
+class CaptureWriter:
+    """Write frames to a capture file.
+
+    Parameters:
+        path: Capture file name.
+        clock: Callable returning the monotonic time in seconds, such as
+        the time method of the event loop.
+    """
+
+    def __init__(self, path, clock):
+        """Init the CaptureWriter class."""
+        self._file = open(path, "wb")
+        self._file.write(CAPTURE_MAGIC)
+        self._clock = clock
+        self._start = clock()
+        self._records = 0
+
+    @property
+    def records(self):
+        """Return the number of frames written."""
+        return self._records
+
+    def record(self, direction, data):
+        """Write a frame received or sent by the IM."""
+        self._file.write(
+            _RECORD_HEADER.pack(direction, self._clock() - self._start, len(data))
+        )
+        self._file.write(data)
+        self._records += 1
+
+    def close(self):
+        """Close the capture file."""
+        self._file.close()
+
+
+def read_capture(path):
+    """Yield the CaptureRecord of each frame in a capture file."""
+    with open(path, "rb") as capture:
+        if capture.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError("{} is not an insteonplm capture file".format(path))
+        while True:
+            header = capture.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            direction, timestamp, length = _RECORD_HEADER.unpack(header)
+            yield CaptureRecord(direction, timestamp, capture.read(length))
+
+
+async def replay(protocol, path, loop, speed=1.0):
+    """Feed the frames received in a capture file to a protocol.
+
+    Parameters:
+        protocol: Protocol, usually an IM, receiving the frames through
+        data_received.
+        path: Capture file name.
+        loop: asyncio event loop.
+        speed: (optional) Speed relative to the capture, default is 1 for
+        the recorded speed. A speed of 0 or None replays as fast as
+        possible while letting the protocol process each frame.
+
+    Returns the number of frames replayed. Frames sent by the IM are not
+    replayed.
+    """
+    frames = 0
+    start = loop.time()
+    for record in read_capture(path):
+        if record.direction != RECEIVED:
+            continue
+        if speed:
+            delay = start + record.timestamp / speed - loop.time()
+            await asyncio.sleep(max(delay, 0), loop=loop)
+        else:
+            await asyncio.sleep(0, loop=loop)
+        protocol.data_received(record.data)
+        frames += 1
+    await asyncio.sleep(0, loop=loop)
+    return frames
@@ -286,6 +286,13 @@ MESSAGE_GET_IM_CONFIGURATION_RECEIVED_SIZE = 6
 MESSAGE_ACK = 0x06
 MESSAGE_NAK = 0x15
 
+MANAGE_ALL_LINK_FIND_FIRST_0X00 = 0x00
+MANAGE_ALL_LINK_FIND_NEXT_0X01 = 0x01
+MANAGE_ALL_LINK_MODIFY_FIRST_FOUND_0X20 = 0x20
+MANAGE_ALL_LINK_ADD_CONTROLLER_0X40 = 0x40
+MANAGE_ALL_LINK_ADD_RESPONDER_0X41 = 0x41
+MANAGE_ALL_LINK_DELETE_FIRST_FOUND_0X80 = 0x80
+
 MESSAGE_FLAG_BROADCAST_0X80 = 0x80
 MESSAGE_FLAG_GROUP_0X40 = 0x40
 MESSAGE_FLAG_NAK_0X20 = 0x20
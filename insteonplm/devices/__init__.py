@@ -1,11 +1,13 @@
 """Insteon Device Classes."""
 # pylint: disable=too-many-lines
 import asyncio
-from collections import namedtuple
-from concurrent.futures import CancelledError
+from collections import deque, namedtuple
 import datetime
 from enum import Enum
+from functools import partial
 import logging
+import sys
+import time
 
 import async_timeout
 
@@ -21,6 +23,10 @@ from insteonplm.constants import (
     COMMAND_GET_INSTEON_ENGINE_VERSION_0X0D_0X00,
     COMMAND_PING_0X0F_0X00,
     COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+    MANAGE_ALL_LINK_ADD_CONTROLLER_0X40,
+    MANAGE_ALL_LINK_ADD_RESPONDER_0X41,
+    MANAGE_ALL_LINK_DELETE_FIRST_FOUND_0X80,
+    MANAGE_ALL_LINK_MODIFY_FIRST_FOUND_0X20,
     MESSAGE_ACK,
     MESSAGE_TYPE_BROADCAST_MESSAGE,
     MESSAGE_TYPE_DIRECT_MESSAGE,
@@ -40,14 +46,128 @@ from insteonplm.states import State
 
 _LOGGER = logging.getLogger(__name__)
 DIRECT_ACK_WAIT_TIMEOUT = 3
+DIRECT_ACK_MIN_TIMEOUT = 1
 ALDB_RECORD_TIMEOUT = 10
 ALDB_RECORD_RETRIES = 20
 ALDB_ALL_RECORD_TIMEOUT = 30
 ALDB_ALL_RECORD_RETRIES = 5
+ALDB_READ_WINDOW = 8
+ALDB_READ_WINDOW_MAX = 32
+ALDB_WRITE_TIMEOUT = 2 * DIRECT_ACK_WAIT_TIMEOUT
+# Messages kept waiting for a modem ACK before the oldest is resolved as sent
+MODEM_ACK_BACKLOG = 20
 
 
 LoadAction = namedtuple("LoadAction", "mem_addr rec_count retries")
+ALDBWriteResult = namedtuple("ALDBWriteResult", "written failed rolled_back")
 DeviceInfo = namedtuple("DeviceInfo", "address cat subcat firmware")
+CommandResult = namedtuple(
+    "CommandResult", "status message modem_ack_seconds elapsed_seconds"
+)
+
+
+class CommandStatus(Enum):
+    """Outcome of a command sent to a device.
+
+    SENT: Queued to the modem with no ACK expected.
+    MODEM_ACK: Acknowledged by the modem with no direct ACK expected.
+    DIRECT_ACK: Acknowledged by the device.
+    DIRECT_NAK: Refused by the device.
+    TIMEOUT: Acknowledged by the modem but not by the device.
+    """
+
+    SENT = 0
+    MODEM_ACK = 1
+    DIRECT_ACK = 2
+    DIRECT_NAK = 3
+    TIMEOUT = 4
+
+
+class SenderState(Enum):
+    """State of the sender of the messages to a device."""
+
+    IDLE = 0
+    AWAITING_MODEM_ACK = 1
+    AWAITING_DIRECT_ACK = 2
+
+
+class AckTimeout:
+    """Direct ACK timeout of a device learned from the measured round trips.
+
+    The timeout is the smoothed round-trip time from the modem ACK to the
+    direct ACK plus four times its variation, kept between
+    DIRECT_ACK_MIN_TIMEOUT and DIRECT_ACK_WAIT_TIMEOUT. Until a round trip
+    is measured the timeout is DIRECT_ACK_WAIT_TIMEOUT. Each timeout in a
+    row doubles the timeout, up to DIRECT_ACK_WAIT_TIMEOUT, until the next
+    direct ACK.
+    """
+
+    def __init__(self):
+        """Init the AckTimeout class."""
+        self.smoothed_rtt = None
+        self.rtt_variation = None
+        self.samples = 0
+        self.timeouts = 0
+        self._backoff = 1
+
+    @property
+    def timeout(self):
+        """Return the seconds to wait for a direct ACK."""
+        if self.smoothed_rtt is None:
+            return DIRECT_ACK_WAIT_TIMEOUT
+        timeout = max(
+            self.smoothed_rtt + 4 * self.rtt_variation, DIRECT_ACK_MIN_TIMEOUT
+        )
+        return min(timeout * self._backoff, DIRECT_ACK_WAIT_TIMEOUT)
+
+    def observe(self, rtt):
+        """Add the round-trip time of a direct ACK."""
+        if self.smoothed_rtt is None:
+            self.smoothed_rtt = rtt
+            self.rtt_variation = rtt / 2
+        else:
+            self.rtt_variation = 0.75 * self.rtt_variation + 0.25 * abs(
+                self.smoothed_rtt - rtt
+            )
+            self.smoothed_rtt = 0.875 * self.smoothed_rtt + 0.125 * rtt
+        self.samples += 1
+        self._backoff = 1
+
+    def timed_out(self):
+        """Back off after no direct ACK was received in time."""
+        self.timeouts += 1
+        self._backoff *= 2
+
+    def as_dict(self):
+        """Return the round-trip statistics as a dictionary."""
+        return {
+            "timeout": self.timeout,
+            "smoothed_rtt": self.smoothed_rtt,
+            "rtt_variation": self.rtt_variation,
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+        }
+
+
+def _wait_for_modem_ack(pending, msg_info):
+    """Add a message to the messages waiting for a modem ACK."""
+    if len(pending) >= MODEM_ACK_BACKLOG:
+        _set_command_result(pending.popleft(), CommandStatus.SENT)
+    pending.append(msg_info)
+
+
+def _set_command_result(msg_info, status, msg=None):
+    """Resolve the future returned when a command was queued."""
+    result = msg_info.get("result")
+    if result is not None and not result.done():
+        result.set_result(
+            CommandResult(
+                status,
+                msg,
+                msg_info.get("modem_ack_seconds"),
+                time.monotonic() - msg_info["queued"],
+            )
+        )
 
 
 # pylint: disable=unused-argument
@@ -86,6 +206,21 @@ def create_x10(plm, housecode, unitcode, feature):
     return device
 
 
+def _record_matches(expected, actual):
+    """Test if an ALDB record read from a device matches the record written."""
+    if not expected.control_flags.is_in_use:
+        return not actual.control_flags.is_in_use
+    return (
+        actual.control_flags.is_in_use
+        and actual.control_flags.is_controller == expected.control_flags.is_controller
+        and actual.group == expected.group
+        and actual.address == expected.address
+        and actual.data1 == expected.data1
+        and actual.data2 == expected.data2
+        and actual.data3 == expected.data3
+    )
+
+
 def _get_most_recent_message(recent_messages):
     if not recent_messages:
         return None
@@ -119,16 +254,25 @@ class Device:
 
         self._last_communication_received = datetime.datetime(1, 1, 1, 1, 1, 1)
         self._product_data_in_aldb = False
-        self._stateList = StateList()
+        self._stateList = StateList(plm.notifications)
         self._sent_msg_wait_for_directACK = {}
-        self._message_callbacks = MessageCallback()
+        self._sent_msg_wait_for_ACK = deque()
+        # The modem gets the messages of every device so it keeps the
+        # address in its templates
+        if plm is self:
+            self._message_callbacks = MessageCallback()
+        else:
+            self._message_callbacks = MessageCallback(self._address)
         self._aldb = ALDB(self._send_msg, self._plm.loop, self._address)
 
         self._recent_messages = asyncio.Queue(loop=self._plm.loop)
-        self._send_msg_queue = asyncio.Queue(loop=self._plm.loop)
-        self._directACK_received_queue = asyncio.Queue(loop=self._plm.loop)
+        self._send_msg_queue = deque()
+        self._sender_task = None
+        self._sender_state = SenderState.IDLE
+        self._ack_timeout = AckTimeout()
+        self._modem_ack = None
+        self._direct_ack = None
         self._device_info_queue = asyncio.Queue(loop=self._plm.loop)
-        self._send_msg_lock = asyncio.Lock(loop=self._plm.loop)
         self._setup_default_links_lock = asyncio.Lock(loop=self._plm.loop)
         self._device_info_retries = 0
         self._all_link_complete_callback = None
@@ -196,6 +340,16 @@ class Device:
         """Return the device All-Link Database."""
         return self._aldb
 
+    @property
+    def sender_state(self):
+        """Return the SenderState of the messages sent to the device."""
+        return self._sender_state
+
+    @property
+    def ack_timeout(self):
+        """Return the AckTimeout learned from the device round trips."""
+        return self._ack_timeout
+
     # Public Methods
     def async_refresh_state(self):
         """Request each state to provide status update."""
@@ -204,11 +358,9 @@ class Device:
 
     def id_request(self):
         """Request a device ID from a device."""
-        import inspect
-
-        curframe = inspect.currentframe()
-        calframe = inspect.getouterframes(curframe, 2)
-        _LOGGER.debug("caller name: %s", calframe[1][3])
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            # pylint: disable=protected-access
+            _LOGGER.debug("caller name: %s", sys._getframe(1).f_code.co_name)
         msg = StandardSend(self.address, COMMAND_ID_REQUEST_0X10_0X00)
         self._plm.send_msg(msg)
 
@@ -540,6 +692,22 @@ class Device:
         self._aldb.del_record(mem_addr)
         self._aldb.add_loaded_callback(self._aldb_loaded_callback)
 
+    async def write_aldb_records(self, records, rollback=True):
+        """Write a batch of All-Link Database records.
+
+        Parameters:
+            records: List of ALDBRecord objects to write. A record with the
+                     in use flag cleared deletes the record at that memory
+                     address.
+            rollback: If True, restore the prior records when any of the
+                      records in the batch fails to write.
+
+        Returns an ALDBWriteResult with the memory addresses that were
+        written, that failed and that were rolled back.
+        """
+        self._aldb.add_loaded_callback(self._aldb_loaded_callback)
+        return await self._aldb.write_records(records, rollback)
+
     def _handle_aldb_record_received(self, msg):
         self._aldb.record_received(msg)
 
@@ -586,12 +754,12 @@ class Device:
             self._plm, address, cat, subcat, product_key
         )
         if device:
-            if not self._plm.devices[device.id]:
+            if device.id not in self._plm.devices:
                 self._plm.devices[device.id] = device
                 _LOGGER.info("Device with id %s added to device list.", device.id)
             _LOGGER.debug("Total Insteon devices found: %d", len(self._plm.devices))
             self._plm.aldb_device_handled(self._address)
-            self._plm.devices.save_device_info()
+            self._plm.devices.save_device_info(device)
         else:
             _LOGGER.warning(
                 "Device %s not in the Insteon Product Database", Address(address).human
@@ -748,48 +916,50 @@ class Device:
     # Send / Receive message processing
     def receive_message(self, msg):
         """Receive a messages sent to this device."""
-        _LOGGER.debug("Starting Device.receive_message for %s", msg.address.human)
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            _LOGGER.debug("Starting Device.receive_message for %s", msg.address.human)
         if hasattr(msg, "isack") and msg.isack:
-            _LOGGER.debug("Got Message ACK %s", id(msg))
-            if self._sent_msg_wait_for_directACK.get("callback") is not None:
-                _LOGGER.debug("Look for direct ACK")
-                asyncio.ensure_future(self._wait_for_direct_ACK(), loop=self._plm.loop)
-            else:
-                _LOGGER.debug("MSG queue: %s", self._sent_msg_wait_for_directACK)
-                _LOGGER.debug("Message ACK with no callback")
+            if debug:
+                _LOGGER.debug("Got Message ACK %s", id(msg))
+            self._modem_ack_received(msg)
 
         if not self._is_duplicate(msg):
             if (
                 hasattr(msg, "flags")
                 and hasattr(msg.flags, "isDirectACK")
-                and msg.flags.isDirectACK
+                and (msg.flags.isDirectACK or msg.flags.isDirectNAK)
             ):
-                _LOGGER.debug(
-                    "Got Direct ACK message. Already in queue: %d, Queueing %s:%s",
-                    self._directACK_received_queue.qsize(),
-                    id(msg),
-                    msg,
-                )
-                if self._send_msg_lock.locked():
-                    self._directACK_received_queue.put_nowait(msg)
-                else:
+                if debug:
+                    _LOGGER.debug("Got Direct ACK message %s:%s", id(msg), msg)
+                if self._direct_ack is not None and not self._direct_ack.done():
+                    self._sent_msg_wait_for_directACK["direct_ack"] = time.monotonic()
+                    self._direct_ack.set_result(msg)
+                elif debug:
                     _LOGGER.debug("But Direct ACK not expected")
 
             callbacks = self._message_callbacks.get_callbacks_from_message(msg)
+            self._plm.metrics["callbacks_dispatched"].inc(amount=len(callbacks))
             for callback in callbacks:
-                _LOGGER.debug("Scheduling msg callback: %s", callback)
+                if debug:
+                    _LOGGER.debug("Scheduling msg callback: %s", callback)
                 self._plm.loop.call_soon(callback, msg)
         else:
-            _LOGGER.debug("msg is duplicate: %s", id(msg))
+            self._plm.metrics["duplicates_suppressed"].inc()
+            if debug:
+                _LOGGER.debug("msg is duplicate: %s", id(msg))
         self._last_communication_received = datetime.datetime.now()
-        _LOGGER.debug("Ending Device.receive_message")
+        if debug:
+            _LOGGER.debug("Ending Device.receive_message")
 
     def _is_duplicate(self, msg):
         if msg.code not in [
             MESSAGE_STANDARD_MESSAGE_RECEIVED_0X50,
             MESSAGE_EXTENDED_MESSAGE_RECEIVED_0X51,
         ]:
-            self._save_recent_message(msg)
+            # Modem messages such as All-Link records have no flags to compare
+            if hasattr(msg, "flags"):
+                self._save_recent_message(msg)
             return False
 
         recent_messages = []
@@ -853,8 +1023,9 @@ class Device:
         # Address an edge case where two directACKs arrive back to back
         # Keep the first one (see insteonplm issue # 215)
         recent = _get_most_recent_message(recent_messages)
-        for recent_msg in recent_messages:
-            _LOGGER.debug("RCT: %s", recent_msg['msg'])
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            for recent_msg in recent_messages:
+                _LOGGER.debug("RCT: %s", recent_msg['msg'])
         if recent and msg.flags.isDirectACK and recent.flags.isDirectACK:
             _LOGGER.debug("Duplicate direct ACK")
             _LOGGER.debug("TEMP: %s", msg)
@@ -868,68 +1039,115 @@ class Device:
         self._recent_messages.put_nowait(recent_message)
 
     def _send_msg(self, msg, callback=None, on_timeout=False):
+        """Queue a message to the device.
+
+        Returns a future resolved with a CommandResult when the device sends
+        a direct ACK or NAK, or when no direct ACK arrives in time. Messages
+        without a callback do not wait for a direct ACK and resolve when the
+        modem ACKs the message.
+        """
         _LOGGER.debug(
             "Starting %s Device._send_msg: Queuing message", self.address.human
         )
-        msg_info = {"msg": msg, "callback": callback, "on_timeout": on_timeout}
-        self._send_msg_queue.put_nowait(msg_info)
-        asyncio.ensure_future(self._process_send_queue(), loop=self._plm.loop)
+        result = asyncio.Future(loop=self._plm.loop)
+        msg_info = {
+            "msg": msg,
+            "callback": callback,
+            "on_timeout": on_timeout,
+            "result": result,
+            "queued": time.monotonic(),
+        }
+        self._send_msg_queue.append(msg_info)
+        if self._sender_task is None:
+            self._sender_task = asyncio.ensure_future(
+                self._process_send_queue(), loop=self._plm.loop
+            )
         # _LOGGER.debug('Ending Device._send_msg')
+        return result
 
     async def _process_send_queue(self):
+        """Send the queued messages one at a time until the queue is empty.
+
+        Only one sender runs per device. Messages with a callback hold the
+        queue until the modem ACK and then the direct ACK, or its timeout.
+        """
         _LOGGER.debug("Starting %s Device._process_send_queue", self._address.human)
-        await self._send_msg_lock
-        if self._send_msg_lock.locked():
-            _LOGGER.debug("Device %s msg_lock locked", self._address.human)
-        msg_info = await self._send_msg_queue.get()
-        msg = msg_info.get("msg")
-        callback = msg_info.get("callback")
-        self._plm.send_msg(msg)
-        if callback:
-            self._sent_msg_wait_for_directACK = msg_info
-        else:
-            if self._send_msg_lock.locked():
-                self._send_msg_lock.release()
-                _LOGGER.debug("Device %s msg_lock unlocked", self._address.human)
+        try:
+            while self._send_msg_queue:
+                msg_info = self._send_msg_queue.popleft()
+                if msg_info.get("callback"):
+                    await self._send_and_wait_for_direct_ACK(msg_info)
+                else:
+                    self._plm.send_msg(msg_info.get("msg"))
+                    _wait_for_modem_ack(self._sent_msg_wait_for_ACK, msg_info)
+        finally:
+            self._sender_state = SenderState.IDLE
+            self._sender_task = None
         _LOGGER.debug("Ending %s Device._process_send_queue", self._address.human)
 
-    async def _wait_for_direct_ACK(self):
-        _LOGGER.debug("Starting Device._wait_for_direct_ACK")
+    async def _send_and_wait_for_direct_ACK(self, msg_info):
+        self._sent_msg_wait_for_directACK = msg_info
+        self._modem_ack = asyncio.Future(loop=self._plm.loop)
+        self._direct_ack = asyncio.Future(loop=self._plm.loop)
+        self._sender_state = SenderState.AWAITING_MODEM_ACK
+        self._plm.send_msg(msg_info.get("msg"))
         msg = None
-        while True:
-            # wait for an item from the queue
-            try:
-                with async_timeout.timeout(DIRECT_ACK_WAIT_TIMEOUT):
-                    msg = await self._directACK_received_queue.get()
-                    _LOGGER.debug(
-                        "Remaining queue %d, Direct ACK: %s:%s",
-                        self._directACK_received_queue.qsize(),
-                        id(msg),
-                        msg,
-                    )
-                    break
-            except asyncio.TimeoutError:
-                _LOGGER.debug("No direct ACK messages received.")
-                break
-            except CancelledError:
-                break
-
-        # _LOGGER.debug('Holding lock for 10 seconds')
-        # await asyncio.sleep(10, loop=self._plm.loop)
-        _LOGGER.debug("Releasing lock after processing direct ACK")
-        if self._send_msg_lock.locked():
-            self._send_msg_lock.release()
-            _LOGGER.debug("Device %s msg_lock unlocked", self._address.human)
-        if msg or self._sent_msg_wait_for_directACK.get("on_timeout"):
-            callback = self._sent_msg_wait_for_directACK.get("callback", None)
-            if callback is not None:
-                _LOGGER.debug("Scheduling msg directACK callback: %s", callback)
-                callback(msg)
-        self._sent_msg_wait_for_directACK = {}
-        _LOGGER.debug("Ending Device._wait_for_direct_ACK")
+        try:
+            await self._modem_ack
+            self._sender_state = SenderState.AWAITING_DIRECT_ACK
+            with async_timeout.timeout(self._ack_timeout.timeout):
+                msg = await self._direct_ack
+            rtt = max(msg_info["direct_ack"] - msg_info["modem_ack"], 0)
+            self._ack_timeout.observe(rtt)
+            self._plm.metrics["direct_ack_seconds"].observe(rtt)
+        except asyncio.TimeoutError:
+            _LOGGER.debug("No direct ACK messages received.")
+            self._ack_timeout.timed_out()
+            self._plm.metrics["direct_ack_timeouts"].inc()
+        finally:
+            self._modem_ack = None
+            self._direct_ack = None
+            self._sent_msg_wait_for_directACK = {}
+
+        if msg is None:
+            status = CommandStatus.TIMEOUT
+        elif msg.flags.isDirectNAK:
+            _LOGGER.debug("Direct NAK received")
+            status = CommandStatus.DIRECT_NAK
+        else:
+            status = CommandStatus.DIRECT_ACK
+        ack = msg if status == CommandStatus.DIRECT_ACK else None
+        if ack or msg_info.get("on_timeout"):
+            callback = msg_info.get("callback", None)
+            _LOGGER.debug("Scheduling msg directACK callback: %s", callback)
+            callback(ack)
+        _set_command_result(msg_info, status, msg)
+
+    def _modem_ack_received(self, msg):
+        """Record the modem ACK of a message sent to the device."""
+        msg_info = self._sent_msg_wait_for_directACK
+        sent = msg_info.get("msg")
+        if sent is not None and sent.matches_pattern(msg):
+            msg_info["modem_ack"] = time.monotonic()
+            msg_info["modem_ack_seconds"] = msg_info["modem_ack"] - msg_info["queued"]
+            if not self._modem_ack.done():
+                self._modem_ack.set_result(msg)
+            return
+        for msg_info in self._sent_msg_wait_for_ACK:
+            if msg_info["msg"].matches_pattern(msg):
+                self._sent_msg_wait_for_ACK.remove(msg_info)
+                msg_info["modem_ack_seconds"] = (
+                    time.monotonic() - msg_info["queued"]
+                )
+                _set_command_result(msg_info, CommandStatus.MODEM_ACK)
+                return
 
     def _aldb_loaded_callback(self):
-        self._plm.devices.save_device_info()
+        duration = self._aldb.load_metrics.duration
+        if duration is not None:
+            self._plm.metrics["aldb_load_seconds"].observe(duration)
+        self._plm.clear_scene_cache()
+        self._plm.devices.save_device_info(self)
 
 
 # pylint: disable=too-many-instance-attributes
@@ -944,8 +1162,9 @@ class X10Device:
         self._model = ""
         self._aldb = ALDB(None, None, self._address, version=ALDBVersion.Null)
         self._message_callbacks = MessageCallback()
-        self._stateList = StateList()
+        self._stateList = StateList(plm.notifications)
         self._send_msg_lock = asyncio.Lock(loop=self._plm.loop)
+        self._sent_msg_wait_for_ACK = deque()
         self._last_communication_received = datetime.datetime(1, 1, 1, 1, 1, 1)
 
     @property
@@ -986,6 +1205,10 @@ class X10Device:
             _LOGGER.debug("Got Message ACK")
             if self._send_msg_lock.locked():
                 self._send_msg_lock.release()
+            if self._sent_msg_wait_for_ACK:
+                msg_info = self._sent_msg_wait_for_ACK.popleft()
+                msg_info["modem_ack_seconds"] = time.monotonic() - msg_info["queued"]
+                _set_command_result(msg_info, CommandStatus.MODEM_ACK)
         callbacks = self._message_callbacks.get_callbacks_from_message(msg)
         _LOGGER.debug("Found %d callbacks for msg %s", len(callbacks), msg)
         for callback in callbacks:
@@ -999,13 +1222,21 @@ class X10Device:
         # Nothing actually needed here.
 
     def _send_msg(self, msg, wait_ack=True):
+        """Queue a message to the device.
+
+        Returns a future resolved with a CommandResult when the modem ACKs
+        the message, or when the message is sent if no ACK is expected.
+        """
         _LOGGER.debug("Starting X10Device._send_msg")
+        result = asyncio.Future(loop=self._plm.loop)
+        msg_info = {"msg": msg, "result": result, "queued": time.monotonic()}
         asyncio.ensure_future(
-            self._process_send_queue(msg, wait_ack), loop=self._plm.loop
+            self._process_send_queue(msg, wait_ack, msg_info), loop=self._plm.loop
         )
         _LOGGER.debug("Ending x10Device._send_msg")
+        return result
 
-    async def _process_send_queue(self, msg, wait_ack):
+    async def _process_send_queue(self, msg, wait_ack, msg_info):
         _LOGGER.debug("Starting x10Device._process_send_queue")
         await self._send_msg_lock
         if self._send_msg_lock.locked():
@@ -1016,15 +1247,24 @@ class X10Device:
             _LOGGER.debug("No directACK wait")
             _LOGGER.debug("Releasing lock")
             self._send_msg_lock.release()
+            _set_command_result(msg_info, CommandStatus.SENT)
+        else:
+            _wait_for_modem_ack(self._sent_msg_wait_for_ACK, msg_info)
         _LOGGER.debug("Ending x10Device._process_send_queue")
 
 
 class StateList:
-    """Internal class used to hold a list of device states."""
+    """Internal class used to hold a list of device states.
 
-    def __init__(self):
+    Parameters:
+        dispatcher: (optional) NotificationDispatcher set on every state
+        added to the list.
+    """
+
+    def __init__(self, dispatcher=None):
         """Init the StateList Class."""
         self._stateList = {}
+        self._dispatcher = dispatcher
 
     def __len__(self):
         """Get the number of states in the StateList."""
@@ -1044,6 +1284,7 @@ class StateList:
         if not isinstance(state, State):
             raise ValueError
 
+        state.dispatcher = self._dispatcher
         self._stateList[group] = state
 
     def __repr__(self):
@@ -1053,9 +1294,9 @@ class StateList:
 
     def add(self, plm, device, stateType, stateName, group, defaultValue=None):
         """Add a state to the StateList."""
-        self._stateList[group] = stateType(
-            plm, device, stateName, group, defaultValue=defaultValue
-        )
+        state = stateType(plm, device, stateName, group, defaultValue=defaultValue)
+        state.dispatcher = self._dispatcher
+        self._stateList[group] = state
 
 
 class ALDBRecord:
@@ -1160,11 +1401,11 @@ class ALDBRecord:
             {
                 "d3": self.memhi,
                 "d4": self.memlo,
-                "d6": self.control_flags,
+                "d6": self.control_flags.byte,
                 "d7": self.group,
-                "d8": self.address.bytes[2],
+                "d8": self.address.bytes[0],
                 "d9": self.address.bytes[1],
-                "d10": self.address.bytes[0],
+                "d10": self.address.bytes[2],
                 "d11": self.data1,
                 "d12": self.data2,
                 "d13": self.data3,
@@ -1256,6 +1497,160 @@ class ControlFlags:
         return flags
 
 
+class ALDBReadStats:
+    """All-Link Database range read statistics for a device.
+
+    The read window is the number of records requested in one range read.
+    The window doubles after each successful read and is cut in half after
+    each read that times out. Devices that time out often keep a small
+    window for the next load.
+    """
+
+    def __init__(self, window=ALDB_READ_WINDOW):
+        """Init the ALDBReadStats class."""
+        self._window = window
+        self._reads = 0
+        self._timeouts = 0
+
+    @property
+    def window(self):
+        """Return the number of records to request in a range read."""
+        return self._window
+
+    @window.setter
+    def window(self, val: int):
+        """Set the number of records to request in a range read."""
+        self._window = min(max(int(val), 1), ALDB_READ_WINDOW_MAX)
+
+    @property
+    def reads(self):
+        """Return the number of successful reads."""
+        return self._reads
+
+    @property
+    def timeouts(self):
+        """Return the number of reads that timed out."""
+        return self._timeouts
+
+    @property
+    def is_flaky(self):
+        """Return True if the device has been unreliable in the past."""
+        return self._window < ALDB_READ_WINDOW
+
+    def read_succeeded(self):
+        """Record a successful read and grow the read window."""
+        self._reads += 1
+        self.window = self._window * 2
+
+    def read_timed_out(self):
+        """Record a read timeout and shrink the read window."""
+        self._timeouts += 1
+        self.window = self._window // 2
+
+
+class ALDBLoadMetrics:
+    """All-Link Database load metrics for a device.
+
+    Metrics cover the most recent load of the ALDB from the first read
+    request until the load finishes as LOADED, PARTIAL or FAILED.
+    """
+
+    def __init__(self, started=None):
+        """Init the ALDBLoadMetrics class."""
+        self._started = started
+        self._first_record = None
+        self._finished = None
+        self._attempts = 0
+        self._records = 0
+        self._retries = {}
+        self._load_paths = []
+        self._status = None
+
+    @property
+    def attempts(self):
+        """Return the number of read requests sent."""
+        return self._attempts
+
+    @property
+    def records(self):
+        """Return the number of records received."""
+        return self._records
+
+    @property
+    def retries(self):
+        """Return the number of retries for each memory address."""
+        return self._retries
+
+    @property
+    def load_paths(self):
+        """Return the next read paths taken after each read request."""
+        return self._load_paths
+
+    @property
+    def status(self):
+        """Return the ALDB status the load finished with."""
+        return self._status
+
+    @property
+    def duration(self):
+        """Return the number of seconds the load took."""
+        if self._started is None or self._finished is None:
+            return None
+        return self._finished - self._started
+
+    @property
+    def time_to_first_record(self):
+        """Return the number of seconds until the first record arrived."""
+        if self._started is None or self._first_record is None:
+            return None
+        return self._first_record - self._started
+
+    @property
+    def records_per_second(self):
+        """Return the rate records were received at."""
+        if not self.duration:
+            return None
+        return self._records / self.duration
+
+    def read_sent(self, mem_addr, retry):
+        """Record a read request."""
+        self._attempts += 1
+        if retry:
+            self._retries[mem_addr] = self._retries.get(mem_addr, 0) + 1
+
+    def record_received(self, now):
+        """Record a record response."""
+        self._records += 1
+        if self._first_record is None:
+            self._first_record = now
+
+    def path_taken(self, load_path):
+        """Record the next read path chosen after a read request."""
+        self._load_paths.append(load_path)
+
+    def finished(self, now, status):
+        """Record the end of the load."""
+        if self._started is not None and self._finished is None:
+            self._finished = now
+            self._status = status
+
+    def as_dict(self):
+        """Return the metrics as a dictionary."""
+        status = None
+        if self._status is not None:
+            status = self._status.name
+        return {
+            "status": status,
+            "attempts": self._attempts,
+            "records": self._records,
+            "retries": dict(self._retries),
+            "load_paths": list(self._load_paths),
+            "duration": self.duration,
+            "time_to_first_record": self.time_to_first_record,
+            "records_per_second": self.records_per_second,
+        }
+
+
 class ALDBStatus(Enum):
     """All-Link Database load status."""
 
@@ -1296,6 +1691,9 @@ class ALDB:
         self._rec_mgr_lock = asyncio.Lock(loop=self._loop)
         self._load_action = LoadAction(0, 0, 0)
         self._cb_aldb_loaded = []
+        self._verify_queue = None
+        self._read_stats = ALDBReadStats()
+        self._load_metrics = ALDBLoadMetrics()
 
     def __len__(self):
         """Return the number of devices in the ALDB."""
@@ -1339,6 +1737,16 @@ class ALDB:
         """Return the ALDB version."""
         return self._version
 
+    @property
+    def read_stats(self):
+        """Return the range read statistics of the device."""
+        return self._read_stats
+
+    @property
+    def load_metrics(self):
+        """Return the metrics of the most recent ALDB load."""
+        return self._load_metrics
+
     def pop(self, key):
         """Pop and remove an item from the ALDB."""
         return self._records.pop(key)
@@ -1354,16 +1762,26 @@ class ALDB:
             self._status = ALDBStatus.LOADED
             _LOGGER.debug("Device has no ALDB")
         else:
+            if self._status != ALDBStatus.LOADING:
+                self._load_metrics = ALDBLoadMetrics(self._loop.time())
             self._status = ALDBStatus.LOADING
             _LOGGER.debug("Tring to lock from load")
             await self._rec_mgr_lock
             _LOGGER.debug("load yielded lock")
 
-            mem_hi = mem_addr >> 8
-            mem_lo = mem_addr & 0xFF
+            if not rec_count and not retry and self._read_stats.is_flaky:
+                # Skip the all records read for devices that rarely finish it
+                mem_addr = self._next_address(mem_addr)
+                rec_count = self._read_count(mem_addr)
+
             log_output = "ALDB read"
             max_retries = 0
-            if rec_count:
+            if rec_count > 1:
+                max_retries = ALDB_RECORD_RETRIES
+                log_output = "{:s} {:d} records from {:04x}".format(
+                    log_output, rec_count, mem_addr
+                )
+            elif rec_count:
                 max_retries = ALDB_RECORD_RETRIES
                 if mem_addr == 0x0000:
                     log_output = "{:s} first record".format(log_output)
@@ -1378,20 +1796,11 @@ class ALDB:
                     log_output, retry, max_retries
                 )
             _LOGGER.info(log_output)
-            userdata = Userdata(
-                {"d1": 0, "d2": 0, "d3": mem_hi, "d4": mem_lo, "d5": rec_count}
-            )
-            msg = ExtendedSend(
-                self._address,
-                COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
-                userdata=userdata,
-            )
-            msg.set_checksum()
+            self._load_action = LoadAction(mem_addr, rec_count, retry)
+            self._load_metrics.read_sent(mem_addr, retry)
+            msg = self._create_read_msg(mem_addr, rec_count)
             self._send_method(msg, self._handle_read_aldb_ack, True)
 
-            if not self._load_action:
-                self._set_load_action(mem_addr, rec_count, -1, False)
-
     def get(self, mem_addr):
         """Return an All-Link record at a memory address."""
         return self._records.get(mem_addr)
@@ -1408,7 +1817,7 @@ class ALDB:
             if rec.control_flags.is_available:
                 unused.append(mem_addr)
         for mem_addr in unused:
-            self._records.pop(mem_addr)
+            self.pop(mem_addr)
 
     # pylint: disable=too-many-locals
     def write_record(
@@ -1429,37 +1838,12 @@ class ALDB:
         else:
             self._prior_status = self._status
             self._status = ALDBStatus.LOADING
-            mem_hi = mem_addr >> 8
-            mem_lo = mem_addr & 0xFF
             controller = mode == "c"
             control_flag = ControlFlags(True, controller, True, False, False)
-            addr = Address(target)
-            addr_lo = addr.bytes[0]
-            addr_mid = addr.bytes[1]
-            addr_hi = addr.bytes[2]
-            userdata = Userdata(
-                {
-                    "d1": 0,
-                    "d2": 0x02,
-                    "d3": mem_hi,
-                    "d4": mem_lo,
-                    "d5": 0x08,
-                    "d6": control_flag.byte,
-                    "d7": group,
-                    "d8": addr_lo,
-                    "d9": addr_mid,
-                    "d10": addr_hi,
-                    "d11": data1,
-                    "d12": data2,
-                    "d13": data3,
-                }
+            record = ALDBRecord(
+                mem_addr, control_flag.byte, group, target, data1, data2, data3
             )
-            msg = ExtendedSend(
-                self._address,
-                COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
-                userdata=userdata,
-            )
-            msg.set_checksum()
+            msg = self._create_write_msg(record)
             _LOGGER.debug("writing message %s", msg)
             self._send_method(msg, self._handle_write_aldb_ack, True)
             self._load_action = LoadAction(mem_addr, 1, 0)
@@ -1475,45 +1859,91 @@ class ALDB:
         else:
             self._prior_status = self._status
             self._status = ALDBStatus.LOADING
-            mem_hi = mem_addr >> 8
-            mem_lo = mem_addr & 0xFF
             controller = record.control_flags.is_controller
             control_flag = ControlFlags(False, controller, True, False, False)
-            addr = record.address
-            addr_lo = addr.bytes[0]
-            addr_mid = addr.bytes[1]
-            addr_hi = addr.bytes[2]
-            group = record.group
-            data1 = record.data1
-            data2 = record.data2
-            data3 = record.data3
-            userdata = Userdata(
-                {
-                    "d1": 0,
-                    "d2": 0x02,
-                    "d3": mem_hi,
-                    "d4": mem_lo,
-                    "d5": 0x08,
-                    "d6": control_flag.byte,
-                    "d7": group,
-                    "d8": addr_lo,
-                    "d9": addr_mid,
-                    "d10": addr_hi,
-                    "d11": data1,
-                    "d12": data2,
-                    "d13": data3,
-                }
-            )
-            msg = ExtendedSend(
-                self._address,
-                COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
-                userdata=userdata,
+            record = ALDBRecord(
+                mem_addr,
+                control_flag.byte,
+                record.group,
+                record.address,
+                record.data1,
+                record.data2,
+                record.data3,
             )
-            msg.set_checksum()
+            msg = self._create_write_msg(record)
             _LOGGER.debug("writing message %s", msg)
             self._send_method(msg, self._handle_write_aldb_ack, True)
             self._load_action = LoadAction(mem_addr, 1, 0)
 
+    async def write_records(self, records, rollback=True):
+        """Write a set of All-Link database records as one transaction.
+
+        The records are written from the highest memory address to the lowest
+        so the database is filled in the same order the device reads it.
+        Writes are queued back to back and confirmed with a single range read
+        once all writes have been acknowledged. If any record fails to write
+        and rollback is True the records that were written are restored to
+        their prior values.
+
+        Returns an ALDBWriteResult of memory addresses.
+        """
+        changes = {}
+        for record in records:
+            changes[record.mem_addr] = record
+        if not changes:
+            return ALDBWriteResult([], [], [])
+        if not (self._have_first_record() and self._have_last_record()):
+            _LOGGER.error(
+                "Must load the Insteon All-Link Database before " "writing to it"
+            )
+            return ALDBWriteResult([], sorted(changes, reverse=True), [])
+
+        await self._rec_mgr_lock.acquire()
+        self._prior_status = self._status
+        self._status = ALDBStatus.LOADING
+        prior_records = {}
+        for mem_addr in changes:
+            prior_records[mem_addr] = self._records.get(mem_addr)
+
+        ordered = [changes[mem_addr] for mem_addr in sorted(changes, reverse=True)]
+        acked = await self._send_write_batch(ordered)
+        verified = await self._verify_records(ordered)
+
+        written = []
+        failed = []
+        for record in ordered:
+            if acked.get(record.mem_addr) and verified.get(record.mem_addr):
+                written.append(record.mem_addr)
+            else:
+                failed.append(record.mem_addr)
+
+        rolled_back = []
+        if failed and written and rollback:
+            _LOGGER.warning(
+                "Device %s failed to write %d All-Link records, rolling back",
+                self._address.human,
+                len(failed),
+            )
+            restore = [
+                prior_records[mem_addr]
+                for mem_addr in written
+                if prior_records[mem_addr] is not None
+            ]
+            acked = await self._send_write_batch(restore)
+            for record in restore:
+                if acked.get(record.mem_addr):
+                    self._records[record.mem_addr] = record
+                    rolled_back.append(record.mem_addr)
+            written = [mem_addr for mem_addr in written if mem_addr not in rolled_back]
+
+        if self._rec_mgr_lock.locked():
+            self._rec_mgr_lock.release()
+        if failed:
+            self._load_finished(ALDBStatus.PARTIAL)
+        else:
+            self._load_finished(self._prior_status)
+        return ALDBWriteResult(written, failed, rolled_back)
+
     def find_matching_link(self, mode, group, addr):
         """Find a matching link in the current device.
 
@@ -1547,9 +1977,16 @@ class ALDB:
 
         _LOGGER.debug("ALDB Record: %s", rec)
 
+        if self._verify_queue is not None:
+            self._verify_queue.put_nowait(rec)
+            return
+
+        self._load_metrics.record_received(self._loop.time())
         rec_count = self._load_action.rec_count
         if rec_count == 1 or self._have_all_records():
             release_lock = True
+        elif rec_count > 1 and self._have_range(self._load_action.mem_addr, rec_count):
+            release_lock = True
 
         if self._is_first_record(rec):
             self._mem_addr = rec.mem_addr
@@ -1605,6 +2042,88 @@ class ALDB:
             )
             self._status = self._prior_status
 
+    def _create_read_msg(self, mem_addr, rec_count):
+        mem_hi = mem_addr >> 8
+        mem_lo = mem_addr & 0xFF
+        userdata = Userdata(
+            {"d1": 0, "d2": 0, "d3": mem_hi, "d4": mem_lo, "d5": rec_count}
+        )
+        msg = ExtendedSend(
+            self._address, COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00, userdata=userdata
+        )
+        msg.set_checksum()
+        return msg
+
+    def _create_write_msg(self, record):
+        userdata = record.to_userdata()
+        userdata["d1"] = 0
+        userdata["d2"] = 0x02
+        userdata["d5"] = 0x08
+        msg = ExtendedSend(
+            self._address, COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00, userdata=userdata
+        )
+        msg.set_checksum()
+        return msg
+
+    async def _send_write_batch(self, records):
+        """Queue all record writes and wait for the device to confirm them."""
+        pending = {}
+        for record in records:
+            future = self._loop.create_future()
+            msg = self._create_write_msg(record)
+            _LOGGER.debug("writing message %s", msg)
+            self._send_method(msg, partial(self._handle_batch_write_ack, future), True)
+            pending[record.mem_addr] = future
+        if pending:
+            await asyncio.wait(
+                list(pending.values()), timeout=ALDB_WRITE_TIMEOUT * len(pending)
+            )
+        acked = {}
+        for mem_addr, future in pending.items():
+            acked[mem_addr] = future.done() and future.result()
+        return acked
+
+    @staticmethod
+    def _handle_batch_write_ack(future, msg):
+        if not future.done():
+            future.set_result(msg is not None)
+
+    async def _verify_records(self, records):
+        """Read back the memory range of a write batch in one request."""
+        verified = {}
+        if not records:
+            return verified
+        expected = {}
+        for record in records:
+            expected[record.mem_addr] = record
+        first_mem_addr = max(expected)
+        rec_count = (first_mem_addr - min(expected)) // 8 + 1
+
+        _LOGGER.info(
+            "ALDB read %d records from %04x to verify write",
+            rec_count,
+            first_mem_addr,
+        )
+        self._verify_queue = asyncio.Queue(loop=self._loop)
+        msg = self._create_read_msg(first_mem_addr, rec_count)
+        self._send_method(msg, None, False)
+        try:
+            with async_timeout.timeout(ALDB_RECORD_TIMEOUT):
+                while len(verified) < len(expected):
+                    rec = await self._verify_queue.get()
+                    if rec.mem_addr in expected:
+                        verified[rec.mem_addr] = _record_matches(
+                            expected[rec.mem_addr], rec
+                        )
+        except asyncio.TimeoutError:
+            _LOGGER.debug(
+                "ALDB verify read timeout with %d of %d records",
+                len(verified),
+                len(expected),
+            )
+        self._verify_queue = None
+        return verified
+
     async def _read_timeout_manager(self):
         _LOGGER.debug("_read_timeout_manager started.")
         read_complete = False
@@ -1624,6 +2143,10 @@ class ALDB:
                 and self._have_first_record()
             ):
                 read_complete = False
+            elif self._load_action.rec_count > 1:
+                read_complete = self._have_range(
+                    self._load_action.mem_addr, self._load_action.rec_count
+                )
             elif self.get(self._load_action.mem_addr):
                 read_complete = True
             else:
@@ -1667,6 +2190,8 @@ class ALDB:
 
     def _load_finished(self, status):
         self._status = status
+        if self._loop is not None:
+            self._load_metrics.finished(self._loop.time(), status)
         while self._cb_aldb_loaded:
             _LOGGER.debug("Calling aldb loaded callback")
             callback = self._cb_aldb_loaded.pop()
@@ -1675,45 +2200,58 @@ class ALDB:
         self._load_action = LoadAction(0, 0, 0)
 
     def _set_load_action(self, mem_addr, rec_count, retries, read_complete=False):
-        """Calculate the next record to read.
-
-        If the last record was successful and one record was being read then
-        look for the next record until we get to the high water mark.
+        """Calculate the next record range to read.
 
-        If the last read was successful and all records were being read then
-        look for the first record.
+        If the last read was successful then read the next range of records,
+        starting at the first missing record, until we get to the high water
+        mark. The range grows with each successful read.
 
-        if the last read was unsuccessful and one record was being read then
-        repeat the last read until max retries
+        If the last read was unsuccessful and a range of records was being
+        read then shrink the range and read again from the first missing
+        record until max retries.
 
         If the last read was unsuccessful and all records were being read then
-        repeat the last read until max retries or look for the first record.
+        repeat the last read until max retries or, if some records were
+        received, read the missing records in ranges.
         """
         if self._have_all_records():
+            load_path = "complete"
             mem_addr = None
             rec_count = 0
             retries = 0
         elif read_complete:
+            load_path = "next_range"
             retries = 0
             if rec_count:
-                mem_addr = self._next_address(mem_addr)
-            else:
-                mem_addr = self._next_address(mem_addr)
-                rec_count = 1
-                retries = 0
+                self._read_stats.read_succeeded()
+            mem_addr = self._next_address(mem_addr)
+            rec_count = self._read_count(mem_addr)
         elif rec_count and retries < ALDB_RECORD_RETRIES:
+            load_path = "retry_range"
+            self._read_stats.read_timed_out()
             retries = retries + 1
-        elif not rec_count and retries < ALDB_ALL_RECORD_RETRIES:
+            mem_addr = self._next_address(mem_addr)
+            rec_count = self._read_count(mem_addr)
+        elif (
+            not rec_count
+            and not self._records
+            and retries < ALDB_ALL_RECORD_RETRIES
+        ):
+            load_path = "retry_all"
             retries = retries + 1
-        elif not rec_count and retries >= ALDB_ALL_RECORD_RETRIES:
+        elif not rec_count:
+            load_path = "all_to_range"
+            self._read_stats.read_timed_out()
             mem_addr = self._next_address(mem_addr)
-            rec_count = 1
+            rec_count = self._read_count(mem_addr)
             retries = 0
         else:
+            load_path = "give_up"
             mem_addr = None
             rec_count = 0
             retries = 0
 
+        self._load_metrics.path_taken(load_path)
         self._load_action = LoadAction(mem_addr, rec_count, retries)
         if mem_addr is not None:
             _LOGGER.debug(
@@ -1723,6 +2261,26 @@ class ALDB:
                 self._load_action.retries,
             )
 
+    def _read_count(self, mem_addr):
+        """Return the number of records to request from a memory address.
+
+        The first record is always read on its own since the device reports
+        it from memory address 0x0000.
+        """
+        if mem_addr is None or mem_addr == 0x0000:
+            return 1
+        return self._read_stats.window
+
+    def _have_range(self, mem_addr, rec_count):
+        """Test if all records of a range read were received."""
+        for index in range(rec_count):
+            rec = self.get(mem_addr - 8 * index)
+            if not rec:
+                return False
+            if rec.control_flags.is_high_water_mark:
+                break
+        return True
+
     def _next_address(self, mem_addr):
         if self._have_first_record() and mem_addr == 0x0000:
             mem_addr = self._mem_addr
@@ -1784,3 +2342,116 @@ class ALDB:
                     have_all_recs = False
                     break
         return have_all_recs
+
+
+class ModemALDB(ALDB):
+    """Represents the All-Link database of the modem.
+
+    Records are keyed by their position in the modem database and indexed
+    by device address and by group so links can be found without scanning
+    the database.
+    """
+
+    def __init__(self, send_method, loop, address):
+        """Instantiate the ModemALDB object."""
+        super().__init__(send_method, loop, address)
+        self._by_address = {}
+        self._by_group = {}
+
+    def __setitem__(self, mem_addr, record):
+        """Add or Update a record in the modem ALDB."""
+        if mem_addr in self._records:
+            self._unindex(mem_addr)
+        super().__setitem__(mem_addr, record)
+        self._by_address.setdefault(record.address.id, set()).add(mem_addr)
+        self._by_group.setdefault(record.group, set()).add(mem_addr)
+
+    def pop(self, key):
+        """Pop and remove a record from the modem ALDB."""
+        self._unindex(key)
+        return super().pop(key)
+
+    def clear(self):
+        """Remove all records."""
+        super().clear()
+        self._by_address.clear()
+        self._by_group.clear()
+
+    def find(self, address=None, group=None, is_controller=None):
+        """Return the records in use that match an address and group.
+
+        Parameters:
+            address: Device address of the link or None for any address.
+            group: All-Link group of the link or None for any group.
+            is_controller: True for controller records, False for responder
+                           records or None for both.
+        """
+        if address is not None:
+            keys = self._by_address.get(Address(address).id, set())
+            if group is not None:
+                keys = keys & self._by_group.get(group, set())
+        elif group is not None:
+            keys = self._by_group.get(group, set())
+        else:
+            keys = self._records.keys()
+        records = []
+        for mem_addr in sorted(keys):
+            rec = self._records[mem_addr]
+            if not rec.control_flags.is_in_use:
+                continue
+            if is_controller is not None and (
+                rec.control_flags.is_controller != is_controller
+            ):
+                continue
+            records.append(rec)
+        return records
+
+    def has_link(self, address, group=None):
+        """Test if the modem has a link to a device."""
+        return bool(self.find(address, group))
+
+    def manage_record(
+        self, control_code, control_flags, group, address, data1, data2, data3
+    ):
+        """Apply a confirmed 0x6F Manage All-Link Record change.
+
+        The change is applied the same way the modem applies it to its own
+        database so the index stays current without reloading the database.
+        """
+        address = Address(address)
+        if control_code == MANAGE_ALL_LINK_ADD_CONTROLLER_0X40:
+            found = self.find(address, group, True)
+            control_flags = control_flags | 0xC0
+        elif control_code == MANAGE_ALL_LINK_ADD_RESPONDER_0X41:
+            found = self.find(address, group, False)
+            control_flags = (control_flags | 0x80) & 0xBF
+        elif control_code in [
+            MANAGE_ALL_LINK_MODIFY_FIRST_FOUND_0X20,
+            MANAGE_ALL_LINK_DELETE_FIRST_FOUND_0X80,
+        ]:
+            found = self.find(address, group)
+            if not found:
+                return
+        else:
+            return
+
+        if found:
+            mem_addr = found[0].mem_addr
+        elif self._records:
+            mem_addr = max(self._records) + 1
+        else:
+            mem_addr = 0
+
+        if control_code == MANAGE_ALL_LINK_DELETE_FIRST_FOUND_0X80:
+            self.pop(mem_addr)
+        else:
+            self[mem_addr] = ALDBRecord(
+                mem_addr, control_flags, group, address, data1, data2, data3
+            )
+
+    def _unindex(self, mem_addr):
+        rec = self._records.get(mem_addr)
+        if rec is None:
+            return
+        self._by_address.get(rec.address.id, set()).discard(mem_addr)
+        self._by_group.get(rec.group, set()).discard(mem_addr)
@@ -54,6 +54,22 @@ Product = collections.namedtuple(
 
 X10Product = collections.namedtuple("X10Product", "feature deviceclass")
 
+
+def _index_products(products):
+    """Index the products for lookup by cat and subcat.
+
+    Returns a dictionary of (cat, subcat) to the last matching product and
+    a dictionary of cat to the first generic product of the category.
+    """
+    product_index = {}
+    category_index = {}
+    for product in products:
+        product_index[(product.cat, product.subcat)] = product
+        if product.subcat is None:
+            category_index.setdefault(product.cat, product)
+    return product_index, category_index
+
+
 # flake8: noqa
 class IPDB:
     """Embodies the INSTEON Product Database static data and access methods."""
@@ -363,6 +379,9 @@ class IPDB:
         X10Product("alllightsoff", X10AllLightsOff),
     ]
 
+    _product_index, _category_index = _index_products(_products)
+    _x10_index = {product.feature: product for product in _x10_products}
+
     def __len__(self):
         """Return the length of the product database."""
         return len(self._products) + len(self._x10_products)
@@ -376,20 +395,14 @@ class IPDB:
         """Return an item from the product database."""
         cat, subcat = key
 
-        device_product = None
-
-        for product in self._products:
-            if cat == product.cat and subcat == product.subcat:
-                device_product = product
+        device_product = self._product_index.get((cat, subcat))
 
         # We failed to find a device in the database, so we will make a best
         # guess from the cat and return the generic class
         #
 
         if not device_product:
-            for product in self._products:
-                if cat == product.cat and product.subcat is None:
-                    return product
+            device_product = self._category_index.get(cat)
 
         # We did not find the device or even a generic device of that category
         if not device_product:
@@ -404,10 +417,7 @@ class IPDB:
         - OnOff
         - Dimmable
         """
-        x10_product = None
-        for product in self._x10_products:
-            if feature.lower() == product.feature:
-                x10_product = product
+        x10_product = self._x10_index.get(feature.lower())
 
         if not x10_product:
             x10_product = X10Product(feature, None)
@@ -1,26 +1,44 @@
 """Module to maintain PLM state information and network interface."""
 
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import json
 import logging
 
 from insteonplm.address import Address
 import insteonplm.devices
 from insteonplm.devices import Device, X10Device
+from insteonplm.storage import create_store
 
 __all__ = "ALDB"
 _LOGGER = logging.getLogger(__name__)
-DEVICE_INFO_FILE = "insteon_plm_device_info.dat"
+DEVICE_INFO_SAVE_DELAY = 5
+DEVICE_INFO_LOAD_BATCH = 50
 
 
 # pylint: disable=too-many-instance-attributes
 class LinkedDevices:
     """Class holds and maintains the ALL-Link Database from the PLM device."""
 
-    def __init__(self, loop=None, workdir=None):
-        """Instantiate the ALL-Link Database object."""
+    def __init__(self, loop=None, workdir=None, storage="json", lazy=False):
+        """Instantiate the ALL-Link Database object.
+
+        Parameters:
+            loop: asyncio event loop.
+            workdir: Directory where device information is saved or None to
+                     not save device information.
+            storage: Device information storage type, `json` or `sqlite`.
+            lazy: If True, devices from the saved device information are
+                  only created when they are first used.
+        """
         self._loop = loop
-        self._workdir = workdir
+        self._lazy = lazy
+        self._plm = None
+        self._stubs = set()
+        self._store = None
+        if workdir is not None:
+            self._store = create_store(storage, workdir)
 
         self._state = "empty"
         self._devices = {}
@@ -28,18 +46,32 @@ class LinkedDevices:
         self._overrides = {}
         self._saved_devices = {}
 
+        self._device_info = {}
+        self._dirty_devices = set()
+        self._save_handle = None
+        self._executor = None
+
     def __len__(self):
         """Return the number of devices in the ALDB."""
-        return len(self._devices)
+        return len(self._devices) + len(self._stubs)
 
     def __iter__(self):
         """Iterate through each ALDB device record."""
-        for device in self._devices:
+        for device in list(self._devices):
             yield device
+        for device in list(self._stubs):
+            yield device
+
+    def __contains__(self, address):
+        """Test if a device is known without creating it."""
+        return address in self._devices or address in self._stubs
 
     def __getitem__(self, address):
         """Fetch a device from the ALDB."""
-        return self._devices.get(address, None)
+        device = self._devices.get(address, None)
+        if device is None and address in self._stubs:
+            device = self._create_saved_device(address)
+        return device
 
     def __setitem__(self, key, device):
         """Add or Update a device in the ALDB."""
@@ -93,6 +125,20 @@ class LinkedDevices:
         """Set the ALDB load state."""
         self._state = val
 
+    def state_snapshot(self):
+        """Return the cached state values of every device.
+
+        Returns a dictionary of device address to a dictionary of group to
+        state value. Values are read without requesting a refresh, so states
+        not known yet are None, and devices from the saved device
+        information that were not used yet are not created.
+        """
+        snapshot = {}
+        for addr, device in list(self._devices.items()):
+            states = device.states
+            snapshot[addr] = {group: states[group].cached_value for group in states}
+        return snapshot
+
     def add_device_callback(self, callback):
         """Register a callback to be invoked when a new device appears."""
         _LOGGER.debug("Added new callback %s ", callback)
@@ -136,30 +182,19 @@ class LinkedDevices:
         return override
 
     def add_known_devices(self, plm):
-        """Add devices from the saved devices or from the device overrides."""
-        from insteonplm.devices import ALDBStatus
+        """Add devices from the saved devices or from the device overrides.
 
+        In lazy mode saved devices without overrides are only registered
+        and are created the first time they are fetched.
+        """
+        self._plm = plm
         for addr in self._saved_devices:
-            if not self._devices.get(addr):
-                saved_device = self._saved_devices.get(Address(addr).id, {})
-                cat = saved_device.get("cat")
-                subcat = saved_device.get("subcat")
-                product_key = saved_device.get("firmware")
-                product_key = saved_device.get("product_key", product_key)
-                device = self.create_device_from_category(
-                    plm, addr, cat, subcat, product_key
-                )
-                if device:
-                    _LOGGER.debug(
-                        "Device with id %s added to device list "
-                        "from saved device data.",
-                        addr,
-                    )
-                    aldb_status = saved_device.get("aldb_status", 0)
-                    device.aldb.status = ALDBStatus(aldb_status)
-                    aldb = saved_device.get("aldb", {})
-                    device.aldb.load_saved_records(aldb_status, aldb)
-                    self[addr] = device
+            if addr in self:
+                continue
+            if self._lazy and not self.has_override(addr):
+                self._stubs.add(addr)
+            else:
+                self._create_saved_device(addr)
         for addr in self._overrides:
             if not self._devices.get(addr):
                 device_override = self._overrides.get(Address(addr).id, {})
@@ -178,41 +213,122 @@ class LinkedDevices:
                     )
                     self[addr] = device
 
+    def _create_saved_device(self, addr):
+        """Create a device from the saved device information."""
+        from insteonplm.devices import ALDBStatus
+
+        self._stubs.discard(addr)
+        saved_device = self._saved_devices.get(Address(addr).id, {})
+        cat = saved_device.get("cat")
+        subcat = saved_device.get("subcat")
+        product_key = saved_device.get("firmware")
+        product_key = saved_device.get("product_key", product_key)
+        device = self.create_device_from_category(
+            self._plm, addr, cat, subcat, product_key
+        )
+        if device:
+            _LOGGER.debug(
+                "Device with id %s added to device list from saved device data.",
+                addr,
+            )
+            aldb_status = saved_device.get("aldb_status", 0)
+            device.aldb.status = ALDBStatus(aldb_status)
+            aldb = saved_device.get("aldb", {})
+            device.aldb.load_saved_records(aldb_status, aldb)
+            read_window = saved_device.get("aldb_read_window")
+            if read_window:
+                device.aldb.read_stats.window = read_window
+            self[addr] = device
+        return device
+
     # Save device information
-    def save_device_info(self):
-        """Save all device information to the device info file."""
-        if self._workdir is not None:
-            devices = []
-            for addr in self._devices:
-                device = self._devices.get(addr)
-                if not device.address.is_x10:
-                    aldb = {}
-                    for mem in device.aldb:
-                        rec = device.aldb[mem]
-                        if rec:
-                            aldbRec = {
-                                "memory": mem,
-                                "control_flags": rec.control_flags.byte,
-                                "group": rec.group,
-                                "address": rec.address.id,
-                                "data1": rec.data1,
-                                "data2": rec.data2,
-                                "data3": rec.data3,
-                            }
-                            aldb[mem] = aldbRec
-                    deviceInfo = {
-                        "address": device.address.id,
-                        "cat": device.cat,
-                        "subcat": device.subcat,
-                        "product_key": device.product_key,
-                        "aldb_status": device.aldb.status.value,
-                        "aldb": aldb,
-                    }
-                    devices.append(deviceInfo)
-            asyncio.ensure_future(
-                self._write_saved_device_info(devices), loop=self._loop
+    def save_device_info(self, device=None):
+        """Schedule a save of the device information to the device info file.
+
+        Parameters:
+            device: The device that changed or None to save all devices.
+
+        Changes are collected for DEVICE_INFO_SAVE_DELAY seconds and saved
+        together so a burst of changes results in a single write.
+        """
+        if self._store is None:
+            return
+        if device is None:
+            self._dirty_devices.update(self)
+        else:
+            self._dirty_devices.add(device.address.id)
+        if self._save_handle is None:
+            loop = self._loop or asyncio.get_event_loop()
+            self._save_handle = loop.call_later(
+                DEVICE_INFO_SAVE_DELAY, self._save_timer_expired
             )
 
+    async def async_save_device_info(self):
+        """Save the changed device information now.
+
+        Only devices that changed since the last save are serialized. The
+        device information store is written in a worker thread.
+        """
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        if self._store is None or not self._dirty_devices:
+            return
+        changed = set(self._dirty_devices)
+        self._dirty_devices.clear()
+        for addr in changed:
+            device = self._devices.get(addr)
+            if addr in self._stubs:
+                self._device_info[addr] = json.dumps(self._saved_devices[addr])
+            elif device is None or device.address.is_x10:
+                self._device_info.pop(addr, None)
+            else:
+                self._device_info[addr] = json.dumps(self._get_device_info(device))
+        device_info = {
+            addr: self._device_info[addr] for addr in self if addr in self._device_info
+        }
+        _LOGGER.debug("Saving %d of %d devices", len(changed), len(device_info))
+        loop = self._loop or asyncio.get_event_loop()
+        await loop.run_in_executor(
+            self._get_executor(), self._store.save, device_info, changed
+        )
+
+    def _get_executor(self):
+        """Return the worker thread used for device information storage."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    def _save_timer_expired(self):
+        self._save_handle = None
+        asyncio.ensure_future(self.async_save_device_info(), loop=self._loop)
+
+    @staticmethod
+    def _get_device_info(device):
+        aldb = {}
+        for mem in device.aldb:
+            rec = device.aldb[mem]
+            if rec:
+                aldbRec = {
+                    "memory": mem,
+                    "control_flags": rec.control_flags.byte,
+                    "group": rec.group,
+                    "address": rec.address.id,
+                    "data1": rec.data1,
+                    "data2": rec.data2,
+                    "data3": rec.data3,
+                }
+                aldb[mem] = aldbRec
+        return {
+            "address": device.address.id,
+            "cat": device.cat,
+            "subcat": device.subcat,
+            "product_key": device.product_key,
+            "aldb_status": device.aldb.status.value,
+            "aldb": aldb,
+            "aldb_read_window": device.aldb.read_stats.window,
+        }
+
     def _add_saved_device_info(self, **kwarg):
         """Register device info from the saved data file."""
         addr = kwarg.get("address")
@@ -220,30 +336,27 @@ class LinkedDevices:
         self._saved_devices[addr] = kwarg
 
     async def load_saved_device_info(self):
-        """Load device information from the device info file."""
+        """Load device information from the device information store.
+
+        Devices are read in batches in a worker thread so the event loop
+        is not blocked while a large store is read.
+        """
         _LOGGER.info("Loading saved device info.")
-        deviceinfo = []
-        if self._workdir:
-            _LOGGER.debug("Really Loading saved device info.")
-            try:
-                device_file = "{}/{}".format(self._workdir, DEVICE_INFO_FILE)
-                with open(device_file, "r") as infile:
-                    try:
-                        deviceinfo = json.load(infile)
-                        _LOGGER.debug("Saved device file loaded")
-                    except json.decoder.JSONDecodeError:
-                        _LOGGER.debug("Loading saved device file failed")
-            except FileNotFoundError:
-                _LOGGER.debug("Saved device file not found")
-        for device in deviceinfo:
-            self._add_saved_device_info(**device)
-
-    async def _write_saved_device_info(self, devices):
-        if self._workdir:
-            _LOGGER.debug("Writing %d devices to save file", len(devices))
-            device_file = "{}/{}".format(self._workdir, DEVICE_INFO_FILE)
-            try:
-                with open(device_file, "w") as outfile:
-                    json.dump(devices, outfile)
-            except FileNotFoundError:
-                _LOGGER.error("Cannot write to file %s", device_file)
+        if self._store is None:
+            return
+        _LOGGER.debug("Really Loading saved device info.")
+        loop = self._loop or asyncio.get_event_loop()
+        saved_devices = self._store.load()
+        while True:
+            batch = await loop.run_in_executor(
+                self._get_executor(), _next_batch, saved_devices
+            )
+            if not batch:
+                break
+            for device in batch:
+                self._add_saved_device_info(**device)
+
+
+def _next_batch(saved_devices):
+    """Read the next batch of saved devices."""
+    return list(islice(saved_devices, DEVICE_INFO_LOAD_BATCH))
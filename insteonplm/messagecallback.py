@@ -1,9 +1,16 @@
 """Message callback handler matching message pattern to inbound messages."""
 
+import copy
 import logging
 
+from insteonplm.address import Address
+
 _LOGGER = logging.getLogger(__name__)
 
+# Address free templates shared by the callbacks of every device, keyed by
+# the template string the templates are hashed and compared with
+_SHARED_TEMPLATES = {}
+
 
 class MessageCallback:
     """Message callback handler.
@@ -24,11 +31,19 @@ class MessageCallback:
 
     The above example is an inbound Standard Receive message (0x50)
     with the "Light On" message and any light level value in cmd2.
+
+    Parameters:
+        address: (optional) Address of the device the callbacks belong to.
+        Only messages from this device are passed to the callbacks, so
+        templates with this address are stored without the address. The
+        address free template is shared with every device that uses the
+        same template.
     """
 
-    def __init__(self):
+    def __init__(self, address=None):
         """Init the MessageCallback class."""
         self._dict = {}
+        self._address = Address(address) if address is not None else None
 
     def __len__(self):
         """Return the number of callbacks in the list."""
@@ -45,7 +60,7 @@ class MessageCallback:
         Accepts any message type as a key and returns the callbacks
         associated with that message template.
         """
-        return self._dict.get(key, [])
+        return self._dict.get(self._shared_template(key), [])
 
     def __setitem__(self, key, value):
         """Set a callback method to a message key.
@@ -53,6 +68,7 @@ class MessageCallback:
         Key: any message template.
         Value: callback method.
         """
+        key = self._shared_template(key)
         callbacks = self._dict.get(key, [])
         if isinstance(value, list):
             for callback in value:
@@ -70,15 +86,14 @@ class MessageCallback:
                   False - append the list of callbacks for that message
                   Default is False
         """
+        msg = self._shared_template(msg)
         if override:
             if isinstance(callback, list):
                 self._dict[msg] = callback
             else:
                 self._dict[msg] = [callback]
         else:
-            cb = self[msg]
-            cb.append(callback)
-            self._dict[msg] = cb
+            self._dict.setdefault(msg, []).append(callback)
 
     def remove(self, msg, callback):
         """Remove a callback from the callback list.
@@ -89,6 +104,7 @@ class MessageCallback:
         If callback is None, all callbacks for the message template are
         removed.
         """
+        msg = self._shared_template(msg)
         if callback is None:
             self._dict.pop(msg, None)
         else:
@@ -116,3 +132,12 @@ class MessageCallback:
         for key in self._dict:
             if key.matches_pattern(msg) and msg.matches_pattern(key):
                 yield key
+
+    def _shared_template(self, msg):
+        """Return the shared address free template for a device template."""
+        if self._address is None or getattr(msg, "address", None) != self._address:
+            return msg
+        # pylint: disable=protected-access
+        template = copy.copy(msg)
+        template._address = Address(None)
+        return _SHARED_TEMPLATES.setdefault(str(template), template)
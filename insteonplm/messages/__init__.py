@@ -71,8 +71,8 @@ def create(rawmessage):
         rawmessage = rawmessage[1:]
         rawmessage = _trim_buffer_garbage(rawmessage, False)
         if rawmessage:
-            _LOGGER.debug("Create: %s", create)
-            _LOGGER.debug("rawmessage: %s", binascii.hexlify(rawmessage))
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("rawmessage: %s", binascii.hexlify(rawmessage))
             msg, remaining_data = create(rawmessage)
         else:
             remaining_data = rawmessage
@@ -193,7 +193,7 @@ def _trim_buffer_garbage(rawmessage, debug=True):
     A proper message byte stream begins with 0x02.
     """
     while rawmessage and rawmessage[0] != MESSAGE_START_CODE_0X02:
-        if debug:
+        if debug and _LOGGER.isEnabledFor(logging.DEBUG):
             _LOGGER.debug("Buffer content: %s", binascii.hexlify(rawmessage))
             _LOGGER.debug("Trimming leading buffer garbage")
         rawmessage = rawmessage[1:]
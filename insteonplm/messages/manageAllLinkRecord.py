@@ -47,15 +47,21 @@ class ManageAllLinkRecord(Message):
     def from_raw_message(cls, rawmessage):
         """Create message from raw byte stream."""
         return ManageAllLinkRecord(
-            rawmessage[2:3],
-            rawmessage[3:4],
-            rawmessage[4:7],
-            rawmessage[7:8],
-            rawmessage[8:9],
-            rawmessage[9:10],
-            rawmessage[10:11],
+            rawmessage[2],
+            rawmessage[3],
+            rawmessage[4],
+            rawmessage[5:8],
+            rawmessage[8],
+            rawmessage[9],
+            rawmessage[10],
+            rawmessage[11:12],
         )
 
+    @property
+    def controlCode(self):
+        """Return the manage record control code."""
+        return self._controlCode
+
     @property
     def controlFlags(self):
         """Return the link record control flags."""
@@ -0,0 +1,256 @@
+"""Runtime metrics for the Insteon Modem and its devices.
+
+Metrics are plain counters, histograms and gauges held in a registry on
+the IM. Recording a value is a dictionary update so the metrics are
+always on. The registry can be read as a dictionary or as samples in the
+Prometheus text format for export.
+"""
+from bisect import bisect_left
+
+__all__ = (
+    "Counter",
+    "Histogram",
+    "Gauge",
+    "MetricsRegistry",
+    "register_device_metrics",
+)
+
+SECONDS_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _labels_text(labels):
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join('{}="{}"'.format(key, val) for key, val in labels.items())
+    )
+
+
+class Counter:
+    """Count events, optionally split by a label value.
+
+    Parameters:
+        name: Metric name.
+        description: Description of the metric.
+        label: (optional) Name of the label the counts are split by.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, description, label=None):
+        """Init the Counter class."""
+        self.name = name
+        self.description = description
+        self.label = label
+        self._values = {}
+
+    def inc(self, label_value=None, amount=1):
+        """Increase the count for a label value."""
+        self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value=None):
+        """Return the count for a label value."""
+        return self._values.get(label_value, 0)
+
+    @property
+    def total(self):
+        """Return the count over all label values."""
+        return sum(self._values.values())
+
+    def samples(self):
+        """Yield the (name, labels, value) samples of the metric."""
+        for label_value, value in self._values.items():
+            labels = {}
+            if self.label and label_value is not None:
+                labels[self.label] = label_value
+            yield self.name, labels, value
+
+    def as_dict(self):
+        """Return the counts by label value."""
+        if self.label is None:
+            return self.value()
+        return dict(self._values)
+
+
+class Histogram:
+    """Record the distribution of observed values.
+
+    Parameters:
+        name: Metric name.
+        description: Description of the metric.
+        buckets: (optional) Sorted upper bounds of the buckets, default is
+        SECONDS_BUCKETS.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets=SECONDS_BUCKETS):
+        """Init the Histogram class."""
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0
+        self._count = 0
+
+    def observe(self, value):
+        """Record an observed value."""
+        self._counts[bisect_left(self.buckets, value)] += 1
+        self._sum += value
+        self._count += 1
+
+    @property
+    def count(self):
+        """Return the number of observed values."""
+        return self._count
+
+    @property
+    def sum(self):
+        """Return the sum of the observed values."""
+        return self._sum
+
+    def samples(self):
+        """Yield the (name, labels, value) samples of the metric."""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            yield "{}_bucket".format(self.name), {"le": str(bound)}, cumulative
+        yield "{}_bucket".format(self.name), {"le": "+Inf"}, self._count
+        yield "{}_sum".format(self.name), {}, self._sum
+        yield "{}_count".format(self.name), {}, self._count
+
+    def as_dict(self):
+        """Return the count, sum and bucket counts."""
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {"count": self._count, "sum": self._sum, "buckets": buckets}
+
+
+class Gauge:
+    """Report a value read when the metrics are collected.
+
+    Parameters:
+        name: Metric name.
+        description: Description of the metric.
+        read: Callable returning the current value.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, description, read):
+        """Init the Gauge class."""
+        self.name = name
+        self.description = description
+        self._read = read
+
+    @property
+    def value(self):
+        """Return the current value."""
+        return self._read()
+
+    def samples(self):
+        """Yield the (name, labels, value) samples of the metric."""
+        yield self.name, {}, self.value
+
+    def as_dict(self):
+        """Return the current value."""
+        return self.value
+
+
+class MetricsRegistry:
+    """Collection of the metrics of an IM.
+
+    Parameters:
+        prefix: (optional) Prefix added to the metric names on export,
+        default is `insteonplm_`.
+    """
+
+    def __init__(self, prefix="insteonplm_"):
+        """Init the MetricsRegistry class."""
+        self._prefix = prefix
+        self._metrics = {}
+
+    def __len__(self):
+        """Return the number of metrics."""
+        return len(self._metrics)
+
+    def __iter__(self):
+        """Iterate through the metric names."""
+        for name in self._metrics:
+            yield name
+
+    def __getitem__(self, name):
+        """Return a metric by name."""
+        return self._metrics[name]
+
+    def __contains__(self, name):
+        """Return if a metric is registered."""
+        return name in self._metrics
+
+    def counter(self, name, description, label=None):
+        """Register a counter or return the registered counter."""
+        return self._register(Counter(name, description, label))
+
+    def histogram(self, name, description, buckets=SECONDS_BUCKETS):
+        """Register a histogram or return the registered histogram."""
+        return self._register(Histogram(name, description, buckets))
+
+    def gauge(self, name, description, read):
+        """Register a gauge or return the registered gauge."""
+        return self._register(Gauge(name, description, read))
+
+    def as_dict(self):
+        """Return the value of every metric by name."""
+        return {name: metric.as_dict() for name, metric in self._metrics.items()}
+
+    def samples(self):
+        """Yield the (name, labels, value) samples of every metric.
+
+        The names include the registry prefix. Each sample maps directly to
+        a StatsD or Prometheus metric.
+        """
+        for metric in self._metrics.values():
+            for name, labels, value in metric.samples():
+                yield self._prefix + name, labels, value
+
+    def prometheus(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            name = self._prefix + metric.name
+            lines.append("# HELP {} {}".format(name, metric.description))
+            lines.append("# TYPE {} {}".format(name, metric.kind))
+            for sample_name, labels, value in metric.samples():
+                lines.append(
+                    "{}{}{} {}".format(
+                        self._prefix, sample_name, _labels_text(labels), value
+                    )
+                )
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        registered = self._metrics.get(metric.name)
+        if registered is not None:
+            if registered.kind != metric.kind:
+                raise ValueError(
+                    "Metric {} is already a {}".format(metric.name, registered.kind)
+                )
+            return registered
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def register_device_metrics(registry):
+    """Register the metrics recorded by devices in a registry.
+
+    Devices record their metrics in the registry of the IM they are linked
+    to and look the metrics up by name.
+    """
+    registry.counter("callbacks_dispatched", "Message callbacks scheduled")
+    registry.counter("duplicates_suppressed", "Duplicate device messages ignored")
+    registry.histogram("direct_ack_seconds", "Seconds waited for a device direct ACK")
+    registry.counter("direct_ack_timeouts", "Device direct ACKs not received")
+    registry.histogram("aldb_load_seconds", "Seconds to load a device ALDB")
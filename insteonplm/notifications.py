@@ -0,0 +1,195 @@
+"""Batched delivery of device state changes to subscribers.
+
+State changes are queued by the states of the devices linked to an IM and
+delivered to the subscribers on the next iteration of the event loop, so
+the subscribers run after the message that changed the state has been
+processed. Changes of the same state queued in one iteration are
+coalesced and only the last value is delivered. A subscriber that raises
+an exception is logged and does not stop the delivery to the other
+subscribers. Subscribers that are coroutine functions are run as tasks.
+
+Every state change delivered is also put on the StateChangeStream
+iterators subscribed to the dispatcher, so a single stream follows the
+state of every device on the network.
+"""
+import asyncio
+from collections import namedtuple
+import logging
+import time
+
+from insteonplm.streams import Stream
+
+__all__ = (
+    "NotificationDispatcher",
+    "StateChange",
+    "StateChangeStream",
+    "SubscriberStats",
+)
+_LOGGER = logging.getLogger(__name__)
+
+SLOW_SUBSCRIBER_SECONDS = 0.1
+
+StateChange = namedtuple("StateChange", "address group name value")
+
+
+class SubscriberStats:
+    """Delivery statistics of a subscriber."""
+
+    def __init__(self):
+        """Init the SubscriberStats class."""
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.total_seconds = 0
+        self.max_seconds = 0
+
+    @property
+    def mean_seconds(self):
+        """Return the mean time a call took."""
+        if not self.calls:
+            return 0
+        return self.total_seconds / self.calls
+
+    def as_dict(self):
+        """Return the statistics as a dictionary."""
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "mean_seconds": self.mean_seconds,
+            "max_seconds": self.max_seconds,
+        }
+
+
+class StateChangeStream(Stream):
+    """Asynchronous iterator of the state changes of every device.
+
+    Parameters:
+        dispatcher: NotificationDispatcher the stream is subscribed to.
+        loop: asyncio event loop.
+        maxsize: (optional) Maximum number of changes waiting to be read.
+        When the stream is full the oldest change is dropped. Default is 0
+        for no limit.
+
+    Example:
+        async for change in plm.state_changes():
+            print(change.address, change.group, change.name, change.value)
+    """
+
+    def __init__(self, dispatcher, loop, maxsize=0):
+        """Init the StateChangeStream class."""
+        super().__init__(loop, maxsize, dispatcher.unsubscribe)
+
+
+class NotificationDispatcher:
+    """Deliver state changes to subscribers in batches.
+
+    Parameters:
+        loop: asyncio event loop.
+        metrics: (optional) MetricsRegistry the dispatcher records the
+        number of state changes and the delivery delay in.
+    """
+
+    def __init__(self, loop, metrics=None):
+        """Init the NotificationDispatcher class."""
+        self._loop = loop
+        self._pending = {}
+        self._flush_handle = None
+        self._queued = None
+        self._stats = {}
+        self._streams = []
+        self._metric_updates = None
+        self._metric_coalesced = None
+        self._metric_delay = None
+        if metrics is not None:
+            self._metric_updates = metrics.counter(
+                "state_updates", "State changes queued for subscribers"
+            )
+            self._metric_coalesced = metrics.counter(
+                "state_updates_coalesced", "State changes replaced by a later change"
+            )
+            self._metric_delay = metrics.histogram(
+                "notification_delay_seconds",
+                "Seconds from a state change to its delivery",
+            )
+
+    @property
+    def subscriber_stats(self):
+        """Return the SubscriberStats of each subscriber called."""
+        return self._stats
+
+    @property
+    def pending(self):
+        """Return the number of state changes waiting to be delivered."""
+        return len(self._pending)
+
+    def subscribe(self, maxsize=0):
+        """Return a StateChangeStream of the state changes of every device."""
+        stream = StateChangeStream(self, self._loop, maxsize)
+        self._streams.append(stream)
+        return stream
+
+    def unsubscribe(self, stream):
+        """Stop putting state changes on a stream."""
+        if stream in self._streams:
+            self._streams.remove(stream)
+
+    def notify(self, state, group, value, callbacks):
+        """Queue a state change for delivery to the state subscribers.
+
+        Parameters:
+            state: State that changed.
+            group: Group or button of the state passed to the callbacks.
+            value: New value of the state.
+            callbacks: List of subscriber callbacks defined as
+            callback(address, group, value).
+        """
+        key = (state, group)
+        if self._metric_updates is not None:
+            self._metric_updates.inc()
+            if key in self._pending:
+                self._metric_coalesced.inc()
+        self._pending[key] = (callbacks, state.address, value)
+        if self._flush_handle is None:
+            self._queued = self._loop.time()
+            self._flush_handle = self._loop.call_soon(self.flush)
+
+    def flush(self):
+        """Deliver the queued state changes now."""
+        self._flush_handle = None
+        pending = self._pending
+        self._pending = {}
+        if self._metric_delay is not None and pending:
+            self._metric_delay.observe(self._loop.time() - self._queued)
+        for (state, group), (callbacks, address, value) in pending.items():
+            for callback in list(callbacks):
+                self._call(callback, address, group, value)
+            if self._streams:
+                change = StateChange(address, group, state.name, value)
+                for stream in self._streams:
+                    stream.put(change)
+
+    # pylint: disable=broad-except
+    def _call(self, callback, address, group, value):
+        stats = self._stats.get(callback)
+        if stats is None:
+            stats = self._stats[callback] = SubscriberStats()
+        start = time.perf_counter()
+        try:
+            result = callback(address, group, value)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result, loop=self._loop)
+        except Exception:
+            stats.failures += 1
+            _LOGGER.exception("Error calling state subscriber %s", callback)
+        elapsed = time.perf_counter() - start
+        stats.calls += 1
+        stats.total_seconds += elapsed
+        if elapsed > stats.max_seconds:
+            stats.max_seconds = elapsed
+        if elapsed > SLOW_SUBSCRIBER_SECONDS:
+            if not stats.slow_calls:
+                _LOGGER.warning(
+                    "State subscriber %s took %.3f seconds", callback, elapsed
+                )
+            stats.slow_calls += 1
@@ -8,6 +8,7 @@ from collections import deque, namedtuple
 import async_timeout
 
 import insteonplm.messages
+from insteonplm.capture import CaptureWriter, RECEIVED, SENT
 from insteonplm.constants import (
     MESSAGE_ACK,
     MESSAGE_NAK,
@@ -17,7 +18,7 @@ from insteonplm.constants import (
     X10_COMMAND_ALL_LIGHTS_OFF,
 )
 from insteonplm.address import Address
-from insteonplm.devices import Device, ALDBRecord, ALDBStatus
+from insteonplm.devices import Device, ALDBRecord, ALDBStatus, ModemALDB
 from insteonplm.linkedDevices import LinkedDevices
 from insteonplm.messagecallback import MessageCallback
 from insteonplm.messages.allLinkRecordResponse import AllLinkRecordResponse
@@ -29,6 +30,9 @@ from insteonplm.messages.setImConfiguration import SetIMConfiguration
 from insteonplm.messages.startAllLinking import StartAllLinking
 from insteonplm.messages.x10received import X10Received
 from insteonplm.messages.x10send import X10Send
+from insteonplm.metrics import MetricsRegistry, register_device_metrics
+from insteonplm.notifications import NotificationDispatcher
+from insteonplm.streams import Stream
 from insteonplm.utils import (
     byte_to_housecode,
     byte_to_unitcode,
@@ -43,6 +47,7 @@ ACKNAK_TIMEOUT = 2
 
 
 MessageInfo = namedtuple("MessageInfo", "msg wait_nak wait_timeout")
+SceneMember = namedtuple("SceneMember", "address data1 data3")
 
 
 # pylint: disable=too-many-instance-attributes
@@ -68,6 +73,13 @@ class IM(Device, asyncio.Protocol):
         load_aldb; (optional, bool) indicates if the modem should load the
         All-Link Database on startup, default is True
 
+        storage: (optional, string) device information storage type, `json`
+        for a single JSON file or `sqlite` for a SQLite database, default is
+        `json`
+
+        lazy_devices: (optional, bool) indicates if devices from the saved
+        device information are only created when first used, default is False
+
     """
 
     def __init__(
@@ -77,6 +89,8 @@ class IM(Device, asyncio.Protocol):
         workdir=None,
         poll_devices=True,
         load_aldb=True,
+        storage="json",
+        lazy_devices=False,
     ):
         """Protocol handler that handles all status and changes on PLM."""
         self._loop = loop
@@ -88,18 +102,25 @@ class IM(Device, asyncio.Protocol):
         self._acknak_queue = asyncio.Queue(loop=self._loop)
         self._next_all_link_rec_nak_retries = 0
         self._aldb_devices = {}
-        self._devices = LinkedDevices(loop, workdir)
+        self._scene_cache = {}
+        self._devices = LinkedDevices(loop, workdir, storage, lazy_devices)
         self._poll_devices = poll_devices
         self._load_aldb = load_aldb
         self._write_transport_lock = asyncio.Lock(loop=self._loop)
         self._message_callbacks = MessageCallback()
+        self._message_streams = []
         self._x10_address = None
+        self._metrics = MetricsRegistry()
+        self._register_metrics()
+        self._notifications = NotificationDispatcher(self._loop, self._metrics)
+        self._capture = None
 
         # Callback lists
         self._cb_load_all_link_db_done = []
         self._cb_device_not_active = []
 
         super().__init__(self, "000000", 0x03, None, None, "", "")
+        self._aldb = ModemALDB(self._send_msg, self._loop, self._address)
 
         self.transport = None
 
@@ -124,6 +145,16 @@ class IM(Device, asyncio.Protocol):
         """Return the list of message callbacks."""
         return self._message_callbacks
 
+    @property
+    def notifications(self):
+        """Return the dispatcher notifying subscribers of state changes."""
+        return self._notifications
+
+    @property
+    def metrics(self):
+        """Return the metrics registry of the IM and its devices."""
+        return self._metrics
+
     # asyncio.protocol interface methods
     def connection_made(self, transport):
         """Complete the network connection.
@@ -137,14 +168,19 @@ class IM(Device, asyncio.Protocol):
 
         Called when asyncio.Protocol detects received data from network.
         """
-        _LOGGER.debug("Starting: data_received")
-        _LOGGER.debug(
-            "Received %d bytes from PLM: %s", len(data), binascii.hexlify(data)
-        )
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
+        if debug:
+            _LOGGER.debug("Starting: data_received")
+            _LOGGER.debug(
+                "Received %d bytes from PLM: %s", len(data), binascii.hexlify(data)
+            )
+        if self._capture is not None:
+            self._capture.record(RECEIVED, data)
         self._buffer.put_nowait(data)
         asyncio.ensure_future(self._peel_messages_from_buffer(), loop=self._loop)
 
-        _LOGGER.debug("Finishing: data_received")
+        if debug:
+            _LOGGER.debug("Finishing: data_received")
 
     def connection_lost(self, exc):
         """Reestablish the connection to the transport.
@@ -227,6 +263,80 @@ class IM(Device, asyncio.Protocol):
             self.devices[device.address.id] = device
         return device
 
+    def state_snapshot(self):
+        """Return the cached state values of every device without side effects.
+
+        Returns a dictionary of device address to a dictionary of group to
+        state value. No status requests are sent for unknown values.
+        """
+        return self._devices.state_snapshot()
+
+    def state_changes(self, maxsize=0):
+        """Return an asynchronous iterator of state changes of every device.
+
+        Parameters:
+            maxsize: (optional) Maximum number of changes waiting to be
+            read before the oldest is dropped, default is 0 for no limit.
+
+        Each change is a StateChange of address, group, name and value. Call
+        close on the iterator to stop receiving changes.
+        """
+        return self._notifications.subscribe(maxsize)
+
+    # pylint: disable=redefined-builtin
+    def messages(self, filter=None, maxsize=100):
+        """Return an asynchronous iterator of the messages received.
+
+        Parameters:
+            filter: (optional) Message template or list of message
+            templates matched the same way as the message callbacks. Default
+            is None for every message received.
+            maxsize: (optional) Maximum number of messages waiting to be
+            read before the oldest is dropped, default is 100. Use 0 for no
+            limit.
+
+        Messages are put on the stream without waiting for the reader, so a
+        slow reader does not delay the messages sent to the devices and
+        callbacks. Call close on the iterator to stop receiving messages.
+
+        Example:
+            async for msg in plm.messages(StandardReceive.template()):
+                print(msg)
+        """
+        if filter is None:
+            stream = Stream(self._loop, maxsize, self._message_streams.remove)
+            self._message_streams.append(stream)
+            return stream
+        if not isinstance(filter, (list, tuple)):
+            filter = [filter]
+        templates = list(filter)
+
+        def remove_stream(stream):
+            for template in templates:
+                self._message_callbacks.remove(template, stream.put)
+
+        stream = Stream(self._loop, maxsize, remove_stream)
+        for template in templates:
+            self._message_callbacks.add(template, stream.put)
+        return stream
+
+    def start_capture(self, path):
+        """Record the traffic to and from the Insteon Modem to a file.
+
+        The capture file can be read with insteonplm.capture.read_capture
+        and replayed with insteonplm.capture.replay.
+        """
+        self.stop_capture()
+        self._capture = CaptureWriter(path, self._loop.time)
+        _LOGGER.info("Capturing Insteon Modem traffic to %s", path)
+
+    def stop_capture(self):
+        """Stop recording the traffic to and from the Insteon Modem."""
+        if self._capture is not None:
+            self._capture.close()
+            _LOGGER.info("Captured %d Insteon Modem frames", self._capture.records)
+            self._capture = None
+
     def monitor_mode(self):
         """Put the Insteon Modem in monitor mode."""
         msg = SetIMConfiguration(0x40)
@@ -342,6 +452,8 @@ class IM(Device, asyncio.Protocol):
     async def close(self):
         """Close all writers for all devices for a clean shutdown."""
         await self.pause_writing()
+        await self._devices.async_save_device_info()
+        self.stop_capture()
         await asyncio.sleep(0, loop=self._loop)
 
     def trigger_group_on(self, group):
@@ -353,18 +465,15 @@ class IM(Device, asyncio.Protocol):
         flags = 0xCF
         msg = StandardSend(target, COMMAND_LIGHT_ON_0X11_NONE, cmd2=0xFF, flags=flags)
         self.send_msg(msg)
-        dev_list = self._find_scene(group)
         _LOGGER.debug("Scene %d turned on", group)
-        for addr in dev_list:
-            device = self._devices[addr.id]
+        for member in self._find_scene(group):
+            device = self._devices[member.address.id]
             flags = 0x4F
             msg = StandardSend(
                 device.address, COMMAND_LIGHT_ON_0X11_NONE, cmd2=group, flags=flags
             )
             self.send_msg(msg)
-            if hasattr(device, "async_refresh_state"):
-                _LOGGER.debug("Checking status of device %s", addr.human)
-                device.async_refresh_state()
+            self._update_scene_member(device, member, True)
 
     def trigger_group_off(self, group):
         """Trigger an All-Link Group off."""
@@ -375,42 +484,79 @@ class IM(Device, asyncio.Protocol):
         flags = 0xCF
         msg = StandardSend(target, COMMAND_LIGHT_OFF_0X13_0X00, flags=flags)
         self.send_msg(msg)
-        dev_list = self._find_scene(group)
         _LOGGER.debug("Scene %d turned off", group)
-        for addr in dev_list:
-            device = self._devices[addr.id]
+        for member in self._find_scene(group):
+            device = self._devices[member.address.id]
             flags = 0x4F
             msg = StandardSend(
                 device.address, COMMAND_LIGHT_OFF_0X13_0X00, cmd2=group, flags=flags
             )
             self.send_msg(msg)
-            if hasattr(device, "async_refresh_state"):
-                _LOGGER.debug("Checking status of device %s", addr.human)
-                device.async_refresh_state()
+            self._update_scene_member(device, member, False)
+
+    def clear_scene_cache(self):
+        """Clear the cached scene members after an All-Link Database change."""
+        self._scene_cache.clear()
+
+    @staticmethod
+    def _update_scene_member(device, member, is_on):
+        """Set the expected state of a scene member or request its status.
+
+        The state is set from the responder link data when the member ALDB
+        has a responder record for the scene. Otherwise the device is asked
+        for its status.
+        """
+        state = None
+        if member.data1 is not None:
+            state = device.states[member.data3 or 0x01]
+        if state and state.scene_changed(is_on, member.data1):
+            _LOGGER.debug("Set scene state of device %s", member.address.human)
+        elif hasattr(device, "async_refresh_state"):
+            _LOGGER.debug("Checking status of device %s", member.address.human)
+            device.async_refresh_state()
 
     def _find_scene(self, group):
-        """Identify all devices that are part of a scene."""
-        device_list = []
-        for rec_num in self._aldb:
-            rec = self._aldb[rec_num]
-            _LOGGER.debug("Checking record for scene: %s", rec)
-            if rec.control_flags.is_controller and rec.group == group:
-                if rec.address not in device_list:
-                    device_list.append(rec.address)
+        """Identify all devices that are part of a scene.
+
+        Returns a list of SceneMember tuples. The link data is taken from
+        the responder record in the member ALDB and is None if the record
+        is not known.
+        """
+        members = self._scene_cache.get(group)
+        if members is not None:
+            return members
+        link_data = {}
+        for rec in self._aldb.find(group=group, is_controller=True):
+            if rec.address.id not in link_data:
+                link_data[rec.address.id] = SceneMember(rec.address, None, None)
         for addr in self._devices:
             device = self._devices[addr]
             aldb = device.aldb
             for mem_addr in aldb:
                 rec = aldb[mem_addr]
-                _LOGGER.debug("Checking record for scene: %s", rec)
                 if (
                     rec.control_flags.is_in_use
                     and rec.group == group
                     and rec.address == self._address
                 ):
-                    if rec.address not in device_list:
-                        device_list.append(device.address)
-        return device_list
+                    member = link_data.get(device.address.id)
+                    if member is None or (
+                        member.data1 is None and rec.control_flags.is_responder
+                    ):
+                        data1 = data3 = None
+                        if rec.control_flags.is_responder:
+                            data1 = rec.data1
+                            data3 = rec.data3
+                        link_data[device.address.id] = SceneMember(
+                            device.address, data1, data3
+                        )
+        members = [
+            member
+            for member in link_data.values()
+            if member.address.id in self._devices
+        ]
+        self._scene_cache[group] = members
+        return members
 
     async def _setup_devices(self):
         await self.devices.load_saved_device_info()
@@ -440,7 +586,9 @@ class IM(Device, asyncio.Protocol):
                 return
             message_sent = False
             try:
+                message_sent = await self._write_message(msg_info)
                 while not message_sent:
+                    self._metric_send_retries.inc()
                     message_sent = await self._write_message(msg_info)
                 await asyncio.sleep(msg_info.wait_timeout, loop=self._loop)
             except asyncio.CancelledError:
@@ -467,7 +615,10 @@ class IM(Device, asyncio.Protocol):
         _LOGGER.debug("TX: %s:%s", id(msg_info.msg), msg_info.msg)
         is_sent = False
         if not self.transport.is_closing():
-            self.transport.write(msg_info.msg.bytes)
+            data = msg_info.msg.bytes
+            self.transport.write(data)
+            if self._capture is not None:
+                self._capture.record(SENT, data)
             if msg_info.wait_nak:
                 _LOGGER.debug("Waiting for ACK or NAK message")
                 is_sent = await self._wait_ack_nak(msg_info.msg)
@@ -482,6 +633,7 @@ class IM(Device, asyncio.Protocol):
     async def _wait_ack_nak(self, msg):
         is_sent = False
         is_ack_nak = False
+        started = self._loop.time()
         try:
             with async_timeout.timeout(ACKNAK_TIMEOUT):
                 while not is_ack_nak:
@@ -490,8 +642,12 @@ class IM(Device, asyncio.Protocol):
                                   'msg: %s', id(acknak), id(msg))
                     is_ack_nak = self._msg_is_ack_nak(msg, acknak)
                     is_sent = self._msg_is_sent(acknak)
+            self._metric_ack_seconds.observe(self._loop.time() - started)
+            if acknak.isnak:
+                self._metric_naks.inc()
         except asyncio.TimeoutError:
             _LOGGER.debug("No ACK or NAK message received.")
+            self._metric_ack_timeouts.inc()
             is_sent = False
         return is_sent
 
@@ -547,6 +703,7 @@ class IM(Device, asyncio.Protocol):
         _LOGGER.debug("Ending: _get_next_all_link_record")
 
     def _new_device_added(self, device):
+        self.clear_scene_cache()
         self.aldb_device_handled(device.address.id)
         if self._poll_devices:
             device.async_refresh_state()
@@ -560,6 +717,9 @@ class IM(Device, asyncio.Protocol):
         template_next_all_link_rec = GetNextAllLinkRecord(acknak=MESSAGE_NAK)
         template_x10_send = X10Send(None, None, MESSAGE_ACK)
         template_x10_received = X10Received(None, None)
+        template_manage_aldb_record = ManageAllLinkRecord(
+            None, None, None, None, None, None, None, acknak=MESSAGE_ACK
+        )
 
         # self._message_callbacks.add(
         #    template_assign_all_link,
@@ -581,7 +741,12 @@ class IM(Device, asyncio.Protocol):
             template_x10_received, self._handle_x10_send_receive
         )
 
+        self._message_callbacks.add(
+            template_manage_aldb_record, self._handle_manage_aldb_record_ack
+        )
+
     async def _peel_messages_from_buffer(self):
+        debug = _LOGGER.isEnabledFor(logging.DEBUG)
         lastlooplen = 0
         worktodo = True
         buffer = bytearray()
@@ -590,7 +755,8 @@ class IM(Device, asyncio.Protocol):
             if len(buffer) < 2:
                 worktodo = False
                 break
-            _LOGGER.debug("Total buffer: %s", binascii.hexlify(buffer))
+            if debug:
+                _LOGGER.debug("Total buffer: %s", binascii.hexlify(buffer))
             msg, buffer = insteonplm.messages.create(buffer)
 
             if msg is not None:
@@ -599,12 +765,14 @@ class IM(Device, asyncio.Protocol):
 
             # _LOGGER.debug('Post buffer: %s', binascii.hexlify(buffer))
             if len(buffer) < 2:
-                _LOGGER.debug("Buffer too short to have a message")
+                if debug:
+                    _LOGGER.debug("Buffer too short to have a message")
                 worktodo = False
                 break
 
             if len(buffer) == lastlooplen:
-                _LOGGER.debug("Buffer size did not change wait for more data")
+                if debug:
+                    _LOGGER.debug("Buffer size did not change wait for more data")
                 worktodo = False
                 break
 
@@ -613,19 +781,23 @@ class IM(Device, asyncio.Protocol):
             buffer.extend(self._unpack_buffer())
             self._buffer.put_nowait(buffer)
 
-        _LOGGER.debug("Messages in queue: %d", len(self._recv_queue))
+        if debug:
+            _LOGGER.debug("Messages in queue: %d", len(self._recv_queue))
         worktodo = True
         while worktodo:
             try:
-                self._process_recv_queue()
+                self._process_recv_queue(debug)
             except IndexError:
-                _LOGGER.debug("Last item in self._recv_queue reached.")
+                if debug:
+                    _LOGGER.debug("Last item in self._recv_queue reached.")
                 worktodo = False
 
-    def _process_recv_queue(self):
+    def _process_recv_queue(self, debug=False):
         msg = self._recv_queue.pop()
 
-        _LOGGER.debug("RX: %s:%s", id(msg), msg)
+        if debug:
+            _LOGGER.debug("RX: %s:%s", id(msg), msg)
+        self._metric_messages_received.inc("0x{:02x}".format(msg.code))
         callbacks = self._message_callbacks.get_callbacks_from_message(msg)
         if hasattr(msg, "isack") or hasattr(msg, "isnak"):
             self._acknak_queue.put_nowait(msg)
@@ -640,8 +812,32 @@ class IM(Device, asyncio.Protocol):
                         device.receive_message(msg)
                 except KeyError:
                     pass
+        self._metric_callbacks_dispatched.inc(amount=len(callbacks))
         for callback in callbacks:
             self._loop.call_soon(callback, msg)
+        for stream in self._message_streams:
+            stream.put(msg)
+
+    def _register_metrics(self):
+        metrics = self._metrics
+        register_device_metrics(metrics)
+        self._metric_callbacks_dispatched = metrics["callbacks_dispatched"]
+        self._metric_messages_received = metrics.counter(
+            "messages_received", "Messages received by message code", "code"
+        )
+        self._metric_send_retries = metrics.counter(
+            "send_retries", "Messages sent again after a NAK or no ACK"
+        )
+        self._metric_naks = metrics.counter("naks", "NAK messages received")
+        self._metric_ack_timeouts = metrics.counter(
+            "ack_timeouts", "Messages sent with no ACK or NAK received"
+        )
+        self._metric_ack_seconds = metrics.histogram(
+            "ack_seconds", "Seconds from sending a message to its ACK or NAK"
+        )
+        metrics.gauge(
+            "send_queue_depth", "Messages waiting to be sent", self._send_queue.qsize
+        )
 
     def _unpack_buffer(self):
         buffer = bytearray()
@@ -650,22 +846,25 @@ class IM(Device, asyncio.Protocol):
         return buffer
 
     def _refresh_aldb(self):
+        self.clear_scene_cache()
         self.aldb.clear()
         self._load_all_link_database()
 
     def _handle_all_link_record_response(self, msg):
 
-        _LOGGER.debug("Found all link %s record for group 0x%02x, device %s",
-                      "control" if msg.isController else "respond",
-                      msg.group, msg.address.human)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Found all link %s record for group 0x%02x, device %s",
+                          "control" if msg.isController else "respond",
+                          msg.group, msg.address.human)
         cat = msg.linkdata1
         subcat = msg.linkdata2
         product_key = msg.linkdata3
+        self.clear_scene_cache()
         rec_num = len(self._aldb)
         self._aldb[rec_num] = ALDBRecord(
             rec_num, msg.controlFlags, msg.group, msg.address, cat, subcat, product_key
         )
-        if self.devices[msg.address.id] is None:
+        if msg.address.id not in self.devices:
             _LOGGER.debug(
                 "ALDB Data: address %s data1: %02x " "data1: %02x data3: %02x",
                 msg.address.hex,
@@ -688,7 +887,7 @@ class IM(Device, asyncio.Protocol):
                     or self.devices.has_override(device.address.id)
                     or self.devices.has_saved(device.address.id)
                 ):
-                    if self.devices[device.id] is None:
+                    if device.id not in self.devices:
                         self.devices[device.id] = device
                         _LOGGER.debug(
                             "Device with id %s added to device list from ALDB data.",
@@ -697,7 +896,7 @@ class IM(Device, asyncio.Protocol):
 
         # Check again that the device is not already added, otherwise queue it
         # up for Get ID request
-        if not self.devices[msg.address.id]:
+        if msg.address.id not in self.devices:
             if msg.address.id in self._aldb_devices:
                 _LOGGER.debug("Device %s already queued for Get ID request",
                               msg.address.hex)
@@ -714,6 +913,20 @@ class IM(Device, asyncio.Protocol):
         self._next_all_link_rec_nak_retries = 0
         self._get_next_all_link_record()
 
+    def _handle_manage_aldb_record_ack(self, msg):
+        _LOGGER.debug("Modem confirmed All-Link record change for %s",
+                      msg.address.human)
+        self._aldb.manage_record(
+            msg.controlCode,
+            msg.controlFlags,
+            msg.group,
+            msg.address,
+            msg.linkdata1,
+            msg.linkdata2,
+            msg.linkdata3,
+        )
+        self.clear_scene_cache()
+
     def _handle_get_next_all_link_record_nak(self, msg):
         # When the last All-Link record is reached the PLM sends a NAK
         if self._next_all_link_rec_nak_retries < 3:
@@ -742,7 +955,7 @@ class IM(Device, asyncio.Protocol):
         self.devices.add_device_callback(self._new_device_added)
 
         for addr in self._aldb_devices:
-            _LOGGER.debug("Getting device info for %s", Address(addr).human)
+            _LOGGER.debug("Getting device info for %s", addr)
             self._aldb_devices[addr].id_request()
 
         _LOGGER.debug("Ending _get_device_info")
@@ -762,8 +975,6 @@ class IM(Device, asyncio.Protocol):
         self.send_msg(msg_info.msg, msg_info.wait_nak, msg_info.wait_timeout)
 
     def _handle_get_plm_info(self, msg):
-        from insteonplm.devices import ALDB
-
         _LOGGER.debug("Starting _handle_get_plm_info")
         from insteonplm.devices.ipdb import IPDB
 
@@ -775,7 +986,7 @@ class IM(Device, asyncio.Protocol):
         product = ipdb[[self._cat, self._subcat]]
         self._description = product.description
         self._model = product.model
-        self._aldb = ALDB(self._send_msg, self._plm.loop, self._address)
+        self._aldb = ModemALDB(self._send_msg, self._plm.loop, self._address)
 
         _LOGGER.debug("Ending _handle_get_plm_info")
 
@@ -826,7 +1037,7 @@ class IM(Device, asyncio.Protocol):
                     self.devices[self._x10_address.id].receive_message(msg)
         else:
             for addr in self.devices:
-                if self.devices[addr].address.is_x10:
+                if Address(addr).is_x10:
                     if self.devices[addr].address.x10_housecode == housecode:
                         self.devices[addr].receive_message(msg)
         self._x10_address = None
@@ -0,0 +1,437 @@
+"""Simulated Insteon Modem and devices for testing without hardware.
+
+The SimulatedModem is an asyncio transport connected to a PLM or Hub
+protocol in place of the serial port or Hub HTTP transport. It answers
+modem commands, holds the modem All-Link Database and passes commands
+sent to devices to a set of SimulatedDevice objects on a simulated
+INSTEON network.
+
+Timing follows the real network. The serial line delivers bytes in
+order at 9600 baud. Messages on the powerline are sent one at a time
+and take longer for every hop a device is away from the modem. Device
+messages can be lost and All-Link broadcasts are received once for each
+hop followed by an All-Link cleanup, as with real devices. All delays
+are scaled by `time_scale` so load tests can run faster than real time,
+or with no delays at all.
+
+Example:
+    plm = PLM(loop=loop, workdir=workdir)
+    modem = SimulatedModem(loop)
+    modem.add_devices(100, "dimmer")
+    modem.connect(plm)
+"""
+import asyncio
+from collections import deque
+import logging
+import random
+
+from insteonplm.address import Address
+
+__all__ = ("SimulatedDevice", "SimulatedModem", "DEVICE_TYPES")
+_LOGGER = logging.getLogger(__name__)
+
+DEVICE_TYPES = {
+    "dimmer": (0x01, 0x20, 0x41),
+    "keypad": (0x01, 0x1C, 0x43),
+    "switch": (0x02, 0x2A, 0x43),
+    "outlet": (0x02, 0x39, 0x44),
+}
+
+MODEM_ADDRESS = "448511"
+MODEM_INFO = (0x03, 0x15, 0x9B)
+
+ACK = 0x06
+NAK = 0x15
+MAX_HOPS = 3
+
+# Message types of the message flags
+FLAG_DIRECT = 0x00
+FLAG_DIRECT_ACK = 0x20
+FLAG_ALL_LINK_CLEANUP = 0x40
+FLAG_BROADCAST = 0x80
+FLAG_ALL_LINK_BROADCAST = 0xC0
+FLAG_EXTENDED = 0x10
+
+CONTROLLER_RECORD = 0xE2
+RESPONDER_RECORD = 0xA2
+HIGH_WATER_MARK = 0x00
+FIRST_RECORD = 0x0FFF
+RECORD_SIZE = 8
+
+# Seconds to send a byte at 9600 baud with a start and stop bit
+SERIAL_BYTE_SECONDS = 10 / 9600
+# Seconds a standard and an extended message take for each hop
+STANDARD_HOP_SECONDS = 0.05
+EXTENDED_HOP_SECONDS = 0.1
+# Seconds the modem takes to act on a command
+MODEM_PROCESSING_SECONDS = 0.002
+
+
+class SimulatedDevice:
+    """INSTEON device on the simulated network.
+
+    Parameters:
+        address: Device address.
+        cat: Device category.
+        subcat: Device subcategory.
+        firmware: (optional) Device firmware version.
+        hops: (optional) Number of hops between the device and the modem,
+        default is 1.
+        level: (optional) Starting on-level of the device, default is off.
+    """
+
+    def __init__(self, address, cat, subcat, firmware=0x00, hops=1, level=0x00):
+        """Init the SimulatedDevice class."""
+        self.address = Address(address)
+        self.cat = cat
+        self.subcat = subcat
+        self.firmware = firmware
+        self.hops = hops
+        self.level = level
+        self.aldb = {}
+        self.commands_received = 0
+
+    def add_link(self, control_flags, group, address, data1=0, data2=0, data3=0):
+        """Add an All-Link record after the last record in the ALDB."""
+        mem_addr = FIRST_RECORD - len(self.aldb) * RECORD_SIZE
+        self.aldb[mem_addr] = bytes(
+            [control_flags, group]
+            + list(Address(address).bytes)
+            + [data1, data2, data3]
+        )
+        return mem_addr
+
+    def handle_command(self, modem_address, cmd1, cmd2, userdata=None):
+        """Act on a direct command and return the messages sent in reply.
+
+        Each message is a tuple of the flags, target address, cmd1, cmd2 and
+        the user data for extended messages or None.
+        """
+        self.commands_received += 1
+        if cmd1 == 0x10:
+            # ID request is answered with a SET button pressed broadcast
+            info = bytes([self.cat, self.subcat, self.firmware])
+            return [
+                (FLAG_DIRECT_ACK, modem_address, cmd1, cmd2, None),
+                (FLAG_BROADCAST, info, 0x01, 0x00, None),
+            ]
+        if cmd1 == 0x19:
+            return [(FLAG_DIRECT_ACK, modem_address, 0x00, self.level, None)]
+        if cmd1 in [0x11, 0x12]:
+            self.level = cmd2 if cmd1 == 0x11 else 0xFF
+            return [(FLAG_DIRECT_ACK, modem_address, cmd1, self.level, None)]
+        if cmd1 in [0x13, 0x14]:
+            self.level = 0x00
+            return [(FLAG_DIRECT_ACK, modem_address, cmd1, 0x00, None)]
+        if cmd1 == 0x2F and userdata is not None:
+            return self._aldb_command(modem_address, cmd1, cmd2, userdata)
+        if cmd1 == 0x2E and userdata is not None and userdata[1] == 0x00:
+            data = bytes([userdata[0], 0x01]) + bytes(12)
+            return [
+                (FLAG_DIRECT_ACK, modem_address, cmd1, cmd2, None),
+                (FLAG_DIRECT, modem_address, cmd1, cmd2, data),
+            ]
+        return [(FLAG_DIRECT_ACK, modem_address, cmd1, cmd2, None)]
+
+    def _aldb_command(self, modem_address, cmd1, cmd2, userdata):
+        replies = [(FLAG_DIRECT_ACK, modem_address, cmd1, cmd2, None)]
+        mem_addr = userdata[2] << 8 | userdata[3]
+        if userdata[1] == 0x00:
+            for rec_addr in self._read_addresses(mem_addr, userdata[4]):
+                data = (
+                    bytes([0x00, 0x01, rec_addr >> 8, rec_addr & 0xFF, 0x00])
+                    + self._record(rec_addr)
+                    + bytes(1)
+                )
+                replies.append((FLAG_DIRECT, modem_address, cmd1, cmd2, data))
+        elif userdata[1] == 0x02:
+            self.aldb[mem_addr] = bytes(userdata[5:13])
+        return replies
+
+    def _read_addresses(self, mem_addr, rec_count):
+        if mem_addr == 0x0000:
+            mem_addr = FIRST_RECORD
+        if rec_count:
+            return [mem_addr - num * RECORD_SIZE for num in range(rec_count)]
+        addresses = []
+        while True:
+            addresses.append(mem_addr)
+            if self._record(mem_addr)[0] == HIGH_WATER_MARK:
+                return addresses
+            mem_addr -= RECORD_SIZE
+
+    def _record(self, mem_addr):
+        return self.aldb.get(mem_addr, bytes(RECORD_SIZE))
+
+
+class Serial:
+    """Serial port settings of the simulated modem."""
+
+    def __init__(self):
+        """Init the Serial class."""
+        self.timeout = 0
+        self.write_timeout = 0
+
+
+# pylint: disable=too-many-instance-attributes
+class SimulatedModem(asyncio.Transport):
+    """Transport answering an IM as an Insteon Modem on a simulated network.
+
+    Parameters:
+        loop: asyncio event loop.
+        address: (optional) Modem address.
+        time_scale: (optional) Scale applied to every delay, default is 1
+        for real time. A time_scale of 0 answers without delay.
+        loss: (optional) Probability a device message is lost, default is 0.
+        nak_rate: (optional) Probability the modem answers a command sent
+        to a device with a NAK, default is 0.
+        duplicates: (optional) Times an All-Link broadcast is received for
+        each hop, default is 1.
+        seed: (optional) Seed of the random number generator used for loss
+        and NAKs so runs can be repeated.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        loop,
+        address=MODEM_ADDRESS,
+        time_scale=1.0,
+        loss=0.0,
+        nak_rate=0.0,
+        duplicates=1,
+        seed=None,
+    ):
+        """Init the SimulatedModem class."""
+        super().__init__()
+        self._loop = loop
+        self._protocol = None
+        self._closing = False
+        self._random = random.Random(seed)
+        self._rx_queue = deque()
+        self._rx_handle = None
+        self._serial_free = 0
+        self._powerline_free = 0
+        self._next_record = 0
+        self.address = Address(address)
+        self.time_scale = time_scale
+        self.loss = loss
+        self.nak_rate = nak_rate
+        self.duplicates = duplicates
+        self.serial = Serial()
+        self.devices = {}
+        self.aldb = []
+        self.messages_sent = 0
+        self.messages_lost = 0
+        self.naks_sent = 0
+
+    def add_device(self, device):
+        """Add a device to the network linked to the modem.
+
+        The modem controls the device in group 0 and responds to the device
+        in group 1.
+        """
+        self.devices[device.address.id] = device
+        device.add_link(RESPONDER_RECORD, 0x00, self.address, 0x00, 0x00, 0x00)
+        device.add_link(CONTROLLER_RECORD, 0x01, self.address, 0x03, 0x1C, 0x01)
+        device.add_link(HIGH_WATER_MARK, 0x00, "000000")
+        self.aldb.append((CONTROLLER_RECORD, 0x00, device.address))
+        self.aldb.append((RESPONDER_RECORD, 0x01, device.address))
+        return device
+
+    def add_devices(self, count, device_type="dimmer", hops=1, start=0x200000):
+        """Add a number of devices of a type and return them.
+
+        Device addresses count up from `start`.
+        """
+        cat, subcat, firmware = DEVICE_TYPES[device_type]
+        devices = []
+        for dev_num in range(len(self.devices), len(self.devices) + count):
+            address = "{:06x}".format(start + dev_num)
+            devices.append(
+                self.add_device(
+                    SimulatedDevice(address, cat, subcat, firmware, hops=hops)
+                )
+            )
+        return devices
+
+    def connect(self, protocol):
+        """Connect the modem to the protocol."""
+        self._protocol = protocol
+        self._closing = False
+        protocol.connection_made(self)
+
+    def press(self, device, group=0x01, cmd1=0x11):
+        """Press a button on a device.
+
+        The device sends an All-Link broadcast for the group, received once
+        for each hop, followed by an All-Link cleanup to the modem.
+        """
+        device.level = 0xFF if cmd1 in [0x11, 0x12] else 0x00
+        group_address = bytes([0x00, 0x00, group])
+        duration = self._message_seconds(device, False)
+        for hop in range(device.hops + 1):
+            for _ in range(self.duplicates):
+                flags = FLAG_ALL_LINK_BROADCAST | _hops(device.hops - hop)
+                self._powerline_message(
+                    device, flags, group_address, cmd1, 0x00, None, duration
+                )
+        self._powerline_message(
+            device,
+            FLAG_ALL_LINK_CLEANUP | _hops(device.hops),
+            self.address.bytes,
+            cmd1,
+            group,
+            None,
+            duration,
+        )
+
+    # asyncio.Transport interface
+    def write(self, data):
+        """Act on a command written to the modem."""
+        if self._closing:
+            return
+        data = bytes(data)
+        code = data[1]
+        if code == 0x60:
+            self._serial_reply(
+                data + self.address.bytes + bytes(MODEM_INFO) + bytes([ACK])
+            )
+        elif code in [0x69, 0x6A]:
+            self._all_link_record(code)
+        elif code == 0x62:
+            self._send_to_device(data)
+        else:
+            self._serial_reply(data + bytes([ACK]))
+
+    def is_closing(self):
+        """Return if the transport is closing."""
+        return self._closing
+
+    def close(self):
+        """Close the connection to the protocol."""
+        if self._closing:
+            return
+        self._closing = True
+        if self._rx_handle is not None:
+            self._rx_handle.cancel()
+            self._rx_handle = None
+        self._rx_queue.clear()
+        if self._protocol is not None:
+            self._loop.call_soon(self._protocol.connection_lost, None)
+
+    def set_write_buffer_limits(self, high=None, low=None):
+        """Ignore the write buffer limits."""
+
+    @staticmethod
+    def get_write_buffer_size():
+        """Return the write buffer size."""
+        return 0
+
+    def _send_to_device(self, data):
+        extended = bool(data[5] & FLAG_EXTENDED)
+        device = self.devices.get(Address(data[2:5]).id)
+        if self.nak_rate and self._random.random() < self.nak_rate:
+            self.naks_sent += 1
+            self._serial_reply(data + bytes([NAK]))
+            return
+        self._serial_reply(data + bytes([ACK]))
+        if device is None:
+            return
+        # The command travels to the device before it replies
+        self._powerline_free = (
+            max(self._powerline_free, self._loop.time())
+            + self._message_seconds(device, extended) * self.time_scale
+        )
+        userdata = data[8:22] if extended else None
+        for flags, target, cmd1, cmd2, reply_data in device.handle_command(
+            self.address, data[6], data[7], userdata
+        ):
+            flags |= _hops(device.hops)
+            if reply_data is not None:
+                flags |= FLAG_EXTENDED
+            duration = self._message_seconds(device, reply_data is not None)
+            self._powerline_message(
+                device, flags, target, cmd1, cmd2, reply_data, duration
+            )
+
+    # pylint: disable=too-many-arguments
+    def _powerline_message(self, device, flags, target, cmd1, cmd2, data, duration):
+        start = max(self._powerline_free, self._loop.time())
+        self._powerline_free = start + duration * self.time_scale
+        if self.loss and self._random.random() < self.loss:
+            self.messages_lost += 1
+            return
+        target = Address(target).bytes
+        if data is None:
+            msg = (
+                bytes([0x02, 0x50])
+                + device.address.bytes
+                + target
+                + bytes([flags, cmd1, cmd2])
+            )
+        else:
+            msg = (
+                bytes([0x02, 0x51])
+                + device.address.bytes
+                + target
+                + bytes([flags, cmd1, cmd2])
+                + bytes(data)
+            )
+        self._deliver(msg, self._powerline_free)
+
+    def _all_link_record(self, code):
+        if code == 0x69:
+            self._next_record = 0
+        if self._next_record >= len(self.aldb):
+            self._serial_reply(bytes([0x02, code, NAK]))
+            return
+        control_flags, group, address = self.aldb[self._next_record]
+        self._next_record += 1
+        self._serial_reply(bytes([0x02, code, ACK]))
+        self._deliver(
+            bytes([0x02, 0x57, control_flags, group])
+            + address.bytes
+            + bytes([0x00, 0x00, 0x00]),
+            self._loop.time(),
+        )
+
+    def _serial_reply(self, data):
+        self._deliver(
+            data, self._loop.time() + MODEM_PROCESSING_SECONDS * self.time_scale
+        )
+
+    def _deliver(self, data, when):
+        """Queue data to be read by the protocol in order on the serial line."""
+        start = max(when, self._serial_free)
+        self._serial_free = start + len(data) * SERIAL_BYTE_SECONDS * self.time_scale
+        self._rx_queue.append((self._serial_free, data))
+        if self._rx_handle is None:
+            self._schedule_rx()
+
+    def _schedule_rx(self):
+        when = self._rx_queue[0][0]
+        if when <= self._loop.time():
+            self._rx_handle = self._loop.call_soon(self._read_rx)
+        else:
+            self._rx_handle = self._loop.call_at(when, self._read_rx)
+
+    def _read_rx(self):
+        self._rx_handle = None
+        now = self._loop.time()
+        while self._rx_queue and self._rx_queue[0][0] <= now:
+            _, data = self._rx_queue.popleft()
+            self.messages_sent += 1
+            self._protocol.data_received(data)
+        if self._rx_queue:
+            self._schedule_rx()
+
+    @staticmethod
+    def _message_seconds(device, extended):
+        hop_seconds = EXTENDED_HOP_SECONDS if extended else STANDARD_HOP_SECONDS
+        return (device.hops + 1) * hop_seconds
+
+
+def _hops(hops_used):
+    """Return the hop bits of the message flags."""
+    return (MAX_HOPS - hops_used) << 2 | MAX_HOPS
@@ -6,6 +6,56 @@ from insteonplm.address import Address
 _LOGGER = logging.getLogger(__name__)
 
 
+def value_changed(old_value, new_value, deadband=0):
+    """Return if a state value changed by more than the deadband.
+
+    Numeric values change when they differ by more than the deadband and
+    other values change when they are not equal.
+    """
+    if old_value is None:
+        return new_value is not None
+    if (
+        deadband
+        and isinstance(old_value, (int, float))
+        and not isinstance(old_value, bool)
+    ):
+        try:
+            return abs(new_value - old_value) > deadband
+        except TypeError:
+            pass
+    return new_value != old_value
+
+
+class ChangeFilter:
+    """Subscriber callback only called when the value changes.
+
+    Parameters:
+        callback: Subscriber callback defined as
+        callback(address, group, value).
+        deadband: (optional) Amount a numeric value must change by before
+        the callback is called, default is 0 for any change.
+    """
+
+    def __init__(self, callback, deadband=0):
+        """Init the ChangeFilter class."""
+        self._callback = callback
+        self._deadband = deadband
+        self._values = {}
+
+    def __repr__(self):
+        """Return the representation of the filtered callback."""
+        return "ChangeFilter({!r}, deadband={!r})".format(
+            self._callback, self._deadband
+        )
+
+    def __call__(self, address, group, value):
+        """Call the callback if the value of the group changed."""
+        if not value_changed(self._values.get(group), value, self._deadband):
+            return None
+        self._values[group] = value
+        return self._callback(address, group, value)
+
+
 # pylint: disable=too-many-instance-attributes
 class State:
     """INSTEON device state base class.
@@ -64,6 +114,10 @@ class State:
         self._updatemethod = None
         self._send_method = send_message_method
         self._message_callbacks = message_callbacks
+        self._dispatcher = None
+        self._changes_only = False
+        self._deadband = 0
+        self._notified_value = None
 
     @property
     def value(self):
@@ -72,6 +126,11 @@ class State:
             self.async_refresh_state()
         return self._value
 
+    @property
+    def cached_value(self):
+        """Return the last known value without requesting a refresh."""
+        return self._value
+
     @property
     def name(self):
         """Return the name of the state."""
@@ -87,6 +146,44 @@ class State:
         """Return the link group of the state."""
         return self._group
 
+    @property
+    def dispatcher(self):
+        """Return the notification dispatcher used to notify subscribers."""
+        return self._dispatcher
+
+    @dispatcher.setter
+    def dispatcher(self, dispatcher):
+        """Set the notification dispatcher used to notify subscribers.
+
+        Without a dispatcher the subscribers are called as soon as the state
+        changes.
+        """
+        self._dispatcher = dispatcher
+
+    @property
+    def changes_only(self):
+        """Return if subscribers are only notified when the value changes."""
+        return self._changes_only
+
+    @changes_only.setter
+    def changes_only(self, changes_only):
+        """Set if subscribers are only notified when the value changes."""
+        self._changes_only = bool(changes_only)
+        self._notified_value = None
+
+    @property
+    def deadband(self):
+        """Return the amount a value must change by to notify subscribers.
+
+        Only used when changes_only is set.
+        """
+        return self._deadband
+
+    @deadband.setter
+    def deadband(self, deadband):
+        """Set the amount a value must change by to notify subscribers."""
+        self._deadband = deadband
+
     @property
     def is_responder(self):
         """Return if this state responds to a controller."""
@@ -116,15 +213,48 @@ class State:
         """Call the update method to request current state value."""
         if self._updatemethod is not None:
             # pylint: disable=not-callable
-            self._updatemethod()
+            return self._updatemethod()
+
+    def scene_changed(self, is_on, on_level):
+        """Update the state value after the modem triggers a scene.
+
+        Parameters:
+            is_on: True if the scene was turned on, False if turned off.
+            on_level: The on level from the responder link data (data1).
 
-    def register_updates(self, callback):
-        """Register a callback to notify a listener of state changes."""
+        Returns True if the state value was set from the link data or False
+        if the value cannot be predicted and a status request is needed.
+        """
+        return False
+
+    def register_updates(self, callback, changes_only=False, deadband=0):
+        """Register a callback to notify a listener of state changes.
+
+        Parameters:
+            callback: Callback defined as callback(address, group, value).
+            changes_only: (optional) Only call the callback when the value
+            changes, default is False to call it for every update.
+            deadband: (optional) Amount a numeric value must change by
+            before the callback is called when changes_only is set.
+        """
         _LOGGER.debug("Registered callback for state: %s", self._stateName)
+        if changes_only:
+            callback = ChangeFilter(callback, deadband)
         self._observer_callbacks.append(callback)
 
     def _update_subscribers(self, val):
         """Save state value and notify listeners of the change."""
         self._value = val
-        for callback in self._observer_callbacks:
-            callback(self._address, self._group, val)
+        if self._changes_only:
+            if not value_changed(self._notified_value, val, self._deadband):
+                return
+            self._notified_value = val
+        self._notify(self._observer_callbacks, self._group, val)
+
+    def _notify(self, callbacks, group, val):
+        """Notify the callbacks of a new value through the dispatcher."""
+        if self._dispatcher is not None:
+            self._dispatcher.notify(self, group, val, callbacks)
+            return
+        for callback in callbacks:
+            callback(self._address, group, val)
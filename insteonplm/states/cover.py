@@ -138,29 +138,29 @@ class Cover(State):
         open_command = StandardSend(
             self._address, COMMAND_LIGHT_ON_0X11_NONE, cmd2=0xFF
         )
-        self._send_method(open_command, self._open_message_received)
+        return self._send_method(open_command, self._open_message_received)
 
     def open_fast(self):
         """Turn the device ON Fast."""
         open_command = StandardSend(
             self._address, COMMAND_LIGHT_ON_FAST_0X12_NONE, cmd2=0xFF
         )
-        self._send_method(open_command, self._open_message_received)
+        return self._send_method(open_command, self._open_message_received)
 
     def close(self):
         """Turn the device off."""
         close_command = StandardSend(self._address, COMMAND_LIGHT_OFF_0X13_0X00)
-        self._send_method(close_command, self._closed_message_received)
+        return self._send_method(close_command, self._closed_message_received)
 
     def close_fast(self):
         """Turn the device off."""
         close_command = StandardSend(self._address, COMMAND_LIGHT_OFF_FAST_0X14_0X00)
-        self._send_method(close_command, self._closed_message_received)
+        return self._send_method(close_command, self._closed_message_received)
 
     def set_position(self, val):
         """Set the devive OPEN LEVEL."""
         if val == 0:
-            self.close()
+            return self.close()
         else:
             setlevel = 255
             if val < 1:
@@ -170,12 +170,12 @@ class Cover(State):
             set_command = StandardSend(
                 self._address, COMMAND_LIGHT_ON_0X11_NONE, cmd2=setlevel
             )
-            self._send_method(set_command, self._open_message_received)
+            return self._send_method(set_command, self._open_message_received)
 
     def set_position_fast(self, val):
         """Set the devive OPEN LEVEL."""
         if val == 0:
-            self.close_fast()
+            return self.close_fast()
         else:
             setlevel = 255
             if val < 1:
@@ -185,7 +185,7 @@ class Cover(State):
             set_command = StandardSend(
                 self._address, COMMAND_LIGHT_ON_FAST_0X12_NONE, cmd2=setlevel
             )
-            self._send_method(set_command, self._open_message_received)
+            return self._send_method(set_command, self._open_message_received)
 
     def _open_message_received(self, msg):
         cmd2 = msg.cmd2 if msg.cmd2 else 255
@@ -203,7 +203,7 @@ class Cover(State):
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00
         )
-        self._send_method(status_command, self._status_message_received)
+        return self._send_method(status_command, self._status_message_received)
 
     def _status_message_received(self, msg):
         _LOGGER.debug("Cover status message received called")
@@ -221,17 +221,17 @@ class DimmableSwitch(State):
     def on(self):
         """Turn the device ON."""
         on_command = StandardSend(self._address, COMMAND_LIGHT_ON_0X11_NONE, cmd2=0xFF)
-        self._send_method(on_command, self._on_message_received)
+        return self._send_method(on_command, self._on_message_received)
 
     def off(self):
         """Turn the device off."""
         off_command = StandardSend(self._address, COMMAND_LIGHT_OFF_0X13_0X00)
-        self._send_method(off_command, self._off_message_received)
+        return self._send_method(off_command, self._off_message_received)
 
     def set_level(self, val):
         """Set the devive ON LEVEL."""
         if val == 0:
-            self.off()
+            return self.off()
         else:
             setlevel = 255
             if val < 1:
@@ -241,19 +241,26 @@ class DimmableSwitch(State):
             set_command = StandardSend(
                 self._address, COMMAND_LIGHT_ON_0X11_NONE, cmd2=setlevel
             )
-            self._send_method(set_command, self._on_message_received)
+            return self._send_method(set_command, self._on_message_received)
 
     def brighten(self):
         """Brighten the device one step."""
         brighten_command = StandardSend(
             self._address, COMMAND_LIGHT_BRIGHTEN_ONE_STEP_0X15_0X00
         )
-        self._send_method(brighten_command)
+        return self._send_method(brighten_command)
 
     def dim(self):
         """Dim the device one step."""
         dim_command = StandardSend(self._address, COMMAND_LIGHT_DIM_ONE_STEP_0X16_0X00)
-        self._send_method(dim_command)
+        return self._send_method(dim_command)
+
+    def scene_changed(self, is_on, on_level):
+        """Update the state value after the modem triggers a scene."""
+        if is_on and not on_level:
+            return False
+        self._update_subscribers(on_level if is_on else 0x00)
+        return True
 
     def _on_message_received(self, msg):
         cmd2 = msg.cmd2 if msg.cmd2 else 255
@@ -271,7 +278,7 @@ class DimmableSwitch(State):
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00
         )
-        self._send_method(status_command, self._status_message_received)
+        return self._send_method(status_command, self._status_message_received)
 
     def _status_message_received(self, msg):
         _LOGGER.debug("DimmableSwitch status message received called")
@@ -321,19 +328,19 @@ class DimmableSwitch_Fan(DimmableSwitch):
             cmd2=FAN_SPEED_MEDIUM,
         )
         on_command.set_checksum()
-        self._send_method(on_command, self._on_message_received)
+        return self._send_method(on_command, self._on_message_received)
 
     def set_level(self, val):
         """Set the fan speed."""
         speed = self._value_to_fan_speed(val)
         if val == 0:
-            self.off()
+            return self.off()
         else:
             set_command = ExtendedSend(
                 self._address, COMMAND_LIGHT_ON_0X11_NONE, self._udata, cmd2=speed
             )
             set_command.set_checksum()
-            self._send_method(set_command, self._on_message_received)
+            return self._send_method(set_command, self._on_message_received)
 
     def off(self):
         """Turn off the fan."""
@@ -341,14 +348,18 @@ class DimmableSwitch_Fan(DimmableSwitch):
             self._address, COMMAND_LIGHT_OFF_0X13_0X00, self._udata
         )
         off_command.set_checksum()
-        self._send_method(off_command, self._off_message_received)
         _LOGGER.debug("Ending DimmableSwitch_Fan.off")
+        return self._send_method(off_command, self._off_message_received)
+
+    def scene_changed(self, is_on, on_level):
+        """Request the fan speed after the modem triggers a scene."""
+        return False
 
     def _status_request(self):
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_NONE, cmd2=0x03
         )
-        self._send_method(status_command, self._status_message_received)
+        return self._send_method(status_command, self._status_message_received)
 
     def _status_message_received(self, msg):
         self._update_subscribers(msg.cmd2)
@@ -551,4 +562,4 @@ class DimmableKeypadA(DimmableSwitch):
         switch_status_msg = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00
         )
-        self._send_method(switch_status_msg, self._status_message_received)
+        return self._send_method(switch_status_msg, self._status_message_received)
@@ -24,7 +24,7 @@ from insteonplm.messages.standardReceive import StandardReceive
 from insteonplm.messages.extendedReceive import ExtendedReceive
 from insteonplm.messages.messageFlags import MessageFlags
 from insteonplm.messages.userdata import Userdata
-from insteonplm.states import State
+from insteonplm.states import ChangeFilter, State
 from insteonplm.utils import bit_is_set, set_bit
 
 _LOGGER = logging.getLogger(__name__)
@@ -88,7 +88,7 @@ class OnOffStateBase(State):
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00
         )
-        self._send_method(status_command, self._status_message_received)
+        return self._send_method(status_command, self._status_message_received)
 
     def _status_message_received(self, msg):
         """Receive a status message."""
@@ -221,12 +221,20 @@ class OnOffSwitch(OnOffStateBase):
     def on(self):
         """Send ON command to device."""
         on_command = StandardSend(self._address, COMMAND_LIGHT_ON_0X11_NONE, 0xFF)
-        self._send_method(on_command, self._on_message_received)
+        return self._send_method(on_command, self._on_message_received)
 
     def off(self):
         """Send OFF command to device."""
         off_command = StandardSend(self._address, COMMAND_LIGHT_OFF_0X13_0X00)
-        self._send_method(off_command, self._off_message_received)
+        return self._send_method(off_command, self._off_message_received)
+
+    def scene_changed(self, is_on, on_level):
+        """Update the state value after the modem triggers a scene."""
+        if is_on:
+            self._update_subscribers(0xFF)
+        else:
+            self._update_subscribers(0x00)
+        return True
 
 
 class OnOffSwitch_OutletTop(OnOffStateBase):
@@ -269,11 +277,11 @@ class OnOffSwitch_OutletTop(OnOffStateBase):
     def on(self):
         """Send ON command to device."""
         on_command = StandardSend(self._address, COMMAND_LIGHT_ON_0X11_NONE, 0xFF)
-        self._send_method(on_command, self._on_message_received)
+        return self._send_method(on_command, self._on_message_received)
 
     def off(self):
         """Send OFF command to device."""
-        self._send_method(
+        return self._send_method(
             StandardSend(self._address, COMMAND_LIGHT_OFF_0X13_0X00),
             self._off_message_received,
         )
@@ -283,7 +291,7 @@ class OnOffSwitch_OutletTop(OnOffStateBase):
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X01
         )
-        self._send_method(status_command, self._status_message_0x01_received)
+        return self._send_method(status_command, self._status_message_0x01_received)
 
     def _status_message_0x01_received(self, msg):
         """Handle status received messages.
@@ -346,7 +354,7 @@ class OnOffSwitch_OutletBottom(OnOffStateBase):
             self._address, COMMAND_LIGHT_ON_0X11_NONE, self._udata, cmd2=0xFF
         )
         on_command.set_checksum()
-        self._send_method(on_command, self._on_message_received)
+        return self._send_method(on_command, self._on_message_received)
 
     def off(self):
         """Send an OFF message to device group."""
@@ -354,14 +362,14 @@ class OnOffSwitch_OutletBottom(OnOffStateBase):
             self._address, COMMAND_LIGHT_OFF_0X13_0X00, self._udata
         )
         off_command.set_checksum()
-        self._send_method(off_command, self._off_message_received)
+        return self._send_method(off_command, self._off_message_received)
 
     def _send_status_0x01_request(self):
         """Send a status request."""
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X01
         )
-        self._send_method(status_command, self._status_message_received)
+        return self._send_method(status_command, self._status_message_received)
 
     def _status_message_received(self, msg):
         """Receive a status message.
@@ -420,12 +428,12 @@ class OpenClosedRelay(State):
     def open(self):
         """Send OPEN command to device."""
         open_command = StandardSend(self._address, COMMAND_LIGHT_ON_0X11_NONE, 0xFF)
-        self._send_method(open_command, self._open_message_received)
+        return self._send_method(open_command, self._open_message_received)
 
     def close(self):
         """Send CLOSE command to device."""
         close_command = StandardSend(self._address, COMMAND_LIGHT_OFF_0X13_0X00)
-        self._send_method(close_command, self._close_message_received)
+        return self._send_method(close_command, self._close_message_received)
 
     # pylint: disable=unused-argument
     def _open_message_received(self, msg):
@@ -442,7 +450,7 @@ class OpenClosedRelay(State):
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00
         )
-        self._send_method(status_command, self._status_message_received)
+        return self._send_method(status_command, self._status_message_received)
 
     def _status_message_received(self, msg):
         """Receive a status message."""
@@ -502,7 +510,7 @@ class OnOffKeypadA(OnOffSwitch):
         switch_status_msg = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00
         )
-        self._send_method(switch_status_msg, self._status_message_received)
+        return self._send_method(switch_status_msg, self._status_message_received)
 
 
 # pylint: disable=too-many-instance-attributes
@@ -600,11 +608,11 @@ class OnOffKeypad(OnOffStateBase):
 
     def on(self):
         """Turn on the LED for the button."""
-        self._leds.on(self._group)
+        return self._leds.on(self._group)
 
     def off(self):
         """Turn off the LED for the button."""
-        self._leds.off(self._group)
+        return self._leds.off(self._group)
 
     def led_is_on(self):
         """Return if the LED is on for the button."""
@@ -623,54 +631,54 @@ class OnOffKeypad(OnOffStateBase):
     def set_on_mask(self, mask):
         """Set the on mask for the current group/button."""
         set_cmd = self._create_set_property_msg("_on_mask", 0x02, mask)
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def set_off_mask(self, mask):
         """Set the off mask for the current group/button."""
         set_cmd = self._create_set_property_msg("_off_mask", 0x03, mask)
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def set_x10_address(self, x10address):
         """Set the X10 address for the current group/button."""
         set_cmd = self._create_set_property_msg("_x10_house_code", 0x04, x10address)
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def set_ramp_rate(self, ramp_rate):
         """Set the X10 address for the current group/button."""
         set_cmd = self._create_set_property_msg("_ramp_rate", 0x05, ramp_rate)
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def set_on_level(self, val):
         """Set on level for the button/group."""
         on_cmd = self._create_set_property_msg("_on_level", 0x06, val)
         self._send_method(on_cmd, self._property_set)
-        self._send_method(on_cmd, self._on_message_received)
+        return self._send_method(on_cmd, self._on_message_received)
 
     def set_led_brightness(self, brightness):
         """Set the LED brightness for the current group/button."""
         set_cmd = self._create_set_property_msg("_led_brightness", 0x07, brightness)
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def set_non_toggle_mask(self, non_toggle_mask):
         """Set the non_toggle_mask for the current group/button."""
         set_cmd = self._create_set_property_msg(
             "_non_toggle_mask", 0x08, non_toggle_mask
         )
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def set_x10_all_bit_mask(self, x10_all_bit_mask):
         """Set the x10_all_bit_mask for the current group/button."""
         set_cmd = self._create_set_property_msg(
             "_x10_all_bit_mask", 0x0A, x10_all_bit_mask
         )
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def set_trigger_group_bit_mask(self, trigger_group_bit_mask):
         """Set the trigger_group_bit_mask for the current group/button."""
         set_cmd = self._create_set_property_msg(
             "_trigger_group_bit_mask", 0x0C, trigger_group_bit_mask
         )
-        self._send_method(set_cmd, self._property_set)
+        return self._send_method(set_cmd, self._property_set)
 
     def scene_on(self):
         """Trigger group/scene to ON level."""
@@ -692,7 +700,7 @@ class OnOffKeypad(OnOffStateBase):
         _LOGGER.debug(
             "Calling scene_on and sending response to " "_received_scene_triggered"
         )
-        self._send_method(cmd, self._received_scene_triggered)
+        return self._send_method(cmd, self._received_scene_triggered)
 
     def scene_off(self):
         """Trigger group/scene to OFF level."""
@@ -711,12 +719,12 @@ class OnOffKeypad(OnOffStateBase):
             self._address, COMMAND_EXTENDED_TRIGGER_ALL_LINK_0X30_0X00, user_data
         )
         cmd.set_checksum()
-        self._send_method(cmd, self._received_scene_triggered)
+        return self._send_method(cmd, self._received_scene_triggered)
 
     def scene_level(self, level):
         """Trigger group/scene to input level."""
         if level == 0:
-            self.scene_off()
+            return self.scene_off()
         else:
             user_data = Userdata(
                 {
@@ -733,7 +741,7 @@ class OnOffKeypad(OnOffStateBase):
                 self._address, COMMAND_EXTENDED_TRIGGER_ALL_LINK_0X30_0X00, user_data
             )
             cmd.set_checksum()
-            self._send_method(cmd, self._received_scene_triggered)
+            return self._send_method(cmd, self._received_scene_triggered)
 
     def extended_status_request(self):
         """Send status request for group/button."""
@@ -743,7 +751,7 @@ class OnOffKeypad(OnOffStateBase):
             self._address, COMMAND_EXTENDED_GET_SET_0X2E_0X00, userdata=user_data
         )
         cmd.set_checksum()
-        self._send_method(cmd, self._status_message_received, True)
+        return self._send_method(cmd, self._status_message_received, True)
 
     # pylint: disable=unused-argument
     def _on_message_received(self, msg):
@@ -963,11 +971,15 @@ class OnOffKeypadLed(State):
 
     def on(self, group):
         """Turn the LED on for a group."""
-        asyncio.ensure_future(self._send_led_on_off_request(group, 1), loop=self._loop)
+        return asyncio.ensure_future(
+            self._send_led_on_off_request(group, 1), loop=self._loop
+        )
 
     def off(self, group):
         """Turn the LED off for a group."""
-        asyncio.ensure_future(self._send_led_on_off_request(group, 0), loop=self._loop)
+        return asyncio.ensure_future(
+            self._send_led_on_off_request(group, 0), loop=self._loop
+        )
 
     def manual_on(self, group):
         """Turn the LED on."""
@@ -984,12 +996,18 @@ class OnOffKeypadLed(State):
         val = self._value & 1 << group - 1
         return bool(val)
 
-    def register_led_updates(self, callback, button):
-        """Register a callback when a specific button LED changes."""
+    def register_led_updates(self, callback, button, changes_only=False):
+        """Register a callback when a specific button LED changes.
+
+        With changes_only set the callback is only called when the LED turns
+        on or off, not for every LED status update.
+        """
         button_callbacks = self._button_observer_callbacks.get(button)
         if not button_callbacks:
             self._button_observer_callbacks[button] = []
         _LOGGER.debug("New callback for button %d", button)
+        if changes_only:
+            callback = ChangeFilter(callback)
         self._button_observer_callbacks[button].append(callback)
 
     async def _send_led_on_off_request(self, group, val):
@@ -1000,7 +1018,7 @@ class OnOffKeypadLed(State):
         user_data = Userdata({"d1": 0x01, "d2": 0x09, "d3": self._new_value})
         msg = ExtendedSend(self._address, COMMAND_EXTENDED_GET_SET_0X2E_0X00, user_data)
         msg.set_checksum()
-        self._send_method(msg, self._on_off_ack_received, True)
+        return await self._send_method(msg, self._on_off_ack_received, True)
 
     # pylint: disable=unused-argument
     def _on_off_ack_received(self, msg):
@@ -1012,7 +1030,7 @@ class OnOffKeypadLed(State):
         led_status_msg = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X01
         )
-        self._send_method(led_status_msg, self._status_message_received)
+        return self._send_method(led_status_msg, self._status_message_received)
 
     def _status_message_received(self, msg):
         _LOGGER.debug(
@@ -1050,8 +1068,6 @@ class OnOffKeypadLed(State):
             # if old_bit_set != new_bit_set:
             callbacks = self._button_observer_callbacks.get(button)
             if callbacks:
-                for callback in callbacks:
-                    _LOGGER.debug("Calling button update callback %s", callback)
-                    callback(self._address, button, int(new_bit_set))
+                self._notify(callbacks, button, int(new_bit_set))
             else:
                 _LOGGER.debug("No callbacks found for button %d", button)
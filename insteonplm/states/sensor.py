@@ -290,7 +290,7 @@ class IoLincSensor(SensorBase):
         status_command = StandardSend(
             self._address, COMMAND_LIGHT_STATUS_REQUEST_0X19_0X01
         )
-        self._send_method(status_command, self._status_message_received)
+        return self._send_method(status_command, self._status_message_received)
 
     # pylint: disable=unused-argument
     def _open_message_received(self, msg):
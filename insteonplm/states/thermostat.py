@@ -66,7 +66,7 @@ class Temperature(State):
             commandtuple=COMMAND_THERMOSTAT_GET_ZONE_INFORMATION_0X6A_NONE,
             cmd2=0x00,
         )
-        self._send_method(msg, self._status_received)
+        return self._send_method(msg, self._status_received)
 
     def _status_received(self, msg):
         self._update_subscribers(msg.cmd2 / 2)
@@ -127,7 +127,7 @@ class Humidity(State):
             commandtuple=COMMAND_THERMOSTAT_GET_ZONE_INFORMATION_0X6A_NONE,
             cmd2=0x20,
         )
-        self._send_method(msg, self._status_received)
+        return self._send_method(msg, self._status_received)
 
     def _status_received(self, msg):
         self._update_subscribers(msg.cmd2)
@@ -206,7 +206,7 @@ class SystemMode(State):
                 address=self._address, commandtuple=new_mode, userdata=Userdata()
             )
             msg.set_checksum()
-            self._send_method(msg, self._mode_change_ack)
+            return self._send_method(msg, self._mode_change_ack)
 
     def _mode_change_ack(self, msg):
         set_mode = msg.cmd2
@@ -227,7 +227,7 @@ class SystemMode(State):
             address=self._address,
             commandtuple=COMMAND_THERMOSTAT_CONTROL_GET_MODE_0X6B_0X02,
         )
-        self._send_method(msg, self._status_received)
+        return self._send_method(msg, self._status_received)
 
     def _status_received(self, msg):
         self._update_subscribers(ThermostatMode(msg.cmd2))
@@ -333,7 +333,7 @@ class FanMode(State):
                 address=self._address, commandtuple=new_mode, userdata=Userdata()
             )
             msg.set_checksum()
-            self._send_method(msg, self._mode_change_ack)
+            return self._send_method(msg, self._mode_change_ack)
 
     def _mode_change_ack(self, msg):
         set_mode = msg.cmd2
@@ -354,7 +354,7 @@ class FanMode(State):
             address=self._address,
             commandtuple=COMMAND_THERMOSTAT_CONTROL_GET_MODE_0X6B_0X02,
         )
-        self._send_method(msg, self._status_received)
+        return self._send_method(msg, self._status_received)
 
     def _status_received(self, msg):
         self._update_subscribers(ThermostatMode(msg.cmd2))
@@ -438,7 +438,7 @@ class CoolSetPoint(State):
             userdata=Userdata(),
         )
         msg.set_checksum()
-        self._send_method(msg, self._set_cool_point_ack)
+        return self._send_method(msg, self._set_cool_point_ack)
 
     def _set_cool_point_ack(self, msg):
         self._update_subscribers(msg.cmd2 / 2)
@@ -449,7 +449,7 @@ class CoolSetPoint(State):
             commandtuple=COMMAND_THERMOSTAT_GET_ZONE_INFORMATION_0X6A_NONE,
             cmd2=0x20,
         )
-        self._send_method(msg, self._status_message_received)
+        return self._send_method(msg, self._status_message_received)
 
     def _status_message_received(self, msg):
         self._update_subscribers(msg.cmd2 / 2)
@@ -510,7 +510,7 @@ class HeatSetPoint(State):
             userdata=Userdata(),
         )
         msg.set_checksum()
-        self._send_method(msg, self._set_heat_point_ack)
+        return self._send_method(msg, self._set_heat_point_ack)
 
     def _set_heat_point_ack(self, msg):
         self._update_subscribers(msg.cmd2)
@@ -521,7 +521,7 @@ class HeatSetPoint(State):
             commandtuple=COMMAND_THERMOSTAT_GET_ZONE_INFORMATION_0X6A_NONE,
             cmd2=0x20,
         )
-        self._send_method(msg, self._status_message_received)
+        return self._send_method(msg, self._status_message_received)
 
     def _status_message_received(self, msg):
         self._update_subscribers(msg.cmd2 / 2)
@@ -50,8 +50,9 @@ class X10OnOffSwitch(State):
         self._send_method(msg)
 
         msg = X10Send.command_msg(self.address.x10_housecode, X10_COMMAND_ON)
-        self._send_method(msg, False)
+        result = self._send_method(msg, False)
         self._update_subscribers(0xFF)
+        return result
 
     def off(self):
         """Send the Off command to an X10 device."""
@@ -61,8 +62,9 @@ class X10OnOffSwitch(State):
         self._send_method(msg)
 
         msg = X10Send.command_msg(self.address.x10_housecode, X10_COMMAND_OFF)
-        self._send_method(msg, False)
+        result = self._send_method(msg, False)
         self._update_subscribers(0x00)
+        return result
 
     # pylint: disable=unused-argument
     def _on_message_received(self, msg):
@@ -132,9 +134,9 @@ class X10DimmableSwitch(X10OnOffSwitch):
     def set_level(self, val):
         """Set the device ON LEVEL."""
         if val == 0:
-            self.off()
+            return self.off()
         elif val == 255:
-            self.on()
+            return self.on()
         else:
             setlevel = 255
             if val < 1:
@@ -153,10 +155,12 @@ class X10DimmableSwitch(X10OnOffSwitch):
                 method = self.dim
                 self._value -= round(steps * increment)
                 self._value = max(0, self._value)
+            result = None
             # pylint: disable=unused-variable
             for step in range(0, steps):
-                method(True)
+                result = method(True)
             self._update_subscribers(self._value)
+            return result
 
     def brighten(self, defer_update=False):
         """Brighten the device one step."""
@@ -166,9 +170,10 @@ class X10DimmableSwitch(X10OnOffSwitch):
         self._send_method(msg)
 
         msg = X10Send.command_msg(self.address.x10_housecode, X10_COMMAND_BRIGHT)
-        self._send_method(msg, False)
+        result = self._send_method(msg, False)
         if not defer_update:
             self._update_subscribers(self._value + 255 / self._steps)
+        return result
 
     def dim(self, defer_update=False):
         """Dim the device one step."""
@@ -178,9 +183,10 @@ class X10DimmableSwitch(X10OnOffSwitch):
         self._send_method(msg)
 
         msg = X10Send.command_msg(self.address.x10_housecode, X10_COMMAND_DIM)
-        self._send_method(msg, False)
+        result = self._send_method(msg, False)
         if not defer_update:
             self._update_subscribers(self._value - 255 / self._steps)
+        return result
 
     # pylint: disable=unused-argument
     def _dim_message_received(self, msg):
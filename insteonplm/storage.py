@@ -0,0 +1,149 @@
+"""Storage backends for saved device information.
+
+Each backend keeps one entry per device keyed by the device address. The
+entries are the device info dictionaries saved by LinkedDevices. Backend
+methods block and are run in a worker thread by LinkedDevices.
+"""
+import json
+import logging
+import os
+import sqlite3
+
+__all__ = ("JsonFileStore", "SqliteStore", "create_store")
+_LOGGER = logging.getLogger(__name__)
+DEVICE_INFO_FILE = "insteon_plm_device_info.dat"
+DEVICE_INFO_DB = "insteon_plm_device_info.db"
+
+
+class JsonFileStore:
+    """Store all device information in a single JSON file.
+
+    The whole file is rewritten on each save by replacing it with a
+    complete copy so a failed write does not corrupt the prior file.
+    """
+
+    def __init__(self, workdir):
+        """Init the JsonFileStore class."""
+        self._device_file = os.path.join(workdir, DEVICE_INFO_FILE)
+
+    def load(self):
+        """Yield the saved device info of each device."""
+        deviceinfo = []
+        try:
+            with open(self._device_file, "r") as infile:
+                try:
+                    deviceinfo = json.load(infile)
+                    _LOGGER.debug("Saved device file loaded")
+                except json.decoder.JSONDecodeError:
+                    _LOGGER.debug("Loading saved device file failed")
+        except FileNotFoundError:
+            _LOGGER.debug("Saved device file not found")
+        for device in deviceinfo:
+            yield device
+
+    def save(self, device_info, changed):
+        """Save the device info.
+
+        Parameters:
+            device_info: Dictionary of device address to the JSON encoded
+                         device info of every device to save.
+            changed: Set of device addresses that changed since the last
+                     save.
+        """
+        content = "[{}]".format(", ".join(device_info.values()))
+        temp_file = "{}.tmp".format(self._device_file)
+        try:
+            with open(temp_file, "w") as outfile:
+                outfile.write(content)
+            os.replace(temp_file, self._device_file)
+        except OSError:
+            _LOGGER.error("Cannot write to file %s", self._device_file)
+
+
+class SqliteStore:
+    """Store device information in a SQLite database.
+
+    Each device is a row keyed by device address so a save only writes the
+    devices that changed. The saved devices are imported from the JSON
+    device info file the first time the database is opened.
+    """
+
+    def __init__(self, workdir):
+        """Init the SqliteStore class."""
+        self._workdir = workdir
+        self._db_file = os.path.join(workdir, DEVICE_INFO_DB)
+        self._conn = None
+
+    def load(self):
+        """Yield the saved device info of each device."""
+        conn = self._connect()
+        cursor = conn.execute("SELECT info FROM devices ORDER BY rowid")
+        for (info,) in cursor:
+            try:
+                yield json.loads(info)
+            except ValueError:
+                _LOGGER.debug("Skipping unreadable saved device")
+
+    def save(self, device_info, changed):
+        """Save the device info of the devices that changed.
+
+        Parameters:
+            device_info: Dictionary of device address to the JSON encoded
+                         device info of every device to save.
+            changed: Set of device addresses that changed since the last
+                     save.
+        """
+        conn = self._connect()
+        with conn:
+            for addr in changed:
+                info = device_info.get(addr)
+                if info is None:
+                    conn.execute("DELETE FROM devices WHERE address = ?", (addr,))
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO devices (address, info) "
+                        "VALUES (?, ?)",
+                        (addr, info),
+                    )
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self._db_file, check_same_thread=False)
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS devices "
+                    "(address TEXT PRIMARY KEY, info TEXT NOT NULL)"
+                )
+            self._migrate()
+        return self._conn
+
+    def _migrate(self):
+        """Import the devices from the JSON device info file."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM devices").fetchone()
+        if count:
+            return
+        json_store = JsonFileStore(self._workdir)
+        device_info = {}
+        for device in json_store.load():
+            device_info[device.get("address")] = json.dumps(device)
+        if device_info:
+            _LOGGER.info(
+                "Importing %d devices from %s", len(device_info), DEVICE_INFO_FILE
+            )
+            self.save(device_info, set(device_info))
+
+
+STORES = {"json": JsonFileStore, "sqlite": SqliteStore}
+
+
+def create_store(storage, workdir):
+    """Create the device info store for a storage type.
+
+    Parameters:
+        storage: Storage type, either `json` or `sqlite`.
+        workdir: Directory where the device information is saved.
+    """
+    try:
+        return STORES[storage](workdir)
+    except KeyError:
+        raise ValueError("Unknown device info storage {}".format(storage))
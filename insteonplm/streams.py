@@ -0,0 +1,77 @@
+"""Asynchronous iterators of messages and state changes.
+
+A stream buffers the items put by a producer, such as the IM receiving
+messages, until a consumer reads them with `async for`. Putting an item
+never waits, so a slow consumer does not hold up the producer. A stream
+with a maximum size drops its oldest item when a new item arrives and
+the stream is full, and counts the items dropped.
+"""
+import asyncio
+import logging
+
+__all__ = ("Stream",)
+_LOGGER = logging.getLogger(__name__)
+
+
+class Stream:
+    """Asynchronous iterator of the items put on the stream.
+
+    Parameters:
+        loop: asyncio event loop.
+        maxsize: (optional) Maximum number of items waiting to be read.
+        Default is 0 for no limit.
+        on_close: (optional) Method called with the stream when the stream
+        is closed, used to stop the producer putting items on the stream.
+    """
+
+    def __init__(self, loop, maxsize=0, on_close=None):
+        """Init the Stream class."""
+        self._queue = asyncio.Queue(loop=loop)
+        self._maxsize = maxsize
+        self._on_close = on_close
+        self._closed = False
+        self.dropped = 0
+
+    def __aiter__(self):
+        """Return the stream as the iterator."""
+        return self
+
+    async def __anext__(self):
+        """Return the next item."""
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+        item = await self._queue.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+    @property
+    def pending(self):
+        """Return the number of items waiting to be read."""
+        return self._queue.qsize()
+
+    @property
+    def closed(self):
+        """Return if the stream is closed."""
+        return self._closed
+
+    def close(self):
+        """Stop the producer and end the iteration after the pending items."""
+        if not self._closed:
+            self._closed = True
+            if self._on_close is not None:
+                self._on_close(self)
+            self._queue.put_nowait(None)
+
+    def put(self, item):
+        """Add an item to the stream, dropping the oldest item if full."""
+        if self._closed:
+            return
+        if self._maxsize and self._queue.qsize() >= self._maxsize:
+            self._queue.get_nowait()
+            if not self.dropped:
+                _LOGGER.warning(
+                    "Stream %s is full, dropping the oldest items", id(self)
+                )
+            self.dropped += 1
+        self._queue.put_nowait(item)
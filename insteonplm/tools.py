@@ -1,6 +1,5 @@
 """Provides a raw console to test module and demonstrate usage."""
 # pylint: disable=too-many-lines
-import argparse
 import asyncio
 import binascii
 import logging
@@ -213,14 +212,14 @@ class Tools:
                     _LOGGING.info(
                         "Send set_level(50) to device %s:0x%x", dev_addr.human, group
                     )
-                    device.set_level(50)
+                    await self._log_command_result(state.set_level(50))
                 else:
                     try:
                         _LOGGING.info(
                             "Send %s to device %s:0x%x", command, dev_addr.human, group
                         )
                         func = getattr(state, command)
-                        func()
+                        await self._log_command_result(func())
                     except AttributeError:
                         _LOGGING.warning(
                             "device %s:%s-%s state %s: does not " "support command %s",
@@ -261,25 +260,14 @@ class Tools:
 
         if state:
             if hasattr(state, "on") and hasattr(state, "off"):
-                _LOGGING.info("Send on request")
-                _LOGGING.info("----------------------")
-                device.states[group].on()
-                await asyncio.sleep(2, loop=self.loop)
-
-                _LOGGING.info("Send off request")
-                _LOGGING.info("----------------------")
-                device.states[group].off()
-                await asyncio.sleep(2, loop=self.loop)
-
-                _LOGGING.info("Send on request")
-                _LOGGING.info("----------------------")
-                device.states[group].on()
-                await asyncio.sleep(2, loop=self.loop)
-
-                _LOGGING.info("Send off request")
-                _LOGGING.info("----------------------")
-                device.states[group].off()
-                await asyncio.sleep(2, loop=self.loop)
+                for _ in range(2):
+                    _LOGGING.info("Send on request")
+                    _LOGGING.info("----------------------")
+                    await self._log_command_result(state.on())
+
+                    _LOGGING.info("Send off request")
+                    _LOGGING.info("----------------------")
+                    await self._log_command_result(state.off())
             else:
                 _LOGGING.warning(
                     "Device %s with state %d is not an on/off" "device.",
@@ -290,6 +278,24 @@ class Tools:
         else:
             _LOGGING.error("Could not find device %s", addr)
 
+    @staticmethod
+    async def _log_command_result(result):
+        """Wait for a command to complete and log the outcome."""
+        if result is None:
+            return
+        result = await result
+        if result.modem_ack_seconds is None:
+            _LOGGING.info(
+                "Command %s after %.3fs", result.status.name, result.elapsed_seconds
+            )
+        else:
+            _LOGGING.info(
+                "Command %s after %.3fs, modem ACK after %.3fs",
+                result.status.name,
+                result.elapsed_seconds,
+                result.modem_ack_seconds,
+            )
+
     def print_device_aldb(self, addr):
         """Diplay the All-Link database for a device."""
         if Address(addr).id == self.plm.address.id:
@@ -346,6 +352,7 @@ class Tools:
             if device.aldb.status == ALDBStatus.LOADED:
                 _LOGGING.info("ALDB loaded for device %s", addr)
             self.print_device_aldb(addr)
+            self.print_device_aldb_metrics(addr)
         else:
             _LOGGING.error("Could not find device %s", addr)
 
@@ -353,6 +360,50 @@ class Tools:
         """Read all devices ALDB."""
         for addr in self.plm.devices:
             await self.load_device_aldb(addr, clear)
+        self.print_all_aldb_metrics()
+
+    def print_device_aldb_metrics(self, addr):
+        """Display the metrics of the last ALDB load for a device."""
+        device = self.plm.devices[Address(addr).id]
+        if device:
+            metrics = device.aldb.load_metrics
+            _LOGGING.info("ALDB load metrics for %s", device.address.human)
+            _LOGGING.info("  Status: %s", metrics.status)
+            _LOGGING.info("  Read requests: %d", metrics.attempts)
+            _LOGGING.info("  Records received: %d", metrics.records)
+            if metrics.duration is not None:
+                _LOGGING.info("  Duration: %.1f s", metrics.duration)
+            if metrics.time_to_first_record is not None:
+                _LOGGING.info(
+                    "  Time to first record: %.1f s", metrics.time_to_first_record
+                )
+            if metrics.records_per_second is not None:
+                _LOGGING.info("  Records per second: %.2f", metrics.records_per_second)
+            for mem_addr, retries in metrics.retries.items():
+                _LOGGING.info("  Retries at %04x: %d", mem_addr, retries)
+            if metrics.load_paths:
+                _LOGGING.info("  Load paths: %s", ", ".join(metrics.load_paths))
+
+    def print_all_aldb_metrics(self):
+        """Display the ALDB load duration for all devices, slowest first."""
+        loads = []
+        for addr in self.plm.devices:
+            device = self.plm.devices[addr]
+            metrics = device.aldb.load_metrics
+            if metrics.duration is not None:
+                loads.append((metrics.duration, device.address.human, metrics))
+        loads.sort(key=lambda load: load[0], reverse=True)
+        _LOGGING.info("----------------------")
+        _LOGGING.info("ALDB load duration by device")
+        for duration, human, metrics in loads:
+            _LOGGING.info(
+                "%s: %.1f s, %d requests, %d records, %s",
+                human,
+                duration,
+                metrics.attempts,
+                metrics.records,
+                metrics.status,
+            )
 
     async def write_aldb(
         self,
@@ -1286,6 +1337,8 @@ def monitor():
     :param verbose:
         Show debug logging.
     """
+    import argparse
+
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--device", default="/dev/ttyUSB0", help="Path to PLM device")
     parser.add_argument(
@@ -1327,6 +1380,8 @@ def interactive():
 
     Wrapper for an interactive session for manual commands to be entered.
     """
+    import argparse
+
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--device", default="/dev/ttyUSB0", help="Path to PLM device")
     parser.add_argument(
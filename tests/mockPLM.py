@@ -2,6 +2,7 @@
 import logging
 from insteonplm.messagecallback import MessageCallback
 from insteonplm.linkedDevices import LinkedDevices
+from insteonplm.metrics import MetricsRegistry, register_device_metrics
 
 _LOGGER = logging.getLogger(__name__)
 _LOGGER.setLevel(logging.DEBUG)
@@ -16,6 +17,9 @@ class MockPLM():
         self._message_callbacks = MessageCallback()
         self.loop = loop
         self.devices = LinkedDevices()
+        self.metrics = MetricsRegistry()
+        self.notifications = None
+        register_device_metrics(self.metrics)
 
     @property
     def message_callbacks(self):
@@ -46,3 +50,6 @@ class MockPLM():
     def start_all_linking(self, linkcode, group):
         """Fake start all linking."""
         self.sentmessage = b'02112233445566'
+
+    def clear_scene_cache(self):
+        """Fake clearing the scene member cache."""
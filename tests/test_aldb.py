@@ -1,5 +1,34 @@
 """Test insteonplm.devices.ALDB class."""
-from insteonplm.devices import ControlFlags
+import asyncio
+import logging
+
+from insteonplm.constants import (COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+                                  MANAGE_ALL_LINK_ADD_CONTROLLER_0X40,
+                                  MANAGE_ALL_LINK_ADD_RESPONDER_0X41,
+                                  MANAGE_ALL_LINK_DELETE_FIRST_FOUND_0X80,
+                                  MESSAGE_ACK,
+                                  MESSAGE_TYPE_DIRECT_MESSAGE,
+                                  MESSAGE_TYPE_DIRECT_MESSAGE_ACK)
+import insteonplm.messages
+from insteonplm.devices import (ALDB_READ_WINDOW, ALDBReadStats, ALDBRecord,
+                                ALDBStatus, ControlFlags, ModemALDB, create)
+from insteonplm.messages.manageAllLinkRecord import ManageAllLinkRecord
+from insteonplm.messages.extendedReceive import ExtendedReceive
+from insteonplm.messages.extendedSend import ExtendedSend
+from insteonplm.messages.messageFlags import MessageFlags
+from insteonplm.messages.standardReceive import StandardReceive
+from insteonplm.messages.userdata import Userdata
+from .mockPLM import MockPLM
+
+_LOGGING = logging.getLogger(__name__)
+_LOGGING.setLevel(logging.DEBUG)
+SAVED_RECORDS = {
+    0x0fff: {'control_flags': 0xe2, 'group': 0x00, 'address': '4d5e6f',
+             'data1': 0x00, 'data2': 0x00, 'data3': 0x00},
+    0x0ff7: {'control_flags': 0xa2, 'group': 0x00, 'address': '4d5e6f',
+             'data1': 0x00, 'data2': 0x00, 'data3': 0x00},
+    0x0fef: {'control_flags': 0x00, 'group': 0x00, 'address': '000000',
+             'data1': 0x00, 'data2': 0x00, 'data3': 0x00}}
 
 
 def test_control_flags():
@@ -28,3 +57,261 @@ def test_control_flags():
     assert not cf.is_used_before
     assert cf.is_high_water_mark
     assert cf.byte == 0x00
+
+
+def _write_msg(address, record, acknak=None):
+    """Return the extended message that writes an ALDB record."""
+    userdata = record.to_userdata()
+    userdata['d2'] = 0x02
+    userdata['d5'] = 0x08
+    msg = ExtendedSend(address, COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+                       userdata, acknak=acknak)
+    msg.set_checksum()
+    return msg
+
+
+def _record_msg(address, record):
+    """Return the extended message a device sends with an ALDB record."""
+    userdata = record.to_userdata()
+    userdata['d2'] = 0x01
+    return ExtendedReceive(address, '111111',
+                           COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+                           userdata,
+                           flags=MessageFlags.create(
+                               MESSAGE_TYPE_DIRECT_MESSAGE, 1, 2, 3))
+
+
+def _direct_ack(address):
+    """Return the direct ACK of an ALDB read or write request."""
+    return StandardReceive(address, '111111',
+                           COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+                           flags=MessageFlags.create(
+                               MESSAGE_TYPE_DIRECT_MESSAGE_ACK, 0, 2, 3))
+
+
+def test_write_records():
+    """Test writing a batch of ALDB records with a verification read."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        address = '1a2b3c'
+        device = create(plm, address, 0x01, 0x0d, 0x44)
+        plm.devices[address] = device
+        device.aldb.load_saved_records(ALDBStatus.LOADED, SAVED_RECORDS)
+
+        records = [ALDBRecord(0x0ff7, 0xa2, 0x01, '4d5e6f', 0xff, 0x1c, 0x01),
+                   ALDBRecord(0x0fff, 0xe2, 0x01, '4d5e6f', 0x03, 0x1c, 0x01)]
+        task = asyncio.ensure_future(device.write_aldb_records(records),
+                                     loop=loop)
+
+        # Records are written from the highest memory address down
+        for record in [records[1], records[0]]:
+            await asyncio.sleep(.1, loop=loop)
+            assert plm.sentmessage == _write_msg(address, record).hex
+            plm.message_received(_write_msg(address, record, MESSAGE_ACK))
+            await asyncio.sleep(.1, loop=loop)
+            plm.message_received(_direct_ack(address))
+            await asyncio.sleep(.5, loop=loop)
+
+        # One read request covers both records
+        userdata = Userdata({'d1': 0, 'd2': 0, 'd3': 0x0f, 'd4': 0xff,
+                             'd5': 2})
+        read_msg = ExtendedSend(address,
+                                COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+                                userdata)
+        read_msg.set_checksum()
+        assert plm.sentmessage == read_msg.hex
+        for record in [records[1], records[0]]:
+            plm.message_received(_record_msg(address, record))
+            await asyncio.sleep(.1, loop=loop)
+
+        result = await task
+        assert result.written == [0x0fff, 0x0ff7]
+        assert not result.failed
+        assert not result.rolled_back
+        assert device.aldb.status == ALDBStatus.LOADED
+        assert device.aldb[0x0ff7].data1 == 0xff
+        assert device.aldb[0x0ff7].group == 0x01
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_write_records_not_loaded():
+    """Test a batch write is refused before the ALDB is loaded."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        device = create(plm, '1a2b3c', 0x01, 0x0d, 0x44)
+        records = [ALDBRecord(0x0fff, 0xe2, 0x01, '4d5e6f', 0, 0, 0)]
+        result = await device.write_aldb_records(records)
+        assert result.failed == [0x0fff]
+        assert not result.written
+        assert plm.sentmessage == ''
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_read_stats_window():
+    """Test the range read window grows on success and shrinks on timeout."""
+    stats = ALDBReadStats()
+    assert stats.window == ALDB_READ_WINDOW
+    assert not stats.is_flaky
+
+    stats.read_succeeded()
+    assert stats.window == ALDB_READ_WINDOW * 2
+    stats.read_succeeded()
+    stats.read_succeeded()
+    assert stats.window == 32
+    assert stats.reads == 3
+
+    for _ in range(6):
+        stats.read_timed_out()
+    assert stats.window == 1
+    assert stats.timeouts == 6
+    assert stats.is_flaky
+
+
+def test_load_action_after_partial_read():
+    """Test a failed all records read continues from the first gap."""
+    plm = MockPLM()
+    device = create(plm, '1a2b3c', 0x01, 0x0d, 0x44)
+    aldb = device.aldb
+    records = dict(SAVED_RECORDS)
+    records.pop(0x0fef)
+    aldb.load_saved_records(ALDBStatus.PARTIAL, records)
+
+    # All records read timed out but some records were received
+    aldb._set_load_action(0x0000, 0, 0, False)
+    assert aldb._load_action.mem_addr == 0x0fef
+    assert aldb._load_action.rec_count == ALDB_READ_WINDOW // 2
+    assert aldb._load_action.retries == 0
+
+    # The range read timed out so request a smaller range
+    aldb._set_load_action(0x0fef, 4, 0, False)
+    assert aldb._load_action.mem_addr == 0x0fef
+    assert aldb._load_action.rec_count == 2
+    assert aldb._load_action.retries == 1
+
+    # The range read completed the database
+    aldb.load_saved_records(ALDBStatus.PARTIAL, SAVED_RECORDS)
+    assert aldb._have_range(0x0fef, 2)
+    aldb._set_load_action(0x0fef, 2, 1, True)
+    assert aldb._load_action.mem_addr is None
+
+
+def test_range_read_releases_lock():
+    """Test the record lock is released once a range read is complete."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        address = '1a2b3c'
+        device = create(plm, address, 0x01, 0x0d, 0x44)
+        plm.devices[address] = device
+        aldb = device.aldb
+        aldb.load_saved_records(ALDBStatus.PARTIAL,
+                                {0x0fff: SAVED_RECORDS[0x0fff]})
+
+        await aldb.load(0x0ff7, 2)
+        await asyncio.sleep(.1, loop=loop)
+        userdata = Userdata({'d1': 0, 'd2': 0, 'd3': 0x0f, 'd4': 0xf7,
+                             'd5': 2})
+        read_msg = ExtendedSend(address,
+                                COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+                                userdata)
+        read_msg.set_checksum()
+        assert plm.sentmessage == read_msg.hex
+        assert aldb._rec_mgr_lock.locked()
+
+        record = ALDBRecord(0x0ff7, 0xa2, 0x00, '4d5e6f', 0, 0, 0)
+        aldb.record_received(_record_msg(address, record))
+        assert aldb._rec_mgr_lock.locked()
+        record = ALDBRecord(0x0fef, 0x00, 0x00, '000000', 0, 0, 0)
+        aldb.record_received(_record_msg(address, record))
+        assert not aldb._rec_mgr_lock.locked()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_load_metrics():
+    """Test the ALDB load metrics of a range read."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        address = '1a2b3c'
+        device = create(plm, address, 0x01, 0x0d, 0x44)
+        plm.devices[address] = device
+        aldb = device.aldb
+        aldb.load_saved_records(ALDBStatus.PARTIAL,
+                                {0x0fff: SAVED_RECORDS[0x0fff]})
+
+        await aldb.load(0x0ff7, 2)
+        await asyncio.sleep(.1, loop=loop)
+        for mem_addr in [0x0ff7, 0x0fef]:
+            record = ALDBRecord(mem_addr, SAVED_RECORDS[mem_addr]['control_flags'],
+                                0x00, '4d5e6f', 0, 0, 0)
+            aldb.record_received(_record_msg(address, record))
+        aldb._set_load_action(0x0ff7, 2, 0, True)
+        aldb._load_finished(ALDBStatus.LOADED)
+
+        metrics = aldb.load_metrics
+        assert metrics.attempts == 1
+        assert metrics.records == 2
+        assert not metrics.retries
+        assert metrics.load_paths == ['complete']
+        assert metrics.status == ALDBStatus.LOADED
+        assert metrics.duration >= metrics.time_to_first_record > 0
+        assert metrics.as_dict()['status'] == 'LOADED'
+
+        # A later write does not change the metrics of the finished load
+        aldb._load_finished(ALDBStatus.PARTIAL)
+        assert metrics.status == ALDBStatus.LOADED
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_modem_aldb_index():
+    """Test the modem ALDB index by address and group."""
+    aldb = ModemALDB(None, None, '1a2b3c')
+    aldb[0] = ALDBRecord(0, 0xe2, 0x01, '4d5e6f', 0x01, 0x20, 0x41)
+    aldb[1] = ALDBRecord(1, 0xa2, 0x01, '4d5e6f', 0x01, 0x20, 0x41)
+    aldb[2] = ALDBRecord(2, 0xe2, 0x02, '112233', 0x02, 0x2a, 0x43)
+
+    assert aldb.has_link('4d5e6f')
+    assert aldb.has_link('112233', 0x02)
+    assert not aldb.has_link('112233', 0x01)
+    assert [rec.mem_addr for rec in aldb.find(group=0x01)] == [0, 1]
+    assert [rec.mem_addr
+            for rec in aldb.find('4d5e6f', 0x01, False)] == [1]
+
+    # Add a new controller record and update an existing responder record
+    aldb.manage_record(MANAGE_ALL_LINK_ADD_CONTROLLER_0X40, 0x00, 0x03,
+                       '112233', 0x00, 0x00, 0x00)
+    assert [rec.mem_addr for rec in aldb.find('112233', 0x03, True)] == [3]
+    aldb.manage_record(MANAGE_ALL_LINK_ADD_RESPONDER_0X41, 0x00, 0x01,
+                       '4d5e6f', 0xff, 0x1c, 0x01)
+    assert len(aldb) == 4
+    assert aldb[1].data1 == 0xff
+    assert aldb[1].control_flags.is_responder
+
+    # Delete a record and the indexes no longer find it
+    aldb.manage_record(MANAGE_ALL_LINK_DELETE_FIRST_FOUND_0X80, 0x00, 0x02,
+                       '112233', 0x00, 0x00, 0x00)
+    assert not aldb.has_link('112233', 0x02)
+    assert aldb.find(group=0x02) == []
+
+    aldb.clear()
+    assert not aldb.has_link('4d5e6f')
+
+
+def test_manage_aldb_record_ack():
+    """Test the 0x6F ACK message is read from a raw byte stream."""
+    sent = ManageAllLinkRecord(MANAGE_ALL_LINK_ADD_CONTROLLER_0X40, 0xe2,
+                               0x05, '4d5e6f', 0x01, 0x02, 0x03,
+                               acknak=MESSAGE_ACK)
+    msg, buffer = insteonplm.messages.create(bytearray(sent.bytes))
+    assert not buffer
+    assert msg.controlCode == MANAGE_ALL_LINK_ADD_CONTROLLER_0X40
+    assert msg.group == 0x05
+    assert msg.address.id == '4d5e6f'
+    assert msg.linkdata3 == 0x03
+    assert msg.isack
@@ -0,0 +1,212 @@
+"""Benchmark the receive and send hot paths.
+
+Run with pytest-benchmark, or `tox -e benchmark`, and save the results
+so they can be compared between commits:
+
+    py.test tests/test_benchmarks.py --benchmark-only --benchmark-autosave
+    py.test tests/test_benchmarks.py --benchmark-only --benchmark-compare
+
+Other test runs pass --benchmark-disable to run each benchmark once.
+"""
+import asyncio
+import binascii
+import tempfile
+
+import pytest
+
+from insteonplm.address import Address
+from insteonplm.constants import (COMMAND_LIGHT_OFF_0X13_0X00,
+                                  COMMAND_LIGHT_ON_0X11_NONE,
+                                  MESSAGE_TYPE_ALL_LINK_BROADCAST,
+                                  MESSAGE_TYPE_ALL_LINK_CLEANUP)
+from insteonplm.devices import ALDBRecord, ALDBStatus, create
+from insteonplm.httpTransport import HttpTransport
+from insteonplm.linkedDevices import LinkedDevices
+import insteonplm.messages
+from insteonplm.messagecallback import MessageCallback
+from insteonplm.messages.extendedSend import ExtendedSend
+from insteonplm.messages.messageFlags import MessageFlags
+from insteonplm.messages.standardReceive import StandardReceive
+from insteonplm.messages.userdata import Userdata
+
+from .mockPLM import MockPLM
+
+pytest.importorskip('pytest_benchmark')
+
+# Standard and extended receive, send ACK, All-Link record, IM info, X10
+# and a frame with leading garbage
+MIXED_FRAMES = [binascii.unhexlify(frame) for frame in [
+    '02501a2b3c000001cb1100',
+    '02511a2b3c4485112b2f000001' + '0fff00e2014485110000' + '00000000',
+    '02621a2b3c0f11ff06',
+    '0257e2001a2b3c012041',
+    '02604485110315' + '9b06',
+    '02526680',
+    'ff0002501a2b3c4485112b1900']]
+
+
+def _device_address(dev_num):
+    return '20{:04x}'.format(dev_num)
+
+
+def _broadcast(address, cmd1, hops_left, cleanup=False):
+    if cleanup:
+        flags = MessageFlags.create(MESSAGE_TYPE_ALL_LINK_CLEANUP, 0,
+                                    hops_left, 3)
+        return StandardReceive(address, '448511',
+                               {'cmd1': cmd1, 'cmd2': 0x01}, flags=flags)
+    flags = MessageFlags.create(MESSAGE_TYPE_ALL_LINK_BROADCAST, 0,
+                                hops_left, 3)
+    return StandardReceive(address, '000001', {'cmd1': cmd1, 'cmd2': 0x00},
+                           flags=flags)
+
+
+def _run_sync(coro):
+    """Run a coroutine that does not wait on anything."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError('Coroutine did not finish')
+
+
+@pytest.mark.benchmark(group='receive')
+def test_create_messages(benchmark):
+    """Benchmark creating messages from a mix of raw frames."""
+    def create_all():
+        for frame in MIXED_FRAMES:
+            insteonplm.messages.create(frame)
+
+    benchmark(create_all)
+    msg, _ = insteonplm.messages.create(MIXED_FRAMES[-1])
+    assert msg.code == 0x50
+
+
+@pytest.mark.benchmark(group='receive')
+@pytest.mark.parametrize('num_devices', [10, 100, 1000])
+def test_get_callbacks_from_message(benchmark, num_devices):
+    """Benchmark matching a message to the callbacks of many devices."""
+    callbacks = MessageCallback()
+    for dev_num in range(num_devices):
+        address = _device_address(dev_num)
+        for cmd in [COMMAND_LIGHT_ON_0X11_NONE, COMMAND_LIGHT_OFF_0X13_0X00]:
+            template = StandardReceive.template(
+                address=address,
+                commandtuple=cmd,
+                flags=MessageFlags.template(MESSAGE_TYPE_ALL_LINK_BROADCAST))
+            callbacks.add(template, print)
+    msg = _broadcast(_device_address(num_devices // 2), 0x11, 3)
+
+    assert benchmark(callbacks.get_callbacks_from_message, msg) == [print]
+
+
+@pytest.mark.benchmark(group='receive')
+def test_is_duplicate_broadcast_storm(benchmark):
+    """Benchmark duplicate checks of broadcasts received over three hops.
+
+    Each device sends an All-Link broadcast, received once per hop, and a
+    cleanup while the other devices do the same.
+    """
+    loop = asyncio.get_event_loop()
+    addresses = [_device_address(dev_num) for dev_num in range(10)]
+    storm = []
+    for hops_left in [3, 2, 1]:
+        storm.extend(_broadcast(address, 0x11, hops_left)
+                     for address in addresses)
+    storm.extend(_broadcast(address, 0x11, 3, cleanup=True)
+                 for address in addresses)
+    plm = MockPLM(loop)
+    devices = {address: create(plm, address, 0x01, 0x20, 0x00)
+               for address in addresses}
+
+    def setup():
+        for device in devices.values():
+            # pylint: disable=protected-access
+            while not device._recent_messages.empty():
+                device._recent_messages.get_nowait()
+
+    def check_storm():
+        duplicates = 0
+        for msg in storm:
+            # pylint: disable=protected-access
+            if devices[msg.address.id]._is_duplicate(msg):
+                duplicates += 1
+        return duplicates
+
+    result = benchmark.pedantic(check_storm, setup=setup, rounds=200)
+    assert result == len(storm) - len(addresses)
+
+
+@pytest.mark.benchmark(group='send')
+def test_message_bytes_and_hex(benchmark):
+    """Benchmark the bytes and hex of standard and extended messages."""
+    standard = _broadcast('1a2b3c', 0x11, 3)
+    extended = ExtendedSend('1a2b3c', {'cmd1': 0x2f, 'cmd2': 0x00},
+                            Userdata({'d1': 0, 'd2': 0, 'd3': 0x0f,
+                                      'd4': 0xff, 'd5': 1}))
+
+    def encode():
+        return (standard.bytes, standard.hex, extended.bytes, extended.hex)
+
+    result = benchmark(encode)
+    assert result[0] == binascii.unhexlify(result[1])
+
+
+@pytest.mark.benchmark(group='receive')
+def test_address_construction(benchmark):
+    """Benchmark creating addresses from each supported type."""
+    values = ['1a2b3c', '1A.2B.3C', b'\x1a\x2b\x3c', bytearray(b'\x1a\x2b\x3c'),
+              Address('1a2b3c')]
+
+    def construct():
+        return [Address(value) for value in values]
+
+    assert all(addr.id == '1a2b3c' for addr in benchmark(construct))
+
+
+@pytest.mark.benchmark(group='receive')
+def test_hub_parse_buffer(benchmark):
+    """Benchmark parsing a Hub buffer that wrapped since the last read."""
+    loop = asyncio.get_event_loop()
+    transport = HttpTransport(loop, None, 'localhost')
+    # Nine messages from position 102 to the end and wrapped to 100
+    messages = '02501a2b3c000001cb1100' * 9
+    raw = messages[98:] + '00' + messages[:98]
+    html = '<response><BS>{}{:02X}</BS></response>'.format(raw, 100)
+    # pylint: disable=protected-access
+
+    def parse():
+        transport._write_last_read(102)
+        return _run_sync(transport._parse_buffer(html))
+
+    assert benchmark(parse) == messages
+
+
+@pytest.mark.benchmark(group='storage')
+def test_save_device_info(benchmark):
+    """Benchmark saving the device info of a large network."""
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        plm = MockPLM(loop)
+        linked = LinkedDevices(loop, workdir)
+        plm.devices = linked
+        for dev_num in range(500):
+            device = create(plm, _device_address(dev_num), 0x01, 0x20, 0x00)
+            mem_addr = 0x0fff
+            for rec_num in range(20):
+                device.aldb[mem_addr] = ALDBRecord(
+                    mem_addr, 0xe2, rec_num, '1a2b3c', 0x01, 0x20, 0x41)
+                mem_addr -= 8
+            device.aldb.status = ALDBStatus.LOADED
+            linked[device.id] = device
+
+        def setup():
+            linked.save_device_info()
+
+        def save():
+            loop.run_until_complete(linked.async_save_device_info())
+
+        benchmark.pedantic(save, setup=setup, rounds=5)
+        saved = LinkedDevices(loop, workdir)
+        loop.run_until_complete(saved.load_saved_device_info())
+        assert len(saved.saved_devices) == 500
@@ -0,0 +1,86 @@
+"""Test recording and replaying Insteon Modem traffic."""
+import asyncio
+import os
+import tempfile
+
+from insteonplm.capture import (CaptureWriter, RECEIVED, SENT, read_capture,
+                                replay)
+from insteonplm.messages.getIMInfo import GetImInfo
+from insteonplm.plm import PLM
+from insteonplm.simulator import SimulatedModem
+
+RECV_MSG_WAIT = .1
+
+
+def test_capture_and_replay():
+    """Test the IM traffic is captured and replays to a new IM."""
+    async def run_test(loop, workdir):
+        path = os.path.join(workdir, 'modem.cap')
+        plm = PLM(loop=loop, workdir=workdir)
+        modem = SimulatedModem(loop, time_scale=0)
+        plm.start_capture(path)
+        modem.connect(plm)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+        await plm.close()
+
+        records = list(read_capture(path))
+        assert records[0].direction == SENT
+        assert records[0].data == GetImInfo().bytes
+        assert records[1].direction == RECEIVED
+        assert records[1].data[:2] == b'\x02\x60'
+        assert records[0].timestamp <= records[1].timestamp
+
+        replay_plm = PLM(loop=loop, workdir=workdir)
+        frames = await replay(replay_plm, path, loop, speed=None)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+        assert frames == len(
+            [rec for rec in records if rec.direction == RECEIVED])
+        assert replay_plm.address == modem.address
+        assert replay_plm.metrics['messages_received'].value('0x60') == 1
+        await replay_plm.close()
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        loop.run_until_complete(run_test(loop, workdir))
+
+
+def test_replay_speed():
+    """Test frames are replayed at the recorded speed."""
+    async def run_test(loop, workdir):
+        path = os.path.join(workdir, 'timed.cap')
+        clock = iter([0, 0, 0.2])
+        writer = CaptureWriter(path, lambda: next(clock))
+        writer.record(RECEIVED, b'\x02\x15')
+        writer.record(RECEIVED, b'\x02\x15')
+        writer.close()
+
+        class Protocol:
+            """Protocol recording the time data is received."""
+
+            received = []
+
+            def data_received(self, data):
+                """Record the time the data is received."""
+                self.received.append(loop.time())
+
+        protocol = Protocol()
+        start = loop.time()
+        assert await replay(protocol, path, loop, speed=2) == 2
+        assert protocol.received[1] - start >= 0.1
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        loop.run_until_complete(run_test(loop, workdir))
+
+
+def test_read_invalid_capture():
+    """Test a file that is not a capture is rejected."""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'other.cap')
+        with open(path, 'wb') as other:
+            other.write(b'not a capture')
+        try:
+            list(read_capture(path))
+            assert False
+        except ValueError:
+            pass
@@ -0,0 +1,80 @@
+"""Test the results returned by the commands sent to devices."""
+import asyncio
+
+import insteonplm.devices
+from insteonplm.constants import (COMMAND_LIGHT_BRIGHTEN_ONE_STEP_0X15_0X00,
+                                  COMMAND_LIGHT_OFF_0X13_0X00,
+                                  COMMAND_LIGHT_ON_0X11_NONE,
+                                  MESSAGE_ACK,
+                                  MESSAGE_TYPE_DIRECT_MESSAGE_ACK,
+                                  MESSAGE_TYPE_DIRECT_MESSAGE_NAK)
+from insteonplm.devices import CommandStatus
+from insteonplm.devices.dimmableLightingControl import DimmableLightingControl
+from insteonplm.messages.messageFlags import MessageFlags
+from insteonplm.messages.standardReceive import StandardReceive
+from insteonplm.messages.standardSend import StandardSend
+
+from .mockPLM import MockPLM
+
+ADDRESS = '1a2b3c'
+TARGET = '4d5e6f'
+
+
+def _direct_reply(command, cmd2, message_type):
+    return StandardReceive(ADDRESS, TARGET, command, cmd2=cmd2,
+                           flags=MessageFlags.create(message_type, 0, 2, 3))
+
+
+def test_command_results(monkeypatch):
+    """Test commands resolve on direct ACK, NAK, modem ACK and timeout."""
+    monkeypatch.setattr(insteonplm.devices, 'DIRECT_ACK_WAIT_TIMEOUT', 0.2)
+
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        device = DimmableLightingControl(plm, ADDRESS, 0x01, 0x04, None,
+                                         'SwitchLinc Dimmer (1000W)', '2476DH')
+        plm.devices[device.address.id] = device
+        state = device.states[0x01]
+
+        result = state.on()
+        await asyncio.sleep(.1, loop=loop)
+        plm.message_received(StandardSend(
+            ADDRESS, COMMAND_LIGHT_ON_0X11_NONE, cmd2=0xff,
+            acknak=MESSAGE_ACK))
+        await asyncio.sleep(.1, loop=loop)
+        plm.message_received(_direct_reply(
+            COMMAND_LIGHT_ON_0X11_NONE, 0xff, MESSAGE_TYPE_DIRECT_MESSAGE_ACK))
+        result = await result
+        assert result.status == CommandStatus.DIRECT_ACK
+        assert result.message.cmd2 == 0xff
+        assert 0 < result.modem_ack_seconds < result.elapsed_seconds
+        assert state.value == 0xff
+
+        result = state.off()
+        await asyncio.sleep(.1, loop=loop)
+        plm.message_received(StandardSend(
+            ADDRESS, COMMAND_LIGHT_OFF_0X13_0X00, acknak=MESSAGE_ACK))
+        await asyncio.sleep(.1, loop=loop)
+        plm.message_received(_direct_reply(
+            COMMAND_LIGHT_OFF_0X13_0X00, 0x00,
+            MESSAGE_TYPE_DIRECT_MESSAGE_NAK))
+        assert (await result).status == CommandStatus.DIRECT_NAK
+        assert state.value == 0xff
+
+        result = state.off()
+        await asyncio.sleep(.1, loop=loop)
+        plm.message_received(StandardSend(
+            ADDRESS, COMMAND_LIGHT_OFF_0X13_0X00, acknak=MESSAGE_ACK))
+        result = await result
+        assert result.status == CommandStatus.TIMEOUT
+        assert result.message is None
+
+        result = state.brighten()
+        await asyncio.sleep(.1, loop=loop)
+        plm.message_received(StandardSend(
+            ADDRESS, COMMAND_LIGHT_BRIGHTEN_ONE_STEP_0X15_0X00,
+            acknak=MESSAGE_ACK))
+        assert (await result).status == CommandStatus.MODEM_ACK
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
@@ -4,7 +4,10 @@ import logging
 
 from insteonplm.constants import (COMMAND_LIGHT_OFF_0X13_0X00,
                                   COMMAND_LIGHT_ON_0X11_NONE,
+                                  COMMAND_LIGHT_STATUS_REQUEST_0X19_NONE,
                                   MESSAGE_ACK)
+from insteonplm.messages.allLinkRecordResponse import AllLinkRecordResponse
+from insteonplm.messages.standardReceive import StandardReceive
 from insteonplm.messages.standardSend import StandardSend
 from insteonplm.devices import create, DIRECT_ACK_WAIT_TIMEOUT
 from insteonplm.devices.dimmableLightingControl import DimmableLightingControl
@@ -108,3 +111,25 @@ def test_send_msg():
             _LOGGING.error('Task: %s', task)
         if not task.done():
             loop.run_until_complete(task)
+
+
+def test_receive_after_all_link_record():
+    """Test receiving a message after a modem All-Link record."""
+    async def run_test(loop):
+        mockPLM = MockPLM(loop)
+        address = '1a2b3c'
+        device = create(mockPLM, address, 0x01, 0x0d, 0x44)
+        mockPLM.devices[address] = device
+
+        msg = AllLinkRecordResponse(0xe2, 0x01, address, 0x01, 0x0d, 0x44)
+        mockPLM.message_received(msg)
+        await asyncio.sleep(.1, loop=loop)
+
+        msg = StandardReceive(address, '4d5e6f',
+                              COMMAND_LIGHT_STATUS_REQUEST_0X19_NONE,
+                              cmd2=0xff, flags=0x2b)
+        mockPLM.message_received(msg)
+        await asyncio.sleep(.1, loop=loop)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
@@ -0,0 +1,48 @@
+"""Test the INSTEON Product Database."""
+from insteonplm.devices.ipdb import IPDB, Product, X10Product
+
+
+def _linear_lookup(ipdb, cat, subcat):
+    """Look up a product by scanning the whole product list."""
+    device_product = None
+    for product in ipdb:
+        if cat == product.cat and subcat == product.subcat:
+            device_product = product
+    if not device_product:
+        for product in ipdb:
+            if cat == product.cat and product.subcat is None:
+                return product
+    if not device_product:
+        device_product = Product(cat, subcat, None, "", "", None)
+    return device_product
+
+
+def test_product_lookup_matches_linear_scan():
+    """Test the indexed lookup returns the same product as a linear scan."""
+    ipdb = IPDB()
+    keys = set()
+    for product in ipdb:
+        keys.add((product.cat, product.subcat))
+        keys.add((product.cat, None))
+        keys.add((product.cat, 0xFE))
+    keys.add((0x55, 0x01))
+    keys.add((None, 0x01))
+
+    for cat, subcat in keys:
+        assert ipdb[[cat, subcat]] == _linear_lookup(ipdb, cat, subcat)
+
+
+def test_product_lookup_last_match_wins():
+    """Test the last product with the same cat and subcat is returned."""
+    ipdb = IPDB()
+    product = ipdb[[0x01, 0x20]]
+    assert product.product_key == 0x00006B
+    assert ipdb[[0x01, 0xFE]].description == 'Generic Dimmable Lighting Control'
+
+
+def test_x10_lookup():
+    """Test the X10 product lookup."""
+    ipdb = IPDB()
+    assert ipdb.x10('OnOff').feature == 'onoff'
+    assert ipdb.x10('Dimmable').deviceclass is not None
+    assert ipdb.x10('unknown') == X10Product('unknown', None)
@@ -1,6 +1,11 @@
 """Test insteonplm LinkedDevices Class."""
+import asyncio
+import json
+import os
+
 from insteonplm.address import Address
 from insteonplm.linkedDevices import LinkedDevices
+from insteonplm.storage import DEVICE_INFO_FILE
 from insteonplm.devices.switchedLightingControl import SwitchedLightingControl
 from .mockPLM import MockPLM
 
@@ -43,3 +48,89 @@ def test_create_device_from_category_generic_device():
     assert dev.subcat == subcat
     assert dev.description == description
     assert dev.model == model
+
+
+def test_save_device_info(tmp_path):
+    """Test changed devices are saved together to the device info file."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        workdir = str(tmp_path)
+        linkedDevices = LinkedDevices(loop, workdir)
+        dev1 = linkedDevices.create_device_from_category(
+            plm, '1a2b3c', 0x02, 0x13)
+        dev2 = linkedDevices.create_device_from_category(
+            plm, '4d5e6f', 0x01, 0x0b)
+        linkedDevices[dev1.id] = dev1
+        linkedDevices[dev2.id] = dev2
+
+        linkedDevices.save_device_info(dev1)
+        linkedDevices.save_device_info(dev2)
+        assert not os.path.exists(os.path.join(workdir, DEVICE_INFO_FILE))
+        await linkedDevices.async_save_device_info()
+
+        with open(os.path.join(workdir, DEVICE_INFO_FILE)) as infile:
+            saved = json.load(infile)
+        assert [device['address'] for device in saved] == ['1a2b3c',
+                                                           '4d5e6f']
+        assert saved[1]['cat'] == 0x01
+        assert not os.path.exists(
+            os.path.join(workdir, DEVICE_INFO_FILE + '.tmp'))
+
+        loaded = LinkedDevices(loop, workdir)
+        await loaded.load_saved_device_info()
+        assert loaded.has_saved('4d5e6f')
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_sqlite_storage(tmp_path):
+    """Test devices saved to SQLite after migrating the JSON device file."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        workdir = str(tmp_path)
+        with open(os.path.join(workdir, DEVICE_INFO_FILE), 'w') as outfile:
+            json.dump([{'address': '1a2b3c', 'cat': 0x02, 'subcat': 0x13,
+                        'product_key': 0x00, 'aldb_status': 0, 'aldb': {}}],
+                      outfile)
+
+        linkedDevices = LinkedDevices(loop, workdir, 'sqlite')
+        await linkedDevices.load_saved_device_info()
+        assert linkedDevices.has_saved('1a2b3c')
+
+        dev = linkedDevices.create_device_from_category(
+            plm, '4d5e6f', 0x01, 0x0b)
+        linkedDevices[dev.id] = dev
+        linkedDevices.save_device_info(dev)
+        await linkedDevices.async_save_device_info()
+
+        loaded = LinkedDevices(loop, workdir, 'sqlite')
+        await loaded.load_saved_device_info()
+        assert loaded.has_saved('1a2b3c')
+        assert loaded.saved_devices['4d5e6f']['cat'] == 0x01
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_lazy_devices():
+    """Test saved devices are only created when first fetched."""
+    plm = MockPLM()
+    linkedDevices = LinkedDevices(lazy=True)
+    linkedDevices._add_saved_device_info(
+        address='1a2b3c', cat=0x02, subcat=0x13, product_key=0x00,
+        aldb_status=0, aldb={})
+    added = []
+    linkedDevices.add_device_callback(added.append)
+
+    linkedDevices.add_known_devices(plm)
+    assert len(linkedDevices) == 1
+    assert '1a2b3c' in linkedDevices
+    assert list(linkedDevices) == ['1a2b3c']
+    assert not added
+
+    dev = linkedDevices['1a2b3c']
+    assert isinstance(dev, SwitchedLightingControl)
+    assert added == [dev]
+    assert linkedDevices['1a2b3c'] is dev
+    assert len(linkedDevices) == 1
@@ -198,3 +198,32 @@ def test_extended_ack():
 
     assert result2 == [callbacks.callbackvalue2]
     assert result1 == [callbacks.callbackvalue1]
+
+
+def test_shared_device_templates():
+    """Test device templates are shared between devices."""
+    callbacks1 = MessageCallback('1a2b3c')
+    callbacks2 = MessageCallback('4d5e6f')
+    template1 = StandardReceive.template(
+        address='1a2b3c', commandtuple=COMMAND_LIGHT_ON_0X11_NONE)
+    template2 = StandardReceive.template(
+        address='4d5e6f', commandtuple=COMMAND_LIGHT_ON_0X11_NONE)
+    callbacks1.add(template1, 'callback 1')
+    callbacks2.add(template2, 'callback 2')
+
+    assert list(callbacks1)[0] is list(callbacks2)[0]
+    assert callbacks1[template1] == ['callback 1']
+
+    msg = StandardReceive('1a2b3c', '4d5e6f', COMMAND_LIGHT_ON_0X11_NONE,
+                          cmd2=0xff)
+    assert callbacks1.get_callbacks_from_message(msg) == ['callback 1']
+
+    callbacks1.remove(template1, 'callback 1')
+    assert not callbacks1
+    assert callbacks2[template2] == ['callback 2']
+
+    # Templates for other addresses keep their address
+    template3 = StandardReceive.template(
+        address='112233', commandtuple=COMMAND_LIGHT_ON_0X11_NONE)
+    callbacks1.add(template3, 'callback 3')
+    assert list(callbacks1)[0].address == template3.address
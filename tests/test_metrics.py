@@ -0,0 +1,111 @@
+"""Test the IM metrics."""
+import asyncio
+
+from insteonplm.constants import (COMMAND_LIGHT_ON_0X11_NONE,
+                                  MESSAGE_ACK,
+                                  MESSAGE_FLAG_BROADCAST_0X80)
+from insteonplm.devices import create
+from insteonplm.messages.getIMInfo import GetImInfo
+from insteonplm.messages.standardReceive import StandardReceive
+from insteonplm.metrics import MetricsRegistry
+
+from .mockConnection import MockConnection, wait_for_plm_command
+
+RECV_MSG_WAIT = .1
+
+
+def test_registry():
+    """Test counters, histograms and gauges in a registry."""
+    registry = MetricsRegistry()
+    counter = registry.counter('received', 'Messages received', 'code')
+    histogram = registry.histogram('wait_seconds', 'Wait', buckets=(1, 5))
+    depth = [3]
+    registry.gauge('depth', 'Queue depth', lambda: depth[0])
+
+    counter.inc('0x50')
+    counter.inc('0x50')
+    counter.inc('0x62', 3)
+    histogram.observe(0.5)
+    histogram.observe(2)
+    histogram.observe(10)
+    depth[0] = 1
+
+    assert registry.counter('received', 'Messages received') is counter
+    assert counter.value('0x50') == 2
+    assert counter.total == 5
+    assert histogram.count == 3
+    assert histogram.sum == 12.5
+    assert registry.as_dict() == {
+        'received': {'0x50': 2, '0x62': 3},
+        'wait_seconds': {'count': 3, 'sum': 12.5, 'buckets': {1: 1, 5: 2}},
+        'depth': 1}
+    assert list(registry) == ['received', 'wait_seconds', 'depth']
+
+
+def test_registry_kind_conflict():
+    """Test a metric name can not be registered as another kind."""
+    registry = MetricsRegistry()
+    registry.counter('received', 'Messages received')
+    try:
+        registry.histogram('received', 'Messages received')
+        assert False
+    except ValueError:
+        pass
+
+
+def test_prometheus_export():
+    """Test the metrics export in the Prometheus text format."""
+    registry = MetricsRegistry()
+    registry.counter('received', 'Messages received', 'code').inc('0x50')
+    registry.histogram('wait_seconds', 'Wait', buckets=(1,)).observe(0.5)
+    text = registry.prometheus()
+    assert text.splitlines() == [
+        '# HELP insteonplm_received Messages received',
+        '# TYPE insteonplm_received counter',
+        'insteonplm_received{code="0x50"} 1',
+        '# HELP insteonplm_wait_seconds Wait',
+        '# TYPE insteonplm_wait_seconds histogram',
+        'insteonplm_wait_seconds_bucket{le="1"} 1',
+        'insteonplm_wait_seconds_bucket{le="+Inf"} 1',
+        'insteonplm_wait_seconds_sum 0.5',
+        'insteonplm_wait_seconds_count 1']
+    assert ('insteonplm_received', {'code': '0x50'}, 1) in list(
+        registry.samples())
+
+
+def test_plm_metrics():
+    """Test the PLM records metrics for sent and received messages."""
+    async def run_test(loop):
+        conn = await MockConnection.create(loop=loop)
+        plm = conn.protocol
+        plm.connection_made(conn.transport)
+        device = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+        plm.devices[device.address.id] = device
+
+        assert await wait_for_plm_command(plm, GetImInfo(), loop)
+        msg = GetImInfo(address='1a2b3c', cat=0x03, subcat=0x20,
+                        firmware=0x00, acknak=MESSAGE_ACK)
+        plm.data_received(msg.bytes)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+
+        msg = StandardReceive('4d5e6f', '000001',
+                              COMMAND_LIGHT_ON_0X11_NONE, cmd2=0xff,
+                              flags=MESSAGE_FLAG_BROADCAST_0X80)
+        plm.data_received(msg.bytes)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+        plm.data_received(msg.bytes)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+
+        metrics = plm.metrics
+        assert metrics['messages_received'].value('0x60') == 1
+        assert metrics['messages_received'].value('0x50') == 2
+        assert metrics['ack_seconds'].count == 1
+        assert metrics['naks'].value() == 0
+        assert metrics['duplicates_suppressed'].value() == 1
+        assert metrics['callbacks_dispatched'].value() > 0
+        assert metrics['send_queue_depth'].value >= 0
+        assert 'insteonplm_ack_seconds_count 1' in metrics.prometheus()
+        await plm.close()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
@@ -0,0 +1,171 @@
+"""Test the batched state change notifications."""
+import asyncio
+
+from insteonplm.constants import (COMMAND_LIGHT_ON_0X11_NONE,
+                                  MESSAGE_TYPE_ALL_LINK_BROADCAST)
+from insteonplm.devices import create
+from insteonplm.messages.messageFlags import MessageFlags
+from insteonplm.messages.standardReceive import StandardReceive
+from insteonplm.metrics import MetricsRegistry
+from insteonplm.notifications import NotificationDispatcher
+from insteonplm.states import value_changed
+
+from .mockPLM import MockPLM
+
+
+def test_coalesced_batch_delivery():
+    """Test state changes are coalesced and delivered on the next loop."""
+    async def run_test(loop):
+        metrics = MetricsRegistry()
+        plm = MockPLM(loop)
+        plm.notifications = NotificationDispatcher(loop, metrics)
+        device = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+        values = []
+
+        def callback(address, group, value):
+            """Record the value delivered."""
+            values.append((address.id, group, value))
+
+        device.states[0x01].register_updates(callback)
+        device.states[0x01]._update_subscribers(0x40)
+        device.states[0x01]._update_subscribers(0xff)
+        assert device.states[0x01].value == 0xff
+        assert not values
+        assert plm.notifications.pending == 1
+
+        await asyncio.sleep(0, loop=loop)
+        assert values == [('4d5e6f', 0x01, 0xff)]
+        assert metrics['state_updates'].value() == 2
+        assert metrics['state_updates_coalesced'].value() == 1
+        assert metrics['notification_delay_seconds'].count == 1
+        stats = plm.notifications.subscriber_stats[callback]
+        assert stats.calls == 1
+        assert stats.as_dict()['failures'] == 0
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_failing_and_async_subscribers():
+    """Test a failing subscriber does not stop delivery to the others."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        plm.notifications = NotificationDispatcher(loop)
+        device = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+        plm.devices[device.address.id] = device
+        values = []
+
+        def failing(address, group, value):
+            """Fail to handle the state change."""
+            raise ValueError(value)
+
+        async def async_callback(address, group, value):
+            """Record the value delivered in a task."""
+            values.append(value)
+
+        device.states[0x01].register_updates(failing)
+        device.states[0x01].register_updates(async_callback)
+        msg = StandardReceive('4d5e6f', '000001',
+                              COMMAND_LIGHT_ON_0X11_NONE, cmd2=0xff,
+                              flags=MessageFlags.create(
+                                  MESSAGE_TYPE_ALL_LINK_BROADCAST, 0, 2, 3))
+        plm.message_received(msg)
+        await asyncio.sleep(0.1, loop=loop)
+
+        assert values == [0xff]
+        stats = plm.notifications.subscriber_stats
+        assert stats[failing].failures == 1
+        assert stats[async_callback].calls == 1
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_change_only_subscribers():
+    """Test subscribers registered for changes only skip repeated values."""
+    plm = MockPLM()
+    device = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+    state = device.states[0x01]
+    every, changes, deadband = [], [], []
+    state.register_updates(lambda addr, group, val: every.append(val))
+    state.register_updates(lambda addr, group, val: changes.append(val),
+                           changes_only=True)
+    state.register_updates(lambda addr, group, val: deadband.append(val),
+                           changes_only=True, deadband=0x10)
+
+    for value in [0x40, 0x40, 0x48, 0x48, 0x60, 0x00]:
+        state._update_subscribers(value)
+
+    assert every == [0x40, 0x40, 0x48, 0x48, 0x60, 0x00]
+    assert changes == [0x40, 0x48, 0x60, 0x00]
+    assert deadband == [0x40, 0x60, 0x00]
+
+
+def test_change_only_state():
+    """Test a state set to changes only notifies every subscriber once."""
+    plm = MockPLM()
+    device = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+    state = device.states[0x01]
+    values = []
+    state.register_updates(lambda addr, group, val: values.append(val))
+    state.changes_only = True
+    state.deadband = 2
+
+    for value in [0x40, 0x40, 0x41, 0x43, 0x43]:
+        state._update_subscribers(value)
+
+    assert values == [0x40, 0x43]
+    assert state.value == 0x43
+
+
+def test_value_changed():
+    """Test the value comparison of numeric and other values."""
+    assert value_changed(None, 0)
+    assert not value_changed(None, None)
+    assert not value_changed(21.5, 21.8, deadband=0.5)
+    assert value_changed(21.5, 22.1, deadband=0.5)
+    assert value_changed(True, False, deadband=5)
+    assert not value_changed('Heat', 'Heat', deadband=1)
+    assert value_changed('Heat', 'Cool', deadband=1)
+
+
+def test_state_snapshot():
+    """Test the snapshot reads cached values without refreshing."""
+    plm = MockPLM()
+    device = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+    plm.devices[device.address.id] = device
+    plm.sentmessage = ''
+
+    assert plm.devices.state_snapshot() == {'4d5e6f': {0x01: 0x00}}
+    assert plm.sentmessage == ''
+    device.states[0x01]._update_subscribers(0x80)
+    assert plm.devices.state_snapshot() == {'4d5e6f': {0x01: 0x80}}
+
+
+def test_state_change_stream():
+    """Test a stream receives the changes of every device until closed."""
+    async def run_test(loop):
+        plm = MockPLM(loop)
+        plm.notifications = NotificationDispatcher(loop)
+        first = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+        second = create(plm, '1a2b3c', 0x02, 0x1a, 0x00)
+        stream = plm.notifications.subscribe()
+        limited = plm.notifications.subscribe(maxsize=1)
+
+        first.states[0x01]._update_subscribers(0x40)
+        second.states[0x01]._update_subscribers(0xff)
+        await asyncio.sleep(0, loop=loop)
+        stream.close()
+        first.states[0x01]._update_subscribers(0x00)
+        await asyncio.sleep(0, loop=loop)
+
+        changes = [change async for change in stream]
+        assert [(change.address.id, change.group, change.value)
+                for change in changes] == [('4d5e6f', 0x01, 0x40),
+                                           ('1a2b3c', 0x01, 0xff)]
+        assert changes[0].name == first.states[0x01].name
+        assert limited.dropped == 2
+        assert (await limited.__anext__()).value == 0x00
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
@@ -1,6 +1,8 @@
 """Test the INSTEON PLM device."""
 import asyncio
 import logging
+import subprocess
+import sys
 
 import insteonplm
 from insteonplm.constants import (COMMAND_LIGHT_ON_0X11_NONE,
@@ -14,6 +16,7 @@ from insteonplm.constants import (COMMAND_LIGHT_ON_0X11_NONE,
                                   X10_COMMAND_ON,
                                   X10_COMMAND_OFF)
 from insteonplm.address import Address
+from insteonplm.devices import ALDBRecord, ALDBStatus, create
 from insteonplm.messages.standardSend import StandardSend
 from insteonplm.messages.standardReceive import StandardReceive
 from insteonplm.messages.getIMInfo import GetImInfo
@@ -337,4 +340,55 @@ def test_plm_x10():
 
 
 if __name__ == '__main__':
-    test_plm()
\ No newline at end of file
+    test_plm()
+
+def test_scene_members():
+    """Test scene members get their state from the responder link data."""
+    async def run_test(loop):
+        conn = await MockConnection.create(loop=loop)
+        plm = conn.protocol
+        cb = MockCallbacks()
+
+        dimmer = create(plm, '4d5e6f', 0x01, 0x0b, 0x00)
+        switch = create(plm, '112233', 0x02, 0x2a, 0x00)
+        plm.devices[dimmer.address.id] = dimmer
+        plm.devices[switch.address.id] = switch
+        dimmer.states[0x01].register_updates(cb.callbackmethod1)
+        plm.aldb[0] = ALDBRecord(0, 0xe2, 0x05, '4d5e6f', 0x01, 0x0b, 0x00)
+        plm.aldb[1] = ALDBRecord(1, 0xe2, 0x05, '112233', 0x02, 0x2a, 0x00)
+        dimmer.aldb.load_saved_records(ALDBStatus.LOADED, {
+            0x0fff: {'control_flags': 0xa2, 'group': 0x05,
+                     'address': plm.address.id,
+                     'data1': 0x80, 'data2': 0x1c, 'data3': 0x01},
+            0x0ff7: {'control_flags': 0x00}})
+
+        members = plm._find_scene(0x05)
+        assert len(members) == 2
+        by_addr = {member.address.id: member for member in members}
+        assert by_addr['4d5e6f'].data1 == 0x80
+        assert by_addr['112233'].data1 is None
+        assert plm._find_scene(0x05) is members
+
+        plm._update_scene_member(dimmer, by_addr['4d5e6f'], True)
+        await asyncio.sleep(0, loop=loop)
+        assert cb.callbackvalue1 == 0x80
+        plm._update_scene_member(dimmer, by_addr['4d5e6f'], False)
+        await asyncio.sleep(0, loop=loop)
+        assert cb.callbackvalue1 == 0x00
+
+        plm.clear_scene_cache()
+        assert plm._find_scene(0x05) is not members
+        await plm.close()
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))
+
+
+def test_hub_transport_lazy_import():
+    """Test aiohttp is only imported when the Hub transport is used."""
+    script = ("import sys\n"
+              "import insteonplm\n"
+              "assert 'aiohttp' not in sys.modules\n"
+              "assert insteonplm.HttpTransport.__name__ == 'HttpTransport'\n"
+              "assert 'aiohttp' in sys.modules\n")
+    subprocess.run([sys.executable, '-c', script], check=True)
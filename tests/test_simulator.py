@@ -0,0 +1,171 @@
+"""Test the simulated Insteon Modem."""
+import asyncio
+
+from insteonplm.address import Address
+from insteonplm.constants import (COMMAND_LIGHT_ON_0X11_NONE,
+                                  COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00,
+                                  COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00)
+from insteonplm.messages.extendedSend import ExtendedSend
+from insteonplm.messages.standardSend import StandardSend
+from insteonplm.messages.userdata import Userdata
+from insteonplm.plm import PLM
+from insteonplm.simulator import SimulatedModem
+
+RECV_MSG_WAIT = .1
+
+
+class RecordingProtocol(asyncio.Protocol):
+    """Protocol recording the data received from the modem."""
+
+    def __init__(self):
+        """Init the RecordingProtocol class."""
+        self.transport = None
+        self.received = []
+        self.lost = False
+
+    def connection_made(self, transport):
+        """Save the transport."""
+        self.transport = transport
+
+    def data_received(self, data):
+        """Record the data received."""
+        self.received.append(data)
+
+    def connection_lost(self, exc):
+        """Record the connection was lost."""
+        self.lost = True
+
+
+def _run(coro):
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(coro(loop))
+
+
+def test_device_status():
+    """Test a device answers a status request after the modem ACK."""
+    async def run_test(loop):
+        modem = SimulatedModem(loop, time_scale=0)
+        device = modem.add_devices(1, 'dimmer', hops=2)[0]
+        device.level = 0x80
+        protocol = RecordingProtocol()
+        modem.connect(protocol)
+
+        msg = StandardSend(device.address,
+                           COMMAND_LIGHT_STATUS_REQUEST_0X19_0X00)
+        modem.write(msg.bytes)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+
+        assert protocol.received[0] == msg.bytes + b'\x06'
+        reply = protocol.received[1]
+        assert reply[:2] == b'\x02\x50'
+        assert reply[2:5] == device.address.bytes
+        assert reply[5:8] == modem.address.bytes
+        # Direct ACK with one hop left of three
+        assert reply[8] == 0x27
+        assert reply[10] == 0x80
+        assert device.commands_received == 1
+
+    _run(run_test)
+
+
+def test_device_aldb_read():
+    """Test a device returns every record up to the high water mark."""
+    async def run_test(loop):
+        modem = SimulatedModem(loop, time_scale=0)
+        device = modem.add_devices(1, 'switch')[0]
+        protocol = RecordingProtocol()
+        modem.connect(protocol)
+
+        userdata = Userdata({'d1': 0, 'd2': 0, 'd3': 0, 'd4': 0, 'd5': 0})
+        msg = ExtendedSend(device.address,
+                           COMMAND_EXTENDED_READ_WRITE_ALDB_0X2F_0X00,
+                           userdata=userdata)
+        msg.set_checksum()
+        modem.write(msg.bytes)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+
+        records = [data for data in protocol.received if data[1] == 0x51]
+        assert len(records) == len(device.aldb) == 3
+        assert [data[13] << 8 | data[14] for data in records] == [
+            0x0fff, 0x0ff7, 0x0fef]
+        assert Address(records[0][18:21]) == modem.address
+        assert records[-1][17] == 0x00
+
+    _run(run_test)
+
+
+def test_loss_and_nak():
+    """Test lost device messages and modem NAKs."""
+    async def run_test(loop):
+        modem = SimulatedModem(loop, time_scale=0, loss=1, seed=1)
+        device = modem.add_devices(1)[0]
+        protocol = RecordingProtocol()
+        modem.connect(protocol)
+
+        msg = StandardSend(device.address, COMMAND_LIGHT_ON_0X11_NONE,
+                           cmd2=0xff)
+        modem.write(msg.bytes)
+        modem.nak_rate = 1
+        modem.write(msg.bytes)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+
+        assert protocol.received == [msg.bytes + b'\x06', msg.bytes + b'\x15']
+        assert modem.messages_lost == 1
+        assert modem.naks_sent == 1
+        assert device.level == 0xff
+
+        modem.close()
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+        assert protocol.lost
+        assert modem.is_closing()
+
+    _run(run_test)
+
+
+def test_timing():
+    """Test replies are delayed by the serial line and powerline hops."""
+    async def run_test(loop):
+        modem = SimulatedModem(loop)
+        device = modem.add_devices(1, hops=1)[0]
+        protocol = RecordingProtocol()
+        modem.connect(protocol)
+
+        start = loop.time()
+        modem.write(StandardSend(device.address,
+                                 COMMAND_LIGHT_ON_0X11_NONE,
+                                 cmd2=0xff).bytes)
+        while len(protocol.received) < 2:
+            await asyncio.sleep(0.01, loop=loop)
+        # Two hops each way for the command and the direct ACK
+        assert loop.time() - start >= 0.2
+
+    _run(run_test)
+
+
+def test_plm_startup():
+    """Test the PLM loads the modem ALDB and finds the devices."""
+    async def run_test(loop):
+        plm = PLM(loop=loop, poll_devices=False)
+        modem = SimulatedModem(loop, time_scale=0, duplicates=2)
+        device = modem.add_devices(1)[0]
+        aldb_loaded = asyncio.Event(loop=loop)
+        plm.add_all_link_done_callback(aldb_loaded.set)
+        modem.connect(plm)
+        await asyncio.wait_for(aldb_loaded.wait(), 10, loop=loop)
+        assert plm.address == modem.address
+        assert len(plm.aldb) == 2
+
+        for _ in range(100):
+            if plm.devices[device.address.id]:
+                break
+            await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+        assert plm.devices[device.address.id].cat == 0x01
+
+        modem.press(device)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+        # Broadcast is received twice for each of the two hops and the
+        # cleanup that follows is a duplicate of the broadcast
+        assert plm.metrics['duplicates_suppressed'].value() == 4
+        await plm.close()
+
+    _run(run_test)
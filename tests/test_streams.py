@@ -0,0 +1,63 @@
+"""Test the message and state change streams."""
+import asyncio
+import binascii
+import tempfile
+
+from insteonplm.messages.standardReceive import StandardReceive
+from insteonplm.messages.x10received import X10Received
+from insteonplm.plm import PLM
+from insteonplm.streams import Stream
+
+RECV_MSG_WAIT = .1
+STANDARD_RECEIVE = binascii.unhexlify('02501a2b3c000001cb1100')
+X10_RECEIVE = binascii.unhexlify('02526680')
+
+
+def test_message_streams():
+    """Test filtered and unfiltered streams of received messages."""
+    async def run_test(loop, workdir):
+        plm = PLM(loop=loop, workdir=workdir)
+        every = plm.messages()
+        standard = plm.messages(StandardReceive.template(address='1a2b3c'))
+        limited = plm.messages([StandardReceive.template(),
+                                X10Received(None, None)], maxsize=2)
+
+        plm.data_received(STANDARD_RECEIVE + X10_RECEIVE + STANDARD_RECEIVE)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+        for stream in [every, standard, limited]:
+            stream.close()
+        plm.data_received(STANDARD_RECEIVE)
+        await asyncio.sleep(RECV_MSG_WAIT, loop=loop)
+
+        assert [msg.code async for msg in every] == [0x50, 0x52, 0x50]
+        assert [msg.address.id async for msg in standard] == ['1a2b3c'] * 2
+        assert [msg.code async for msg in limited] == [0x52, 0x50]
+        assert limited.dropped == 1
+        assert not plm.message_callbacks[StandardReceive.template()]
+        await plm.close()
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory() as workdir:
+        loop.run_until_complete(run_test(loop, workdir))
+
+
+def test_stream_waits_for_items():
+    """Test a reader waits for the next item and stops when closed."""
+    async def run_test(loop):
+        stream = Stream(loop)
+
+        async def read():
+            return [item async for item in stream]
+
+        reader = asyncio.ensure_future(read(), loop=loop)
+        await asyncio.sleep(0, loop=loop)
+        assert not reader.done()
+        stream.put(1)
+        stream.put(2)
+        stream.close()
+        stream.put(3)
+        assert await reader == [1, 2]
+        assert stream.closed
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(run_test(loop))